@@ -1,6 +1,6 @@
 """Configuration settings for API Gateway"""
 from functools import lru_cache
-from typing import List
+from typing import Any, Dict, List
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -21,15 +21,39 @@ class APIGatewaySettings(BaseSettings):
     jwt_algorithm: str = Field(default="HS256", alias="JWT_ALGORITHM")
     jwt_expiration_minutes: int = Field(default=1440, alias="JWT_EXPIRATION_MINUTES")  # 24 hours
 
+    # Verified-token cache (entries expire at the token's exp, capped by max ttl)
+    jwt_cache_enabled: bool = Field(default=True, alias="JWT_CACHE_ENABLED")
+    jwt_cache_max_entries: int = Field(default=10000, alias="JWT_CACHE_MAX_ENTRIES")
+    jwt_cache_max_ttl: int = Field(default=900, alias="JWT_CACHE_MAX_TTL")  # seconds
+
     # Microservices URLs
     user_service_url: str = Field(default="http://localhost:8001", alias="USER_SERVICE_URL")
     course_service_url: str = Field(default="http://localhost:8002", alias="COURSE_SERVICE_URL")
     attendance_service_url: str = Field(default="http://localhost:8003", alias="ATTENDANCE_SERVICE_URL")
     notification_service_url: str = Field(default="http://localhost:8004", alias="NOTIFICATION_SERVICE_URL")
 
-    # Rate Limiting
+    # Rate Limiting (token bucket: refills rate_limit_per_minute, holds up to rate_limit_burst)
     rate_limit_enabled: bool = Field(default=True, alias="RATE_LIMIT_ENABLED")
     rate_limit_per_minute: int = Field(default=60, alias="RATE_LIMIT_PER_MINUTE")
+    rate_limit_burst: int = Field(default=0, alias="RATE_LIMIT_BURST")  # 0 = rate_limit_per_minute
+    # Budgets per route class (see rate_limit in the route table); per_minute/burst are per user,
+    # ip_per_minute/ip_burst per client IP for anonymous traffic. /auth routes are never
+    # authenticated, so the auth class only has a per-IP budget
+    rate_limit_classes: Dict[str, Dict[str, int]] = Field(
+        default={
+            "default": {"ip_per_minute": 600, "ip_burst": 200},
+            "auth": {"ip_per_minute": 600, "ip_burst": 300},
+            "gps": {"per_minute": 60, "burst": 20, "ip_per_minute": 3000, "ip_burst": 1000},
+            "reports": {"per_minute": 30, "burst": 10, "ip_per_minute": 120, "ip_burst": 30},
+        },
+        alias="RATE_LIMIT_CLASSES"
+    )
+    rate_limit_backend: str = Field(default="memory", alias="RATE_LIMIT_BACKEND")  # memory, shared_memory, redis
+    rate_limit_prefetch: int = Field(default=10, alias="RATE_LIMIT_PREFETCH")  # max tokens taken per backend call
+    rate_limit_prefetch_ttl: float = Field(default=1.0, alias="RATE_LIMIT_PREFETCH_TTL")  # seconds prefetched tokens stay usable
+    rate_limit_shm_path: str = Field(default="/dev/shm/geoattend-gateway-ratelimit", alias="RATE_LIMIT_SHM_PATH")
+    rate_limit_shm_slots: int = Field(default=65536, alias="RATE_LIMIT_SHM_SLOTS")
+    redis_url: str = Field(default="redis://localhost:6379/0", alias="REDIS_URL")
 
     # CORS - Incluye Expo mobile app
     cors_origins: List[str] = Field(
@@ -45,7 +69,52 @@ class APIGatewaySettings(BaseSettings):
     )
 
     # Timeouts
-    request_timeout: int = Field(default=30, alias="REQUEST_TIMEOUT")
+    request_timeout: int = Field(default=30, alias="REQUEST_TIMEOUT")  # read timeout for upstream responses
+
+    # Upstream connection pools (one long-lived client per microservice)
+    upstream_max_connections: int = Field(default=100, alias="UPSTREAM_MAX_CONNECTIONS")  # per upstream
+    upstream_max_connections_overrides: Dict[str, int] = Field(default={}, alias="UPSTREAM_MAX_CONNECTIONS_OVERRIDES")  # {"attendance": 200}
+    upstream_max_keepalive: int = Field(default=20, alias="UPSTREAM_MAX_KEEPALIVE")  # idle connections kept per upstream
+    upstream_keepalive_expiry: float = Field(default=30.0, alias="UPSTREAM_KEEPALIVE_EXPIRY")  # seconds
+    upstream_connect_timeout: float = Field(default=3.0, alias="UPSTREAM_CONNECT_TIMEOUT")
+    upstream_write_timeout: float = Field(default=10.0, alias="UPSTREAM_WRITE_TIMEOUT")
+    upstream_pool_timeout: float = Field(default=5.0, alias="UPSTREAM_POOL_TIMEOUT")  # wait for a free connection
+    upstream_http2: bool = Field(default=False, alias="UPSTREAM_HTTP2")  # requires the h2 package
+
+    # Circuit breaker per upstream (count-based window of recent calls)
+    upstream_breaker_enabled: bool = Field(default=True, alias="UPSTREAM_BREAKER_ENABLED")
+    upstream_breaker_window: int = Field(default=20, alias="UPSTREAM_BREAKER_WINDOW")
+    upstream_breaker_min_calls: int = Field(default=10, alias="UPSTREAM_BREAKER_MIN_CALLS")
+    upstream_breaker_failure_rate: float = Field(default=0.5, alias="UPSTREAM_BREAKER_FAILURE_RATE")  # 5xx and transport errors
+    upstream_breaker_slow_call_seconds: float = Field(default=10.0, alias="UPSTREAM_BREAKER_SLOW_CALL_SECONDS")  # time to response headers
+    upstream_breaker_slow_call_rate: float = Field(default=0.8, alias="UPSTREAM_BREAKER_SLOW_CALL_RATE")
+    upstream_breaker_open_seconds: float = Field(default=30.0, alias="UPSTREAM_BREAKER_OPEN_SECONDS")
+    upstream_breaker_half_open_calls: int = Field(default=3, alias="UPSTREAM_BREAKER_HALF_OPEN_CALLS")
+
+    # Bulkhead: concurrent in-flight calls per upstream
+    upstream_bulkhead_max_concurrent: int = Field(default=80, alias="UPSTREAM_BULKHEAD_MAX_CONCURRENT")
+    upstream_bulkhead_overrides: Dict[str, int] = Field(default={}, alias="UPSTREAM_BULKHEAD_OVERRIDES")  # {"attendance": 40}
+    upstream_bulkhead_wait: float = Field(default=0.05, alias="UPSTREAM_BULKHEAD_WAIT")  # seconds to wait for a slot
+
+    # Route table overrides: prefix -> Route fields, e.g. {"/api/v1/courses": {"timeout": 10, "cache": {"ttl": 120}}}
+    gateway_routes: Dict[str, Dict[str, Any]] = Field(default={}, alias="GATEWAY_ROUTES")
+
+    # Stream raw request/response bytes instead of parsing and re-serializing JSON
+    proxy_passthrough: bool = Field(default=True, alias="PROXY_PASSTHROUGH")
+
+    # Response cache for GET routes with a cache policy in the route table
+    response_cache_enabled: bool = Field(default=True, alias="RESPONSE_CACHE_ENABLED")
+    response_cache_coalesce: bool = Field(default=True, alias="RESPONSE_CACHE_COALESCE")  # one upstream fetch per key at a time
+    response_cache_max_entries: int = Field(default=2000, alias="RESPONSE_CACHE_MAX_ENTRIES")
+    response_cache_max_bytes: int = Field(default=64 * 1024 * 1024, alias="RESPONSE_CACHE_MAX_BYTES")
+    response_cache_max_entry_bytes: int = Field(default=1024 * 1024, alias="RESPONSE_CACHE_MAX_ENTRY_BYTES")
+
+    # Response compression negotiated on Accept-Encoding (Brotli when installed, gzip otherwise)
+    compression_enabled: bool = Field(default=True, alias="COMPRESSION_ENABLED")
+    compression_min_size: int = Field(default=1024, alias="COMPRESSION_MIN_SIZE")  # bytes; smaller bodies go as-is
+    compression_gzip_level: int = Field(default=6, alias="COMPRESSION_GZIP_LEVEL")
+    compression_brotli_quality: int = Field(default=4, alias="COMPRESSION_BROTLI_QUALITY")
+    compression_offload_size: int = Field(default=128 * 1024, alias="COMPRESSION_OFFLOAD_SIZE")  # compressed in a worker thread
 
 @lru_cache
 def get_settings() -> APIGatewaySettings:
@@ -0,0 +1,162 @@
+"""Declarative route table: which upstream serves each path prefix, and with which policies"""
+from dataclasses import dataclass, replace
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from .config import get_settings
+
+settings = get_settings()
+
+UPSTREAMS = ("user", "course", "attendance", "notification")
+AUTH_MODES = ("none", "optional", "required")
+CACHE_SCOPES = ("public", "role", "user")
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Response cache rule: entries live `ttl` seconds, shared within `scope` (public, role or user)"""
+    ttl: int
+    scope: str = "public"
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retries for requests without a body; connection errors and `on_status` responses are retried"""
+    attempts: int = 1
+    backoff: float = 0.1  # seconds, doubled on every attempt
+    methods: FrozenSet[str] = frozenset({"GET"})
+    on_status: FrozenSet[int] = frozenset({502, 503, 504})
+
+
+NO_RETRY = RetryPolicy()
+IDEMPOTENT_RETRY = RetryPolicy(attempts=3)
+
+
+@dataclass(frozen=True)
+class Route:
+    """One gateway route: every path under `prefix` is forwarded unchanged to `upstream`"""
+    prefix: str
+    upstream: str  # user | course | attendance | notification
+    timeout: Optional[float] = None  # read timeout, defaults to REQUEST_TIMEOUT
+    retry: RetryPolicy = NO_RETRY
+    cache: Optional[CachePolicy] = None
+    auth: str = "optional"
+    rate_limit: str = "default"
+    parse_body: bool = False  # parse and re-serialize JSON instead of streaming bytes
+    collection: bool = True  # the bare prefix is the collection endpoint "prefix/" upstream
+    invalidates: Tuple[str, ...] = ()  # other cached prefixes a write here makes stale
+    uncached_suffixes: Tuple[str, ...] = ()  # paths ending like this bypass the response cache
+
+
+COURSE_CATALOG = ("/api/v1/courses", "/api/v1/classrooms", "/api/v1/schedules")
+
+ROUTES: List[Route] = [
+    # User Service
+    Route("/api/v1/auth", "user", auth="none", rate_limit="auth"),
+    Route("/api/v1/users", "user"),
+    Route("/api/v1/users/teachers", "user", retry=IDEMPOTENT_RETRY, cache=CachePolicy(ttl=300), collection=False),
+
+    # Course Service: courses, classrooms and schedules reference each other, so any write drops them all
+    Route("/api/v1/courses", "course", retry=IDEMPOTENT_RETRY, cache=CachePolicy(ttl=60), invalidates=COURSE_CATALOG),
+    Route("/api/v1/classrooms", "course", retry=IDEMPOTENT_RETRY, cache=CachePolicy(ttl=300), invalidates=COURSE_CATALOG),
+    Route("/api/v1/enrollments", "course", retry=IDEMPOTENT_RETRY, invalidates=COURSE_CATALOG),
+    # ".../current" (current class of a course) depends on the time, never cached
+    Route("/api/v1/schedules", "course", retry=IDEMPOTENT_RETRY, cache=CachePolicy(ttl=300), invalidates=COURSE_CATALOG,
+          uncached_suffixes=("/current",)),
+    # Depends on the time ("active now"), never cached
+    Route("/api/v1/schedules/active", "course", retry=IDEMPOTENT_RETRY, collection=False, invalidates=COURSE_CATALOG),
+
+    # Attendance Service
+    Route("/api/v1/attendance", "attendance"),
+    Route("/api/v1/gps", "attendance", timeout=10, rate_limit="gps"),
+    Route("/api/v1/reports", "attendance", timeout=120, rate_limit="reports"),
+
+    # Notification Service
+    Route("/api/v1/notifications", "notification"),
+]
+
+
+def _policy_overrides(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a GATEWAY_ROUTES entry from settings into Route field values"""
+    values = dict(values)
+    if "cache" in values:
+        values["cache"] = CachePolicy(**values["cache"]) if values["cache"] else None
+    if "retry" in values:
+        retry = dict(values["retry"] or {})
+        for name in ("methods", "on_status"):
+            if name in retry:
+                retry[name] = frozenset(retry[name])
+        values["retry"] = RetryPolicy(**retry)
+    if "invalidates" in values:
+        values["invalidates"] = tuple(prefix.rstrip("/") for prefix in values["invalidates"] or ())
+    if "uncached_suffixes" in values:
+        values["uncached_suffixes"] = tuple(suffix.rstrip("/") for suffix in values["uncached_suffixes"] or ())
+    return values
+
+
+class RouteTable:
+    """Longest-prefix dispatcher over the route table.
+
+    Prefixes are stored in a dict, so matching a path costs one dict lookup per
+    path segment, independent of the number of routes.
+    """
+
+    def __init__(self, routes: List[Route], overrides: Dict[str, Dict[str, Any]]):
+        table = {route.prefix: route for route in routes}
+        for prefix, values in overrides.items():
+            prefix = prefix.rstrip("/")
+            values = _policy_overrides(values)
+            table[prefix] = replace(table[prefix], **values) if prefix in table else Route(prefix=prefix, **values)
+
+        for route in table.values():
+            if route.upstream not in UPSTREAMS:
+                raise ValueError(f"Route {route.prefix}: unknown upstream '{route.upstream}'")
+            if route.auth not in AUTH_MODES:
+                raise ValueError(f"Route {route.prefix}: unknown auth mode '{route.auth}'")
+            if route.cache is not None and route.cache.scope not in CACHE_SCOPES:
+                raise ValueError(f"Route {route.prefix}: unknown cache scope '{route.cache.scope}'")
+            for prefix in route.invalidates:
+                if prefix not in table:
+                    raise ValueError(f"Route {route.prefix}: invalidates unknown route '{prefix}'")
+
+        self.routes: Dict[str, Route] = table
+        # Same routes without cache, served for paths ending in one of their uncached suffixes
+        self._uncached: Dict[str, Route] = {
+            route.prefix: replace(route, cache=None)
+            for route in table.values()
+            if route.cache is not None and route.uncached_suffixes
+        }
+
+    def match(self, path: str) -> Optional[Tuple[Route, str]]:
+        """Route for a gateway path and the path to request upstream"""
+        candidate = path.rstrip("/")
+        while candidate:
+            route = self.routes.get(candidate)
+            if route is not None:
+                if route.prefix in self._uncached and path.rstrip("/").endswith(route.uncached_suffixes):
+                    route = self._uncached[route.prefix]
+                # A bare prefix ("/api/v1/courses") maps to the collection ("/api/v1/courses/")
+                if route.collection and len(path) <= len(route.prefix):
+                    return route, f"{route.prefix}/"
+                return route, path
+            candidate = candidate[:candidate.rfind("/")]
+        return None
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "prefix": route.prefix,
+                "upstream": route.upstream,
+                "timeout": route.timeout or settings.request_timeout,
+                "retry_attempts": route.retry.attempts,
+                "cache": {"ttl": route.cache.ttl, "scope": route.cache.scope} if route.cache else None,
+                "auth": route.auth,
+                "rate_limit": route.rate_limit,
+                "parse_body": route.parse_body,
+                "invalidates": list(route.invalidates),
+                "uncached_suffixes": list(route.uncached_suffixes),
+            }
+            for route in sorted(self.routes.values(), key=lambda route: route.prefix)
+        ]
+
+
+route_table = RouteTable(ROUTES, settings.gateway_routes)
@@ -1,6 +1,9 @@
 """Security utilities for API Gateway"""
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import jwt, JWTError
 from fastapi import HTTPException, status, Header
 from loguru import logger
@@ -10,6 +13,66 @@ from .config import get_settings
 settings = get_settings()
 
 
+class TokenVerificationCache:
+    """Bounded LRU of verified JWT payloads keyed by the token's SHA-256.
+
+    An entry lives until the token's `exp` (capped by JWT_CACHE_MAX_TTL), so a
+    cached token is never accepted past its expiry. Failed verifications are
+    not cached.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, payload = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(payload)
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, token: str, payload: dict):
+        expires_at = time.time() + settings.jwt_cache_max_ttl
+        if isinstance(payload.get("exp"), (int, float)):
+            expires_at = min(expires_at, payload["exp"])
+
+        self._entries[self._key(token)] = (expires_at, dict(payload))
+        while len(self._entries) > settings.jwt_cache_max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.jwt_cache_enabled,
+            "entries": len(self._entries),
+            "max_entries": settings.jwt_cache_max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+        }
+
+
+token_cache = TokenVerificationCache()
+
+
 class SecurityService:
     """Security service for JWT validation and generation"""
 
@@ -30,13 +93,20 @@ class SecurityService:
 
     @staticmethod
     def verify_token(token: str) -> dict:
-        """Verify JWT token and return payload"""
+        """Verify JWT token and return payload (served from the verification cache when possible)"""
+        if settings.jwt_cache_enabled:
+            payload = token_cache.get(token)
+            if payload is not None:
+                return payload
+
         try:
             payload = jwt.decode(
                 token,
                 settings.secret_key,
                 algorithms=[settings.jwt_algorithm]
             )
+            if settings.jwt_cache_enabled:
+                token_cache.put(token, payload)
             return payload
 
         except JWTError as e:
@@ -1,13 +1,17 @@
 """API Gateway - FastAPI Application"""
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
 from loguru import logger
 
 from .core.config import get_settings
-from .middleware.rate_limit import limiter
+from .core.routes import route_table
+from .core.security import token_cache
+from .middleware.compression import CompressionMiddleware
+from .middleware.rate_limit import rate_limiter
 from .routers import gateway
+from .services.response_cache import response_cache
+from .services.upstream import upstream_pool
 
 settings = get_settings()
 
@@ -19,18 +23,33 @@ logger.add(
     level="INFO"
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan: open and close the upstream connection pools"""
+    logger.info("🚀 Starting API Gateway...")
+    logger.info(f"📍 User Service: {settings.user_service_url}")
+    logger.info(f"📍 Course Service: {settings.course_service_url}")
+    logger.info(f"📍 Attendance Service: {settings.attendance_service_url}")
+    logger.info(f"📍 Notification Service: {settings.notification_service_url}")
+    logger.info(f"🔒 Rate Limiting: {'Enabled (' + settings.rate_limit_backend + ')' if settings.rate_limit_enabled else 'Disabled'}")
+
+    await upstream_pool.start()
+    logger.info(f"✅ API Gateway running on port {settings.service_port}")
+
+    yield
+
+    logger.info("🛑 Shutting down API Gateway...")
+    await upstream_pool.stop()
+    await rate_limiter.close()
+
+
 app = FastAPI(
     title="GeoAttend API Gateway",
     description="API Gateway centralizado para todos los microservicios de GeoAttend",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Add rate limiter state
-app.state.limiter = limiter
-
-# Add rate limit exception handler
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 # CORS middleware - Permisivo para desarrollo (incluye Expo mobile)
 app.add_middleware(
     CORSMiddleware,
@@ -41,27 +60,18 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Compresión gzip/Brotli negociada con Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(gateway.router)
 
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    """Startup event"""
-    logger.info("🚀 Starting API Gateway...")
-    logger.info(f"📍 User Service: {settings.user_service_url}")
-    logger.info(f"📍 Course Service: {settings.course_service_url}")
-    logger.info(f"📍 Attendance Service: {settings.attendance_service_url}")
-    logger.info(f"📍 Notification Service: {settings.notification_service_url}")
-    logger.info(f"🔒 Rate Limiting: {'Enabled' if settings.rate_limit_enabled else 'Disabled'}")
-    logger.info(f"✅ API Gateway running on port {settings.service_port}")
-
-
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    open_circuits = upstream_pool.open_circuits()
     return {
-        "status": "healthy",
+        "status": "degraded" if open_circuits else "healthy",
         "service": "api-gateway",
         "version": "1.0.0",
         "port": settings.service_port,
@@ -71,10 +81,45 @@ async def health_check():
             "attendance_service": settings.attendance_service_url,
             "notification_service": settings.notification_service_url
         },
-        "rate_limiting": settings.rate_limit_enabled
+        "rate_limiting": settings.rate_limit_enabled,
+        "open_circuits": open_circuits,
+        "upstreams": upstream_pool.health()
+    }
+
+
+@app.get("/metrics/upstreams")
+async def upstream_metrics():
+    """Connection pool utilization and request counters per upstream service"""
+    return {
+        "http2": upstream_pool.http2,
+        "upstreams": upstream_pool.metrics()
     }
 
 
+@app.get("/routes")
+async def list_routes():
+    """Route table with the policies applied to each prefix"""
+    return route_table.describe()
+
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """Response cache hit rate and memory usage"""
+    return response_cache.metrics()
+
+
+@app.get("/metrics/rate-limit")
+async def rate_limit_metrics():
+    """Rate limiter decisions and backend round trips"""
+    return rate_limiter.metrics()
+
+
+@app.get("/metrics/auth")
+async def auth_metrics():
+    """JWT verification cache hit rate"""
+    return token_cache.metrics()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -84,14 +129,7 @@ async def root():
         "description": "GeoAttend API Gateway - Central entry point for all microservices",
         "docs": "/docs",
         "health": "/health",
-        "services": [
-            "/api/v1/users",
-            "/api/v1/auth",
-            "/api/v1/courses",
-            "/api/v1/attendance",
-            "/api/v1/gps",
-            "/api/v1/notifications"
-        ]
+        "services": sorted(route_table.routes)
     }
 
 
@@ -0,0 +1,198 @@
+"""Response compression (Brotli or gzip) negotiated on Accept-Encoding"""
+import asyncio
+import zlib
+from typing import Callable, List, Optional, Tuple
+
+from ..core.config import get_settings
+
+settings = get_settings()
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Already compressed or not worth compressing
+INCOMPRESSIBLE_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "application/octet-stream")
+# Latency matters more than size: every event must reach the client immediately
+STREAMING_TYPES = ("text/event-stream",)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Preferred supported coding of an Accept-Encoding header ("br", "gzip" or None)"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    supported = (["br"] if brotli is not None else []) + ["gzip"]
+    candidates = [(weights.get(coding, weights.get("*", 0.0)), coding) for coding in supported]
+    q, coding = max(candidates, key=lambda candidate: candidate[0])
+    return coding if q > 0 else None
+
+
+class StreamCompressor:
+    """Incremental compressor for one response body"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.compression_brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+async def _run(function: Callable[..., bytes], data: bytes) -> bytes:
+    """Compress small chunks inline; big ones in a worker thread so the event loop keeps serving"""
+    if len(data) >= settings.compression_offload_size:
+        return await asyncio.to_thread(function, data)
+    return function(data)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with Brotli (if installed) or gzip.
+
+    Bodies sent in one piece are compressed when they reach
+    COMPRESSION_MIN_SIZE. Streamed bodies (passthrough proxying, exports) are
+    compressed chunk by chunk as they flow. Responses that already carry a
+    Content-Encoding, media that is compressed by nature, event streams and
+    `Cache-Control: no-transform` responses are left untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.compression_enabled or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, CompressingSender(send, encoding))
+
+
+class CompressingSender:
+    """`send` wrapper that decides on the first body message whether to compress"""
+
+    def __init__(self, send, encoding: str):
+        self.send = send
+        self.encoding = encoding
+        self.start_message: Optional[dict] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message: dict):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            self.passthrough = not self._compressible(message)
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if not more_body and len(body) < settings.compression_min_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressor = StreamCompressor(self.encoding)
+            if not more_body:
+                compressed = await _run(self._compress_all, body)
+                await self.send(self._start_headers(start, len(compressed)))
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            await self.send(self._start_headers(start, None))
+
+        chunk = await _run(self.compressor.compress, body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _compress_all(self, body: bytes) -> bytes:
+        return self.compressor.compress(body) + self.compressor.finish()
+
+    @staticmethod
+    def _compressible(message: dict) -> bool:
+        status = message["status"]
+        if status < 200 or status in (204, 304):
+            return False
+
+        content_type = ""
+        for name, value in message.get("headers", []):
+            name = name.lower()
+            if name == b"content-encoding":
+                return False
+            if name == b"cache-control" and b"no-transform" in value.lower():
+                return False
+            if name == b"content-length" and value.isdigit() and int(value) < settings.compression_min_size:
+                return False
+            if name == b"content-type":
+                content_type = value.decode("latin-1").lower()
+
+        return not content_type.startswith(INCOMPRESSIBLE_TYPES + STREAMING_TYPES)
+
+    def _start_headers(self, start: dict, content_length: Optional[int]) -> dict:
+        headers: List[Tuple[bytes, bytes]] = []
+        vary = None
+        for name, value in start.get("headers", []):
+            lower = name.lower()
+            if lower == b"content-length":
+                continue
+            if lower == b"etag" and not value.startswith(b"W/"):
+                # The compressed bytes differ from the identity representation
+                value = b"W/" + value
+            if lower == b"vary":
+                vary = value
+                continue
+            headers.append((name, value))
+
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        if vary is None:
+            headers.append((b"vary", b"Accept-Encoding"))
+        elif b"accept-encoding" not in vary.lower():
+            headers.append((b"vary", vary + b", Accept-Encoding"))
+        else:
+            headers.append((b"vary", vary))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode("latin-1")))
+
+        return {**start, "headers": headers}
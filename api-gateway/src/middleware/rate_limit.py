@@ -1,26 +1,364 @@
-"""Rate limiting middleware"""
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from fastapi import Request, Response
+"""Token-bucket rate limiting with pluggable shared state.
+
+Buckets live in a backend selected by RATE_LIMIT_BACKEND:
+- memory: per worker process, for development and single-worker setups
+- shared_memory: a memory-mapped table shared by all workers on one host
+- redis: shared by every gateway replica; each check is one EVALSHA
+
+Workers take tokens from the backend in small batches and spend them
+locally, so busy buckets do not cost a backend round trip per request.
+"""
+import hashlib
+import os
+import struct
+import time
+from typing import Dict, NamedTuple, Tuple
+from fastapi import HTTPException, Request, status
 from loguru import logger
 
 from ..core.config import get_settings
 
 settings = get_settings()
 
-# Create limiter instance
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=[f"{settings.rate_limit_per_minute}/minute"] if settings.rate_limit_enabled else []
-)
-
-
-async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> Response:
-    """Custom handler for rate limit exceeded"""
-    logger.warning(f"Rate limit exceeded for IP: {get_remote_address(request)}")
-    return Response(
-        content='{"detail": "Rate limit exceeded. Please try again later."}',
-        status_code=429,
-        media_type="application/json"
-    )
+
+class RateLimitBackend:
+    """Storage for token buckets"""
+
+    async def take(self, key: str, rate: float, capacity: int, requested: int) -> Tuple[int, float]:
+        """Atomically refill a bucket and take up to `requested` whole tokens.
+
+        Returns the number of tokens granted and the tokens left in the bucket.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+def hash_key(key: str) -> int:
+    """Stable 64-bit hash (the built-in hash() differs between worker processes)"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+def _refill(tokens: float, updated_at: float, now: float, rate: float, capacity: int) -> float:
+    return min(float(capacity), tokens + max(0.0, now - updated_at) * rate)
+
+
+class InMemoryBackend(RateLimitBackend):
+    """Buckets in a dict of this process; limits are per worker"""
+
+    def __init__(self, max_buckets: int = 100_000):
+        self.max_buckets = max_buckets
+        self._buckets: Dict[str, Tuple[float, float, float, int]] = {}
+
+    async def take(self, key: str, rate: float, capacity: int, requested: int) -> Tuple[int, float]:
+        now = time.monotonic()
+        tokens, updated_at, _, _ = self._buckets.get(key, (float(capacity), now, rate, capacity))
+        tokens = _refill(tokens, updated_at, now, rate, capacity)
+
+        granted = min(requested, int(tokens))
+        tokens -= granted
+        self._buckets[key] = (tokens, now, rate, capacity)
+
+        if len(self._buckets) > self.max_buckets:
+            self._purge_full(now)
+        return granted, tokens
+
+    def _purge_full(self, now: float):
+        """Drop buckets that have refilled completely: they hold no state"""
+        full = [
+            key for key, (tokens, updated_at, rate, capacity) in self._buckets.items()
+            if _refill(tokens, updated_at, now, rate, capacity) >= capacity
+        ]
+        for key in full:
+            del self._buckets[key]
+
+
+class SharedMemoryBackend(RateLimitBackend):
+    """Buckets in a memory-mapped file shared by the workers of one host.
+
+    The table has a fixed number of slots (key hash, tokens, updated_at). A key
+    probes a few slots from its hash; a slot whose bucket has refilled
+    completely carries no state and is reused. Each take() holds an flock on
+    the file for a few microseconds.
+    """
+
+    SLOT = struct.Struct("<Qdd")
+    PROBES = 8
+
+    def __init__(self, path: str, slots: int):
+        # POSIX only; imported here so the other backends still work elsewhere
+        import fcntl
+        import mmap
+
+        self._fcntl = fcntl
+        self.path = path
+        self.slots = slots
+        size = slots * self.SLOT.size
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # Zero marks an empty slot
+        return hash_key(key) or 1
+
+    async def take(self, key: str, rate: float, capacity: int, requested: int) -> Tuple[int, float]:
+        key_hash = self._hash(key)
+        now = time.time()
+
+        fcntl = self._fcntl
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            slot, tokens, updated_at = self._find_slot(key_hash, now, rate, capacity)
+            tokens = _refill(tokens, updated_at, now, rate, capacity)
+            granted = min(requested, int(tokens))
+            tokens -= granted
+            self.SLOT.pack_into(self._map, slot * self.SLOT.size, key_hash, tokens, now)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        return granted, tokens
+
+    def _find_slot(self, key_hash: int, now: float, rate: float, capacity: int) -> Tuple[int, float, float]:
+        """Slot of the key's bucket (or one to start it in) with its tokens and update time"""
+        first = key_hash % self.slots
+        reusable = None
+        oldest, oldest_at = first, float("inf")
+
+        for probe in range(self.PROBES):
+            slot = (first + probe) % self.slots
+            stored_hash, tokens, updated_at = self.SLOT.unpack_from(self._map, slot * self.SLOT.size)
+            if stored_hash == key_hash:
+                return slot, tokens, updated_at
+            if reusable is None and (stored_hash == 0 or _refill(tokens, updated_at, now, rate, capacity) >= capacity):
+                reusable = slot
+            if updated_at < oldest_at:
+                oldest, oldest_at = slot, updated_at
+
+        # No idle slot among the probes: take over the least recently used one
+        return (reusable if reusable is not None else oldest), float(capacity), now
+
+    async def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {granted, tostring(tokens)}
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """Buckets in Redis, shared by every gateway replica; one EVALSHA per take()"""
+
+    def __init__(self, redis_url: str, prefix: str = "gateway:ratelimit"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(redis_url)
+        self.prefix = prefix
+        self._script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, capacity: int, requested: int) -> Tuple[int, float]:
+        granted, tokens = await self._script(keys=[f"{self.prefix}:{key}"], args=[rate, capacity, requested])
+        return int(granted), float(tokens)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class LocalAllowance:
+    """Tokens already taken from the backend for one bucket, or a cached denial"""
+    __slots__ = ("tokens", "expires_at", "denied_until")
+
+    def __init__(self, tokens: int = 0, expires_at: float = 0.0, denied_until: float = 0.0):
+        self.tokens = tokens
+        self.expires_at = expires_at
+        self.denied_until = denied_until
+
+
+class TokenBucketLimiter:
+    """Token buckets: `rate` tokens per second refill a bucket of `capacity`.
+
+    Each backend round trip asks for up to RATE_LIMIT_PREFETCH tokens, but
+    never more than the bucket refills within RATE_LIMIT_PREFETCH_TTL. Those
+    tokens are spent locally until they run out or expire. A denial is also
+    kept locally until the next token is due, so a flooding client costs no
+    backend calls. If the backend fails, requests are allowed.
+    """
+
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+        self._local: Dict[str, LocalAllowance] = {}
+        self.allowed = 0
+        self.rejected = 0
+        self.backend_calls = 0
+        self.backend_errors = 0
+        self._last_error_log = 0.0
+
+    async def hit(self, key: str, rate: float, capacity: int) -> Tuple[bool, float]:
+        """Spend one token; returns (allowed, seconds until a token is available when denied)"""
+        now = time.monotonic()
+        local = self._local.get(key)
+        if local is not None:
+            if local.denied_until > now:
+                self.rejected += 1
+                return False, local.denied_until - now
+            if local.tokens > 0 and local.expires_at > now:
+                local.tokens -= 1
+                self.allowed += 1
+                return True, 0.0
+
+        requested = max(1, min(settings.rate_limit_prefetch, int(rate * settings.rate_limit_prefetch_ttl)))
+        try:
+            self.backend_calls += 1
+            granted, tokens_left = await self.backend.take(key, rate, capacity, requested)
+        except Exception as e:
+            self.backend_errors += 1
+            if now - self._last_error_log > 10:
+                self._last_error_log = now
+                logger.error(f"❌ Rate limit backend error, allowing requests: {e}")
+            return True, 0.0
+
+        if len(self._local) > 10_000:
+            self._purge(now)
+
+        if granted == 0:
+            retry_after = (1 - tokens_left) / rate
+            self._local[key] = LocalAllowance(denied_until=now + retry_after)
+            self.rejected += 1
+            return False, retry_after
+
+        self._local[key] = LocalAllowance(tokens=granted - 1, expires_at=now + settings.rate_limit_prefetch_ttl)
+        self.allowed += 1
+        return True, 0.0
+
+    def _purge(self, now: float):
+        stale = [
+            key for key, local in self._local.items()
+            if local.denied_until <= now and (local.tokens == 0 or local.expires_at <= now)
+        ]
+        for key in stale:
+            del self._local[key]
+
+    async def close(self):
+        await self.backend.close()
+
+    def metrics(self) -> Dict[str, object]:
+        checks = self.allowed + self.rejected
+        return {
+            "enabled": settings.rate_limit_enabled,
+            "backend": settings.rate_limit_backend,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "backend_calls": self.backend_calls,
+            "backend_calls_per_check": round(self.backend_calls / checks, 3) if checks else None,
+            "backend_errors": self.backend_errors,
+            "tiers": {
+                f"{name}:{'user' if authenticated else 'ip'}": {
+                    "per_minute": round(tier.rate * 60, 2),
+                    "burst": tier.capacity,
+                }
+                for (name, authenticated), tier in RATE_LIMIT_TIERS.items()
+            },
+        }
+
+
+class RateLimitTier(NamedTuple):
+    """Budget of one bucket: `rate` tokens per second, at most `capacity` banked"""
+    rate: float
+    capacity: int
+
+
+def build_tiers() -> Dict[Tuple[str, bool], RateLimitTier]:
+    """Budgets per (rate-limit class, authenticated) from RATE_LIMIT_CLASSES.
+
+    A class may set per_minute/burst for authenticated callers (one bucket per
+    user) and ip_per_minute/ip_burst for anonymous callers (one bucket per IP,
+    shared by everyone behind the same NAT). Missing values fall back to
+    RATE_LIMIT_PER_MINUTE and RATE_LIMIT_BURST.
+    """
+    tiers = {}
+    for name, budget in {"default": {}, **settings.rate_limit_classes}.items():
+        per_minute = budget.get("per_minute", settings.rate_limit_per_minute)
+        burst = budget.get("burst", settings.rate_limit_burst) or per_minute
+        ip_per_minute = budget.get("ip_per_minute", per_minute)
+        ip_burst = budget.get("ip_burst", burst if ip_per_minute == per_minute else 0) or ip_per_minute
+        tiers[(name, True)] = RateLimitTier(per_minute / 60, burst)
+        tiers[(name, False)] = RateLimitTier(ip_per_minute / 60, ip_burst)
+    return tiers
+
+
+RATE_LIMIT_TIERS = build_tiers()
+
+
+def get_client_ip(request: Request) -> str:
+    return request.client.host if request.client else "127.0.0.1"
+
+
+def rate_limit_identity(request: Request) -> Tuple[str, bool]:
+    """Bucket owner: the JWT subject when the dispatcher authenticated the caller, else the client IP"""
+    user = getattr(request.state, "user", None)
+    subject = user.get("user_id", user.get("sub")) if user else None
+    if subject is not None:
+        return f"user:{subject}", True
+    return f"ip:{get_client_ip(request)}", False
+
+
+async def enforce_rate_limit(request: Request, rate_limit_class: str = "default"):
+    """Spend a token of the caller's bucket for the route class or raise 429 with Retry-After"""
+    if not settings.rate_limit_enabled:
+        return
+
+    identity, authenticated = rate_limit_identity(request)
+    if (rate_limit_class, authenticated) not in RATE_LIMIT_TIERS:
+        rate_limit_class = "default"
+    tier = RATE_LIMIT_TIERS[(rate_limit_class, authenticated)]
+    key = f"{rate_limit_class}:{identity}"
+
+    allowed, retry_after = await rate_limiter.hit(key, tier.rate, tier.capacity)
+    if not allowed:
+        logger.warning(f"Rate limit exceeded for {key}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded. Please try again later.",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
+
+
+def _create_backend() -> RateLimitBackend:
+    """Create the rate limit backend selected in settings"""
+    if settings.rate_limit_backend == "redis":
+        logger.info(f"Rate limit backend: redis ({settings.redis_url})")
+        return RedisBackend(settings.redis_url)
+
+    if settings.rate_limit_backend == "shared_memory":
+        logger.info(f"Rate limit backend: shared memory ({settings.rate_limit_shm_path})")
+        return SharedMemoryBackend(settings.rate_limit_shm_path, settings.rate_limit_shm_slots)
+
+    return InMemoryBackend()
+
+
+rate_limiter = TokenBucketLimiter(_create_backend())
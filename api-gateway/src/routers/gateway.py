@@ -1,10 +1,17 @@
-"""Main gateway router for proxying requests to microservices"""
+"""Main gateway router: dispatches every /api/v1 request through the route table"""
 from typing import Optional, Dict, Any
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, status
 from loguru import logger
 
-from ..services.proxy_service import ProxyService
-from ..core.security import get_current_user_optional
+from ..services.proxy_service import ProxyService, SUPPORTED_METHODS
+from ..services.response_cache import response_cache
+from ..services.upstream import upstream_pool
+from ..core.config import get_settings
+from ..core.routes import Route, route_table
+from ..core.security import get_current_user_optional, get_current_user_required
+from ..middleware.rate_limit import enforce_rate_limit
+
+settings = get_settings()
 
 router = APIRouter(prefix="/api/v1", tags=["gateway"])
 
@@ -24,264 +31,73 @@ async def get_request_body(request: Request) -> Optional[Dict[str, Any]]:
         return None
 
 
-# User Service routes
-@router.api_route("/users/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_user_service(
-    path: str,
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to User Service"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.user_service_request(
-        path=f"/api/v1/users/{path}",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-@router.api_route("/auth/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_auth_service(
-    path: str,
-    request: Request
-):
-    """Proxy authentication requests to User Service"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.user_service_request(
-        path=f"/api/v1/auth/{path}",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-# Course Service routes
-@router.api_route("/courses/", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-@router.api_route("/courses", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_course_service_root(
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Course Service root"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.course_service_request(
-        path="/api/v1/courses/",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-@router.api_route("/courses/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_course_service(
-    path: str,
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Course Service"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.course_service_request(
-        path=f"/api/v1/courses/{path}",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-@router.api_route("/classrooms/", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-@router.api_route("/classrooms", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_classroom_service_root(
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Course Service - Classrooms root"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.course_service_request(
-        path="/api/v1/classrooms/",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-@router.api_route("/classrooms/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_classroom_service(
-    path: str,
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Course Service - Classrooms"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.course_service_request(
-        path=f"/api/v1/classrooms/{path}",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-@router.api_route("/enrollments/", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-@router.api_route("/enrollments", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_enrollment_service_root(
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Course Service - Enrollments root"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.course_service_request(
-        path="/api/v1/enrollments/",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-@router.api_route("/enrollments/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_enrollment_service(
-    path: str,
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Course Service - Enrollments"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.course_service_request(
-        path=f"/api/v1/enrollments/{path}",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-@router.api_route("/schedules/", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-@router.api_route("/schedules", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_schedule_service_root(
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Course Service - Schedules root"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.course_service_request(
-        path="/api/v1/schedules/",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-@router.api_route("/schedules/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_schedule_service(
-    path: str,
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Course Service - Schedules"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.course_service_request(
-        path=f"/api/v1/schedules/{path}",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-# Attendance Service routes
-@router.api_route("/attendance/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_attendance_service(
-    path: str,
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Attendance Service"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.attendance_service_request(
-        path=f"/api/v1/attendance/{path}",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-@router.api_route("/gps/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_gps_service(
-    path: str,
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Attendance Service - GPS"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
-
-    return await ProxyService.attendance_service_request(
-        path=f"/api/v1/gps/{path}",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
-
-
-# Notification Service routes
-@router.api_route("/notifications/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-async def proxy_notification_service(
-    path: str,
-    request: Request,
-    current_user: Optional[dict] = Depends(get_current_user_optional)
-):
-    """Proxy requests to Notification Service"""
-    body = await get_request_body(request)
-    query_params = dict(request.query_params)
-    headers = dict(request.headers)
+async def authenticate(request: Request, route: Route) -> Optional[dict]:
+    """Apply the route's auth requirement; returns the JWT payload when there is one"""
+    if route.auth == "none":
+        return None
 
-    return await ProxyService.notification_service_request(
-        path=f"/api/v1/notifications/{path}",
-        method=request.method,
-        headers=headers,
-        json_data=body,
-        query_params=query_params
-    )
+    authorization = request.headers.get("authorization")
+    if route.auth == "required":
+        if not authorization:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return await get_current_user_required(authorization)
+
+    return await get_current_user_optional(authorization)
+
+
+async def forward(request: Request, route: Route, path: str):
+    """
+    Forward a request to the route's microservice.
+
+    In passthrough mode the raw bytes and headers are streamed both ways and the
+    upstream status code is kept. Routes with parse_body go through the JSON
+    path instead. GETs on cached routes are answered by the response cache;
+    writes invalidate the route's entries and those of the routes it lists in
+    `invalidates`.
+    """
+    service_url = upstream_pool.upstreams[route.upstream]
+    cached = route.cache is not None and settings.response_cache_enabled
+
+    if cached and request.method == "GET":
+        return await response_cache.serve(request, route, service_url, path)
+
+    if settings.proxy_passthrough and not route.parse_body:
+        response = await ProxyService.stream_request(
+            service_url, path, request, timeout=route.timeout, retry=route.retry
+        )
+    else:
+        body = await get_request_body(request)
+        response = await ProxyService.forward_request(
+            service_url=service_url,
+            path=path,
+            method=request.method,
+            headers=dict(request.headers),
+            json_data=body,
+            query_params=dict(request.query_params),
+            timeout=route.timeout,
+            retry=route.retry
+        )
+
+    if settings.response_cache_enabled and request.method not in ("GET", "HEAD", "OPTIONS"):
+        for prefix in {route.prefix, *route.invalidates}:
+            response_cache.invalidate(prefix)
+    return response
+
+
+@router.api_route("/{path:path}", methods=sorted(SUPPORTED_METHODS))
+async def dispatch(path: str, request: Request):
+    """Proxy any /api/v1 request to the microservice that owns its route"""
+    match = route_table.match(request.url.path)
+    if match is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    route, upstream_path = match
+    request.state.route = route
+    request.state.user = await authenticate(request, route)
+    await enforce_rate_limit(request, route.rate_limit)
+
+    return await forward(request, route, upstream_path)
@@ -0,0 +1,158 @@
+"""Per-upstream circuit breakers and concurrency bulkheads"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from loguru import logger
+
+from ..core.config import get_settings
+
+settings = get_settings()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Count-based circuit breaker for one upstream.
+
+    The outcome (failed, slow) of the last `UPSTREAM_BREAKER_WINDOW` calls is
+    kept. Once the window holds `UPSTREAM_BREAKER_MIN_CALLS` calls and either
+    the failure rate or the slow-call rate reaches its threshold, the breaker
+    opens and calls fail fast. After `UPSTREAM_BREAKER_OPEN_SECONDS` it lets a
+    few probe calls through (half-open): if they all succeed it closes again,
+    one failure reopens it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=settings.upstream_breaker_window)
+        self._probes_in_flight = 0
+        self._probes_succeeded = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; rejected calls are counted"""
+        if not settings.upstream_breaker_enabled or self.state == CLOSED:
+            return True
+
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < settings.upstream_breaker_open_seconds:
+                self.rejected += 1
+                return False
+            self._transition(HALF_OPEN)
+
+        if self._probes_in_flight >= settings.upstream_breaker_half_open_calls:
+            self.rejected += 1
+            return False
+        self._probes_in_flight += 1
+        return True
+
+    def record(self, failed: bool, duration: float):
+        """Outcome of a call admitted by allow()"""
+        if not settings.upstream_breaker_enabled:
+            return
+
+        slow = duration >= settings.upstream_breaker_slow_call_seconds
+
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if failed or slow:
+                self._transition(OPEN)
+                return
+            self._probes_succeeded += 1
+            if self._probes_succeeded >= settings.upstream_breaker_half_open_calls:
+                self._transition(CLOSED)
+            return
+
+        if self.state == OPEN:
+            # Call admitted before the breaker opened
+            return
+
+        self._window.append((failed, slow))
+        if len(self._window) < settings.upstream_breaker_min_calls:
+            return
+        failure_rate, slow_rate = self.rates()
+        if (
+            failure_rate >= settings.upstream_breaker_failure_rate
+            or slow_rate >= settings.upstream_breaker_slow_call_rate
+        ):
+            logger.error(
+                f"🔌 Circuit opened for {self.name}: failure rate {failure_rate:.0%}, "
+                f"slow calls {slow_rate:.0%} over the last {len(self._window)} calls"
+            )
+            self._transition(OPEN)
+
+    def rates(self) -> Tuple[float, float]:
+        if not self._window:
+            return 0.0, 0.0
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, slow in self._window if slow)
+        return failures / len(self._window), slow / len(self._window)
+
+    def retry_after(self) -> int:
+        if self.state != OPEN:
+            return 1
+        remaining = settings.upstream_breaker_open_seconds - (time.monotonic() - self.opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def _transition(self, state: str):
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+        elif state == HALF_OPEN:
+            logger.info(f"🔌 Circuit half-open for {self.name}, probing")
+        elif state == CLOSED:
+            logger.info(f"🔌 Circuit closed for {self.name}")
+            self._window.clear()
+
+        self.state = state
+        self._probes_in_flight = 0
+        self._probes_succeeded = 0
+
+    def status(self) -> Dict[str, object]:
+        failure_rate, slow_rate = self.rates()
+        return {
+            "state": self.state,
+            "failure_rate": round(failure_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "calls_in_window": len(self._window),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_after": self.retry_after() if self.state == OPEN else None,
+        }
+
+
+class Bulkhead:
+    """Caps concurrent in-flight calls to one upstream.
+
+    A call waits at most `UPSTREAM_BULKHEAD_WAIT` seconds for a slot, so when
+    a slow upstream holds all of its slots the extra requests are rejected
+    instead of queueing on the event loop.
+    """
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+        self.in_use = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def acquire(self) -> bool:
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=settings.upstream_bulkhead_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        self.in_use += 1
+        return True
+
+    def release(self):
+        self.in_use -= 1
+        self._semaphore.release()
+
+    def status(self) -> Dict[str, int]:
+        return {"max_concurrent": self.max_concurrent, "in_use": self.in_use, "rejected": self.rejected}
@@ -1,13 +1,51 @@
 """Proxy service for routing requests to microservices"""
-from typing import Optional, Dict, Any
+import asyncio
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable, Iterable, Tuple
 import httpx
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from loguru import logger
 
 from ..core.config import get_settings
+from ..core.routes import RetryPolicy
+from .upstream import upstream_pool
 
 settings = get_settings()
 
+SUPPORTED_METHODS = {"GET", "POST", "PUT", "DELETE", "PATCH"}
+BODY_METHODS = {"POST", "PUT", "PATCH"}
+
+HOP_BY_HOP_HEADERS = [
+    "content-length",
+    "transfer-encoding",
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "upgrade",
+    "host"
+]
+
+# Passthrough keeps the body framing headers: the bytes are forwarded unchanged
+PASSTHROUGH_DROPPED_REQUEST_HEADERS = {h for h in HOP_BY_HOP_HEADERS if h != "content-length"}
+PASSTHROUGH_DROPPED_RESPONSE_HEADERS = PASSTHROUGH_DROPPED_REQUEST_HEADERS - {"host"}
+
+
+class UpstreamStreamingResponse(StreamingResponse):
+    """StreamingResponse that releases its upstream response once sent, even if the client left before the body started"""
+
+    def __init__(self, content: AsyncIterator[bytes], status_code: int, on_close: Callable[[], Awaitable[None]]):
+        super().__init__(content, status_code=status_code)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
 
 class ProxyService:
     """Service for proxying requests to microservices"""
@@ -19,86 +57,249 @@ class ProxyService:
         method: str = "GET",
         headers: Optional[Dict[str, str]] = None,
         json_data: Optional[Dict[str, Any]] = None,
-        query_params: Optional[Dict[str, Any]] = None
+        query_params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None
     ) -> Dict[str, Any]:
         """Forward request to microservice"""
 
         url = f"{service_url}{path}"
 
+        if method not in SUPPORTED_METHODS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported HTTP method: {method}"
+            )
+
+        # Prepare headers
+        request_headers = headers or {}
+
+        # Remove hop-by-hop and conflicting headers
+        for h in HOP_BY_HOP_HEADERS:
+            request_headers.pop(h, None)
+
+        # Reuse the upstream's pooled keep-alive connections
+        client = upstream_pool.client(service_url)
+        started = await upstream_pool.begin(service_url)
+        error = None
+
         try:
-            async with httpx.AsyncClient(timeout=settings.request_timeout) as client:
-                # Prepare headers
-                request_headers = headers or {}
-
-                # Remove hop-by-hop and conflicting headers
-                for h in [
-                    "content-length",
-                    "transfer-encoding",
-                    "connection",
-                    "keep-alive",
-                    "proxy-authenticate",
-                    "proxy-authorization",
-                    "te",
-                    "trailer",
-                    "upgrade",
-                    "host"
-                ]:
-                    request_headers.pop(h, None)
-
-                # Make request based on method
-                if method == "GET":
-                    response = await client.get(url, headers=request_headers, params=query_params)
-                elif method == "POST":
-                    response = await client.post(url, headers=request_headers, json=json_data, params=query_params)
-                elif method == "PUT":
-                    response = await client.put(url, headers=request_headers, json=json_data, params=query_params)
-                elif method == "DELETE":
-                    response = await client.delete(url, headers=request_headers, params=query_params)
-                elif method == "PATCH":
-                    response = await client.patch(url, headers=request_headers, json=json_data, params=query_params)
-                else:
+            response = await ProxyService._send_with_retry(
+                lambda: client.request(
+                    method,
+                    url,
+                    headers=request_headers,
+                    json=json_data if method in BODY_METHODS else None,
+                    params=query_params,
+                    timeout=upstream_pool.timeout(timeout)
+                ),
+                retry, method, service_url, path
+            )
+        except Exception as e:
+            upstream_pool.record(service_url, started, error=e)
+            upstream_pool.end(service_url, started, e)
+            ProxyService._raise_for_transport_error(e, service_url, path)
+
+        upstream_pool.record(service_url, started, status_code=response.status_code)
+
+        try:
+            # Return response
+            if response.status_code >= 400:
+                logger.warning(f"Microservice error: {service_url}{path} - Status: {response.status_code}")
+                try:
+                    error_data = response.json()
+                    raise HTTPException(
+                        status_code=response.status_code,
+                        detail=error_data.get("detail", "Microservice error")
+                    )
+                except ValueError:
                     raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Unsupported HTTP method: {method}"
+                        status_code=response.status_code,
+                        detail=response.text or "Microservice error"
                     )
 
-                # Return response
-                if response.status_code >= 400:
-                    logger.warning(f"Microservice error: {service_url}{path} - Status: {response.status_code}")
-                    try:
-                        error_data = response.json()
-                        raise HTTPException(
-                            status_code=response.status_code,
-                            detail=error_data.get("detail", "Microservice error")
-                        )
-                    except ValueError:
-                        raise HTTPException(
-                            status_code=response.status_code,
-                            detail=response.text or "Microservice error"
-                        )
-
-                return response.json()
-
-        except httpx.TimeoutException:
+            return response.json()
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            error = e
+            ProxyService._raise_for_transport_error(e, service_url, path)
+        finally:
+            upstream_pool.end(service_url, started, error)
+
+    @staticmethod
+    async def _send_with_retry(
+        send: Callable[[], Awaitable[httpx.Response]],
+        retry: Optional[RetryPolicy],
+        method: str,
+        service_url: str,
+        path: str
+    ) -> httpx.Response:
+        """Run `send`, retrying connection failures and retryable statuses per the route's policy"""
+        attempts = retry.attempts if retry is not None and method in retry.methods else 1
+        if attempts <= 1:
+            return await send()
+
+        for attempt in range(1, attempts + 1):
+            try:
+                response = await send()
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"🔁 Retrying {method} {service_url}{path} after {e.__class__.__name__} ({attempt}/{attempts})")
+            else:
+                if response.status_code not in retry.on_status or attempt == attempts:
+                    return response
+                await response.aclose()
+                logger.warning(f"🔁 Retrying {method} {service_url}{path} after status {response.status_code} ({attempt}/{attempts})")
+            await asyncio.sleep(retry.backoff * 2 ** (attempt - 1))
+
+    @staticmethod
+    async def _send_raw(
+        service_url: str,
+        path: str,
+        request: Request,
+        stream: bool,
+        dropped_headers: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None
+    ) -> Tuple[httpx.Response, float]:
+        """Send the client's request upstream byte for byte; returns the response and its start time"""
+        method = request.method
+        if method not in SUPPORTED_METHODS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported HTTP method: {method}"
+            )
+
+        url = f"{service_url}{path}"
+        if request.url.query:
+            url = f"{url}?{request.url.query}"
+
+        dropped = PASSTHROUGH_DROPPED_REQUEST_HEADERS.union(dropped_headers)
+        request_headers = [
+            (name, value) for name, value in request.headers.raw
+            if name.decode("latin-1").lower() not in dropped
+        ]
+        has_body = method in BODY_METHODS or "content-length" in request.headers or "transfer-encoding" in request.headers
+
+        client = upstream_pool.client(service_url)
+        started = await upstream_pool.begin(service_url)
+
+        def send() -> Awaitable[httpx.Response]:
+            upstream_request = client.build_request(
+                method,
+                url,
+                headers=request_headers,
+                content=request.stream() if has_body else None,
+                timeout=upstream_pool.timeout(timeout)
+            )
+            return client.send(upstream_request, stream=stream)
+
+        try:
+            # A streamed request body cannot be replayed, so only bodiless requests are retried
+            response = await ProxyService._send_with_retry(
+                send, None if has_body else retry, method, service_url, path
+            )
+        except Exception as e:
+            upstream_pool.record(service_url, started, error=e)
+            upstream_pool.end(service_url, started, e)
+            ProxyService._raise_for_transport_error(e, service_url, path)
+
+        upstream_pool.record(service_url, started, status_code=response.status_code)
+        if response.status_code >= 400:
+            logger.warning(f"Microservice error: {service_url}{path} - Status: {response.status_code}")
+
+        return response, started
+
+    @staticmethod
+    async def stream_request(
+        service_url: str,
+        path: str,
+        request: Request,
+        timeout: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None
+    ) -> StreamingResponse:
+        """
+        Forward a request as raw bytes and stream the upstream response back unchanged.
+
+        Status code, headers and body (JSON, CSV, files...) reach the client as
+        the microservice sent them; nothing is parsed or re-serialized.
+        """
+        response, started = await ProxyService._send_raw(
+            service_url, path, request, stream=True, timeout=timeout, retry=retry
+        )
+
+        released = False
+
+        async def release(error: Optional[BaseException] = None):
+            nonlocal released
+            if released:
+                return
+            released = True
+            await response.aclose()
+            upstream_pool.end(service_url, started, error)
+
+        async def body() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in response.aiter_raw():
+                    yield chunk
+            except Exception as e:
+                logger.error(f"Upstream stream interrupted: {service_url}{path}: {e}")
+                await release(e)
+                raise
+
+        passthrough = UpstreamStreamingResponse(body(), status_code=response.status_code, on_close=release)
+        passthrough.raw_headers = [
+            (name.lower(), value) for name, value in response.headers.raw
+            if name.decode("latin-1").lower() not in PASSTHROUGH_DROPPED_RESPONSE_HEADERS
+        ]
+        return passthrough
+
+    @staticmethod
+    async def fetch_request(
+        service_url: str,
+        path: str,
+        request: Request,
+        dropped_headers: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None
+    ) -> httpx.Response:
+        """Forward a request as raw bytes and return the fully read (decoded) upstream response"""
+        response, started = await ProxyService._send_raw(
+            service_url, path, request, stream=False, dropped_headers=dropped_headers,
+            timeout=timeout, retry=retry
+        )
+        upstream_pool.end(service_url, started)
+        return response
+
+    @staticmethod
+    def _raise_for_transport_error(error: Exception, service_url: str, path: str):
+        """Map an httpx error raised before any response arrived to a gateway HTTP error"""
+        if isinstance(error, httpx.PoolTimeout):
+            logger.error(f"No free upstream connection for {service_url}{path}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Microservice is busy, please retry"
+            )
+        if isinstance(error, httpx.TimeoutException):
             logger.error(f"Timeout calling {service_url}{path}")
             raise HTTPException(
                 status_code=status.HTTP_504_GATEWAY_TIMEOUT,
                 detail=f"Request to microservice timed out"
             )
-        except httpx.ConnectError:
+        if isinstance(error, httpx.ConnectError):
             logger.error(f"Connection error to {service_url}{path}")
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail=f"Could not connect to microservice"
             )
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Error forwarding request: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Internal gateway error"
-            )
+        logger.error(f"Error forwarding request: {str(error)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal gateway error"
+        )
 
     @staticmethod
     async def user_service_request(path: str, method: str = "GET", **kwargs) -> Dict[str, Any]:
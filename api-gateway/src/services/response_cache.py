@@ -0,0 +1,279 @@
+"""In-memory cache for idempotent GET responses of read-heavy catalog routes"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+import httpx
+from fastapi import HTTPException, Request, Response
+from loguru import logger
+
+from ..core.config import get_settings
+from ..core.routes import Route
+from ..core.security import SecurityService
+from .proxy_service import ProxyService, PASSTHROUGH_DROPPED_RESPONSE_HEADERS
+
+settings = get_settings()
+
+# Conditional headers are answered by the gateway, never forwarded upstream
+CONDITIONAL_REQUEST_HEADERS = ("if-none-match", "if-modified-since")
+
+# The buffered body is already decoded, so its framing headers are recomputed
+BUFFERED_DROPPED_HEADERS = PASSTHROUGH_DROPPED_RESPONSE_HEADERS | {"content-length", "content-encoding"}
+UNCACHEABLE_HEADERS = BUFFERED_DROPPED_HEADERS | {"set-cookie", "date", "etag", "age"}
+
+
+class CacheEntry(NamedTuple):
+    prefix: str
+    status_code: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: str
+    stored_at: float
+    expires_at: float
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Cache-Control header into {directive: argument}"""
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an entity tag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+class ResponseCache:
+    """LRU cache of upstream GET responses for routes with a cache policy.
+
+    Entries are keyed on path, normalized query string and the identity scope
+    of the route: `public` shares one entry among all callers, `role` keeps one
+    per JWT role and `user` one per user id. Every cached response carries an
+    ETag, so a client revalidating with If-None-Match gets a 304 without body.
+    Writes through the gateway drop the cached entries of their route.
+
+    Concurrent misses on the same key are coalesced: the first request fetches
+    upstream and the others wait for its result (singleflight). Only cacheable
+    responses and transport errors are shared; if the fetch yields anything
+    else, each waiter fetches on its own.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, Tuple[str, "asyncio.Future[Optional[CacheEntry]]"]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.coalesced = 0
+
+    async def serve(self, request: Request, route: Route, service_url: str, path: str) -> Response:
+        """Answer a GET from the cache, or fetch it upstream and store it when allowed"""
+        directives = parse_cache_control(request.headers.get("cache-control"))
+        key = self._key(request, path, route.cache.scope)
+        now = time.monotonic()
+
+        if not ({"no-cache", "no-store"} & directives.keys() or directives.get("max-age") == "0"):
+            entry = self._lookup(key, now)
+            if entry is not None:
+                self.hits += 1
+                return self._respond(request, entry, now, "HIT")
+
+        self.misses += 1
+
+        inflight = self._inflight.get(key) if settings.response_cache_coalesce else None
+        if inflight is not None:
+            self.coalesced += 1
+            entry = await asyncio.shield(inflight[1])
+            if entry is not None:
+                return self._respond(request, entry, time.monotonic(), "COALESCED")
+
+        future = asyncio.get_running_loop().create_future()
+        if settings.response_cache_coalesce:
+            self._inflight[key] = (route.prefix, future)
+
+        entry = None
+        try:
+            upstream = await ProxyService.fetch_request(
+                service_url, path, request, dropped_headers=CONDITIONAL_REQUEST_HEADERS,
+                timeout=route.timeout, retry=route.retry
+            )
+            entry = self._build_entry(upstream, route, now)
+        except HTTPException as e:
+            # Upstream unreachable, timed out or rejected by a breaker: the same for every waiter
+            if not future.done():
+                future.set_exception(e)
+                future.exception()  # retrieved here; waiters re-raise it
+            raise
+        finally:
+            if not future.done():
+                future.set_result(entry)
+            # Keep entries fetched before an invalidation out of the cache
+            current = self._inflight.get(key) is not None and self._inflight[key][1] is future
+            if current:
+                del self._inflight[key]
+
+        if entry is None:
+            response = Response(content=upstream.content, status_code=upstream.status_code)
+            response.raw_headers.extend(
+                (name.lower(), value) for name, value in upstream.headers.raw
+                if name.decode("latin-1").lower() not in BUFFERED_DROPPED_HEADERS
+            )
+            return response
+
+        if "no-store" not in directives and (current or not settings.response_cache_coalesce):
+            self._store(key, entry)
+        return self._respond(request, entry, now, "MISS")
+
+    def invalidate(self, prefix: str):
+        """Drop every entry cached under a route prefix"""
+        stale = [key for key, entry in self._entries.items() if entry.prefix == prefix]
+        for key in stale:
+            self._remove(key)
+        for key in [key for key, (inflight_prefix, _) in self._inflight.items() if inflight_prefix == prefix]:
+            del self._inflight[key]
+        if stale:
+            self.invalidations += len(stale)
+            logger.debug(f"🧹 Response cache: dropped {len(stale)} entries under {prefix}")
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def metrics(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.response_cache_enabled,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": settings.response_cache_max_entries,
+            "max_bytes": settings.response_cache_max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "not_modified": self.not_modified,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
+
+    @staticmethod
+    def _identity(request: Request, scope: str) -> str:
+        if scope == "public":
+            return "public"
+
+        # The dispatcher stores the verified payload on the request
+        payload = getattr(request.state, "user", None)
+        authorization = request.headers.get("authorization", "")
+        if payload is None and authorization.startswith("Bearer "):
+            try:
+                payload = SecurityService.verify_token(authorization.replace("Bearer ", ""))
+            except HTTPException:
+                payload = None
+        if not payload:
+            return "anonymous"
+
+        if scope == "role":
+            return f"role:{payload.get('role')}"
+        return f"user:{payload.get('user_id', payload.get('sub'))}"
+
+    def _key(self, request: Request, path: str, scope: str) -> str:
+        query = urlencode(sorted(request.query_params.multi_items()))
+        return f"{self._identity(request, scope)}|{path}?{query}"
+
+    def _lookup(self, key: str, now: float) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _build_entry(self, upstream: httpx.Response, route: Route, now: float) -> Optional[CacheEntry]:
+        """Cache entry for an upstream response, or None when it must not be stored"""
+        if upstream.status_code != 200 or "set-cookie" in upstream.headers:
+            return None
+
+        directives = parse_cache_control(upstream.headers.get("cache-control"))
+        if {"no-store", "no-cache"} & directives.keys():
+            return None
+        if "private" in directives and route.cache.scope == "public":
+            return None
+
+        ttl = route.cache.ttl
+        for directive in ("s-maxage", "max-age"):
+            if (directives.get(directive) or "").isdigit():
+                ttl = min(ttl, int(directives[directive]))
+                break
+        if ttl <= 0:
+            return None
+
+        body = upstream.content
+        if len(body) > settings.response_cache_max_entry_bytes:
+            return None
+
+        etag = upstream.headers.get("etag") or f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        headers = [
+            (name.lower(), value) for name, value in upstream.headers.raw
+            if name.decode("latin-1").lower() not in UNCACHEABLE_HEADERS
+        ]
+        return CacheEntry(route.prefix, upstream.status_code, headers, body, etag, now, now + ttl)
+
+    def _store(self, key: str, entry: CacheEntry):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self.bytes += len(entry.body)
+        self.stores += 1
+
+        while self._entries and (
+            len(self._entries) > settings.response_cache_max_entries
+            or self.bytes > settings.response_cache_max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.bytes -= len(entry.body)
+
+    def _respond(self, request: Request, entry: CacheEntry, now: float, outcome: str) -> Response:
+        validators = [
+            (b"etag", entry.etag.encode("latin-1")),
+            (b"age", str(int(now - entry.stored_at)).encode("latin-1")),
+            (b"x-cache", outcome.encode("latin-1")),
+        ]
+
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.not_modified += 1
+            response = Response(status_code=304)
+            response.raw_headers.extend(
+                (name, value) for name, value in entry.headers if name in (b"cache-control", b"vary")
+            )
+        else:
+            response = Response(content=entry.body, status_code=entry.status_code)
+            response.raw_headers.extend(entry.headers)
+
+        response.raw_headers.extend(validators)
+        return response
+
+
+response_cache = ResponseCache()
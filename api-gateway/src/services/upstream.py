@@ -0,0 +1,215 @@
+"""Long-lived, connection-pooled HTTP clients for the upstream microservices"""
+import time
+from typing import Dict, Optional
+import httpx
+from fastapi import HTTPException, status
+from loguru import logger
+
+from ..core.config import get_settings
+from .circuit_breaker import Bulkhead, CircuitBreaker, OPEN
+
+settings = get_settings()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class UpstreamStats:
+    """Request counters for one upstream"""
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.pool_timeouts = 0
+        self.total_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        completed = self.requests - self.in_flight
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "pool_timeouts": self.pool_timeouts,
+            "avg_latency_ms": round(self.total_seconds / completed * 1000, 2) if completed else None,
+        }
+
+
+class UpstreamPool:
+    """One httpx.AsyncClient per upstream service, opened at startup and reused for every request.
+
+    Connections are kept alive between requests, so each hop skips the TCP
+    (and TLS) handshake. Each upstream gets its own connection cap, so a slow
+    service cannot take every socket from the others.
+    """
+
+    def __init__(self):
+        self.upstreams: Dict[str, str] = {
+            "user": settings.user_service_url,
+            "course": settings.course_service_url,
+            "attendance": settings.attendance_service_url,
+            "notification": settings.notification_service_url,
+        }
+        self._names = {url.rstrip("/"): name for name, url in self.upstreams.items()}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.stats: Dict[str, UpstreamStats] = {name: UpstreamStats() for name in self.upstreams}
+        self.breakers: Dict[str, CircuitBreaker] = {name: CircuitBreaker(name) for name in self.upstreams}
+        self.bulkheads: Dict[str, Bulkhead] = {
+            name: Bulkhead(settings.upstream_bulkhead_overrides.get(name, settings.upstream_bulkhead_max_concurrent))
+            for name in self.upstreams
+        }
+        self.http2 = settings.upstream_http2 and _http2_available()
+
+    async def start(self):
+        if settings.upstream_http2 and not self.http2:
+            logger.warning("⚠️ UPSTREAM_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+
+        for name in self.upstreams:
+            self._clients[name] = self._create_client(name)
+
+        logger.info(
+            f"🔌 Upstream pools ready: {len(self._clients)} services, "
+            f"max {settings.upstream_max_connections} connections each, http2={self.http2}"
+        )
+
+    async def stop(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def _create_client(self, name: str) -> httpx.AsyncClient:
+        max_connections = settings.upstream_max_connections_overrides.get(name, settings.upstream_max_connections)
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(settings.upstream_max_keepalive, max_connections),
+                keepalive_expiry=settings.upstream_keepalive_expiry,
+            ),
+            timeout=self.timeout(),
+            http2=self.http2,
+        )
+
+    def timeout(self, read: Optional[float] = None) -> httpx.Timeout:
+        """Client timeouts with a per-route read timeout"""
+        return httpx.Timeout(
+            connect=settings.upstream_connect_timeout,
+            read=read or settings.request_timeout,
+            write=settings.upstream_write_timeout,
+            pool=settings.upstream_pool_timeout,
+        )
+
+    def name_for(self, service_url: str) -> str:
+        return self._names.get(service_url.rstrip("/"), service_url)
+
+    def client(self, service_url: str) -> httpx.AsyncClient:
+        """Pooled client for an upstream; created on first use outside the app lifespan"""
+        name = self.name_for(service_url)
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = self._create_client(name)
+            self.stats.setdefault(name, UpstreamStats())
+        return client
+
+    async def begin(self, service_url: str) -> float:
+        """Admit a call through the upstream's bulkhead and circuit breaker, or fail fast with 503"""
+        name = self.name_for(service_url)
+        bulkhead = self.bulkheads.get(name)
+        breaker = self.breakers.get(name)
+
+        if bulkhead is not None and not await bulkhead.acquire():
+            logger.warning(f"🚧 Bulkhead full for {name} ({bulkhead.max_concurrent} in flight), rejecting")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Microservice is overloaded, please retry",
+                headers={"Retry-After": "1"}
+            )
+
+        if breaker is not None and not breaker.allow():
+            if bulkhead is not None:
+                bulkhead.release()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Microservice is unavailable, please retry later",
+                headers={"Retry-After": str(breaker.retry_after())}
+            )
+
+        stats = self.stats.setdefault(name, UpstreamStats())
+        stats.requests += 1
+        stats.in_flight += 1
+        return time.perf_counter()
+
+    def record(self, service_url: str, started: float, error: Optional[BaseException] = None, status_code: Optional[int] = None):
+        """Report the outcome of an admitted call, once, when the response headers (or an error) arrive.
+
+        The breaker gets the outcome and the bulkhead slot is freed here rather
+        than in end(): a streamed body (event streams, exports) may stay open
+        for minutes and must not keep the upstream's other calls waiting.
+        """
+        name = self.name_for(service_url)
+        breaker = self.breakers.get(name)
+        if breaker is not None:
+            failed = error is not None or (status_code or 0) >= 500
+            breaker.record(failed, time.perf_counter() - started)
+
+        bulkhead = self.bulkheads.get(name)
+        if bulkhead is not None:
+            bulkhead.release()
+
+    def end(self, service_url: str, started: float, error: Optional[BaseException] = None):
+        """Update counters once the call is over (its body fully read or closed)"""
+        name = self.name_for(service_url)
+        stats = self.stats[name]
+        stats.in_flight -= 1
+        stats.total_seconds += time.perf_counter() - started
+        if isinstance(error, httpx.PoolTimeout):
+            stats.pool_timeouts += 1
+        elif isinstance(error, httpx.TimeoutException):
+            stats.timeouts += 1
+        elif error is not None:
+            stats.errors += 1
+
+    def health(self) -> Dict[str, dict]:
+        """Circuit breaker and bulkhead state per upstream"""
+        return {
+            name: {
+                "url": url,
+                "circuit_breaker": self.breakers[name].status(),
+                "bulkhead": self.bulkheads[name].status(),
+            }
+            for name, url in self.upstreams.items()
+        }
+
+    def open_circuits(self) -> list:
+        return [name for name, breaker in self.breakers.items() if breaker.state == OPEN]
+
+    def metrics(self) -> Dict[str, dict]:
+        """Request counters and connection pool utilization per upstream"""
+        result = {}
+        for name, url in self.upstreams.items():
+            entry = {"url": url, **self.stats[name].as_dict()}
+            client = self._clients.get(name)
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            if pool is not None:
+                connections = list(pool.connections)
+                idle = sum(1 for connection in connections if connection.is_idle())
+                max_connections = pool._max_connections
+                entry["pool"] = {
+                    "max_connections": max_connections,
+                    "connections": len(connections),
+                    "active": len(connections) - idle,
+                    "idle": idle,
+                    "waiting": max(0, len(getattr(pool, "_requests", [])) - (len(connections) - idle)),
+                    "utilization": round((len(connections) - idle) / max_connections, 3) if max_connections else None,
+                }
+            result[name] = entry
+        return result
+
+
+upstream_pool = UpstreamPool()
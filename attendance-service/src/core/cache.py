@@ -0,0 +1,257 @@
+"""Attendance Service Report Cache.
+
+Report responses are cached under keys built from their normalized parameters
+and indexed by the course they cover. Writes invalidate only the entries whose
+course scope and date range include the written record.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from .config import get_settings
+
+settings = get_settings()
+
+ALL_COURSES = "*"
+
+class CacheBackend:
+    """Storage interface for report cache entries and their course index."""
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        raise NotImplementedError
+
+    async def delete(self, keys: List[str]) -> None:
+        raise NotImplementedError
+
+    async def index_add(self, scope: str, key: str, date_range: str, ttl: int) -> None:
+        """Register `key` under a course scope together with its date range."""
+        raise NotImplementedError
+
+    async def index_members(self, scope: str) -> Dict[str, str]:
+        """Return `{key: date_range}` for every entry registered under a scope."""
+        raise NotImplementedError
+
+    async def index_remove(self, scope: str, keys: List[str]) -> None:
+        raise NotImplementedError
+
+class InMemoryLRUBackend(CacheBackend):
+    """Bounded in-process LRU cache for single-node deployments."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._index: Dict[str, Dict[str, str]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, keys: List[str]) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def index_add(self, scope: str, key: str, date_range: str, ttl: int) -> None:
+        self._index.setdefault(scope, {})[key] = date_range
+
+    async def index_members(self, scope: str) -> Dict[str, str]:
+        members = self._index.get(scope, {})
+
+        # Drop index entries whose cache entry was evicted or expired
+        stale = [key for key in members if key not in self._entries]
+        for key in stale:
+            del members[key]
+
+        return dict(members)
+
+    async def index_remove(self, scope: str, keys: List[str]) -> None:
+        members = self._index.get(scope)
+        if not members:
+            return
+        for key in keys:
+            members.pop(key, None)
+
+class RedisBackend(CacheBackend):
+    """Redis-backed cache shared by every attendance-service replica."""
+
+    def __init__(self, redis_url: str, prefix: str = "attendance:reports"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(redis_url, decode_responses=True)
+        self.prefix = prefix
+
+    def _index_key(self, scope: str) -> str:
+        return f"{self.prefix}:index:{scope}"
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def delete(self, keys: List[str]) -> None:
+        if keys:
+            await self.client.delete(*keys)
+
+    async def index_add(self, scope: str, key: str, date_range: str, ttl: int) -> None:
+        index_key = self._index_key(scope)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(index_key, key, date_range)
+            pipe.expire(index_key, ttl)
+            await pipe.execute()
+
+    async def index_members(self, scope: str) -> Dict[str, str]:
+        return await self.client.hgetall(self._index_key(scope))
+
+    async def index_remove(self, scope: str, keys: List[str]) -> None:
+        if keys:
+            await self.client.hdel(self._index_key(scope), *keys)
+
+def _as_date(value: Any) -> Optional[date]:
+    """Normalize datetime/date parameters to a calendar date."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+class ReportCache:
+    """Report result cache with course/date targeted invalidation."""
+
+    def __init__(self, backend: CacheBackend, ttl: int, immutable_ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.immutable_ttl = immutable_ttl
+
+    @staticmethod
+    def build_key(namespace: str, **params: Any) -> str:
+        """Build a cache key from normalized report parameters."""
+        normalized = {
+            name: (value.isoformat() if isinstance(value, (date, datetime)) else value)
+            for name, value in sorted(params.items())
+        }
+        digest = hashlib.sha1(
+            json.dumps(normalized, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"attendance:reports:{namespace}:{digest}"
+
+    def _ttl_for(self, end_date: Optional[date]) -> int:
+        """Past dates are immutable, so closed ranges can be cached much longer."""
+        if end_date is not None and end_date < date.today():
+            return self.immutable_ttl
+        return self.ttl
+
+    async def get_or_compute(
+        self,
+        namespace: str,
+        params: Dict[str, Any],
+        builder: Callable[[], Awaitable[dict]],
+        course_id: Optional[int] = None,
+        start_date: Any = None,
+        end_date: Any = None,
+        store: bool = True,
+    ) -> dict:
+        """Return a cached report or compute, store and index it.
+
+        With `store=False` a miss is computed but not stored: results read from
+        a lagging replica may predate the invalidation that caused the miss.
+        """
+        key = self.build_key(namespace, **params)
+
+        try:
+            cached = await self.backend.get(key)
+            if cached is not None:
+                logger.debug(f"Report cache hit: {namespace}")
+                return json.loads(cached)
+        except Exception as e:
+            logger.warning(f"Report cache read failed, computing report: {e}")
+
+        result = await builder()
+        if not store:
+            return result
+
+        start = _as_date(start_date)
+        end = _as_date(end_date)
+        date_range = f"{start.isoformat() if start else ''}|{end.isoformat() if end else ''}"
+        scope = str(course_id) if course_id is not None else ALL_COURSES
+
+        try:
+            ttl = self._ttl_for(end)
+            await self.backend.set(key, json.dumps(result, default=str), ttl)
+            # The index must outlive the longest-lived entry it points to
+            await self.backend.index_add(scope, key, date_range, max(self.ttl, self.immutable_ttl))
+        except Exception as e:
+            logger.warning(f"Report cache write failed: {e}")
+
+        return result
+
+    async def invalidate(self, course_id: int, class_date: Any) -> int:
+        """Drop every cached report covering `course_id` on `class_date`."""
+        written = _as_date(class_date)
+        removed = 0
+
+        try:
+            for scope in (str(course_id), ALL_COURSES):
+                members = await self.backend.index_members(scope)
+                stale = [key for key, date_range in members.items() if self._covers(date_range, written)]
+                if stale:
+                    await self.backend.delete(stale)
+                    await self.backend.index_remove(scope, stale)
+                    removed += len(stale)
+        except Exception as e:
+            logger.warning(f"Report cache invalidation failed for course {course_id}: {e}")
+
+        if removed:
+            logger.info(f"🧹 Invalidated {removed} cached report(s) for course {course_id} on {written}")
+
+        return removed
+
+    @staticmethod
+    def _covers(date_range: str, written: Optional[date]) -> bool:
+        """Check whether an indexed `start|end` range includes a written date."""
+        if written is None:
+            return True
+
+        start, _, end = date_range.partition("|")
+        if start and written < date.fromisoformat(start):
+            return False
+        if end and written > date.fromisoformat(end):
+            return False
+        return True
+
+def _create_backend() -> CacheBackend:
+    """Create the cache backend selected in settings."""
+    if settings.cache_backend == "redis":
+        logger.info(f"Report cache backend: redis ({settings.redis_url})")
+        return RedisBackend(settings.redis_url)
+
+    return InMemoryLRUBackend(max_entries=settings.cache_max_entries)
+
+report_cache = ReportCache(
+    _create_backend(),
+    ttl=settings.cache_expiration,
+    immutable_ttl=settings.cache_immutable_expiration,
+)
@@ -1,6 +1,7 @@
 """Attendance Service Configuration using Pydantic BaseSettings."""
 
 from functools import lru_cache
+from typing import Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -18,6 +19,13 @@ class AttendanceServiceSettings(BaseSettings):
         alias="DATABASE_URL"
     )
 
+    # Optional read replica for reports and statistics (same instance under a read-only role also works)
+    database_read_url: Optional[str] = Field(default=None, alias="DATABASE_READ_URL")
+    read_pool_size: int = Field(default=10, alias="READ_POOL_SIZE")
+    read_max_overflow: int = Field(default=10, alias="READ_MAX_OVERFLOW")
+    read_max_replica_lag: float = Field(default=10.0, alias="READ_MAX_REPLICA_LAG")  # seconds, beyond this reads go to the primary
+    read_lag_check_interval: float = Field(default=5.0, alias="READ_LAG_CHECK_INTERVAL")  # seconds between lag checks
+
     # Security - JWT for inter-service authentication
     secret_key: str = Field(
         default="user-service-secret-key-change-in-production",
@@ -30,6 +38,17 @@ class AttendanceServiceSettings(BaseSettings):
     gps_accuracy_threshold: float = Field(default=20.0, alias="GPS_ACCURACY_THRESHOLD")  # meters
     earth_radius_km: float = Field(default=6371.0, alias="EARTH_RADIUS_KM")  # Earth radius in km
 
+    # GPS prefilter (local checks before upstream calls)
+    campus_prefilter_enabled: bool = Field(default=True, alias="CAMPUS_PREFILTER_ENABLED")
+    campus_geofence_refresh: int = Field(default=300, alias="CAMPUS_GEOFENCE_REFRESH")  # seconds between classroom reloads
+    campus_geofence_margin_meters: float = Field(default=50.0, alias="CAMPUS_GEOFENCE_MARGIN_METERS")  # added to each classroom gps_radius
+    negative_cache_not_enrolled_ttl: int = Field(default=300, alias="NEGATIVE_CACHE_NOT_ENROLLED_TTL")  # seconds, 0 disables
+    negative_cache_no_schedule_ttl: int = Field(default=60, alias="NEGATIVE_CACHE_NO_SCHEDULE_TTL")  # seconds, 0 disables
+    negative_cache_max_entries: int = Field(default=10000, alias="NEGATIVE_CACHE_MAX_ENTRIES")
+
+    # GPS ingest write path: Core inserts instead of the ORM unit of work
+    fast_ingest_enabled: bool = Field(default=False, alias="FAST_INGEST_ENABLED")
+
     # Attendance Rules
     min_time_between_records: int = Field(default=300, alias="MIN_TIME_BETWEEN_RECORDS")  # seconds (5 min)
     max_early_arrival: int = Field(default=1800, alias="MAX_EARLY_ARRIVAL")  # seconds (30 min)
@@ -38,6 +57,43 @@ class AttendanceServiceSettings(BaseSettings):
     # Redis Configuration (for caching and background tasks)
     redis_url: str = Field(default="redis://localhost:6379/0", alias="REDIS_URL")
     cache_expiration: int = Field(default=3600, alias="CACHE_EXPIRATION")  # seconds
+    cache_backend: str = Field(default="memory", alias="CACHE_BACKEND")  # memory, redis
+    cache_max_entries: int = Field(default=1024, alias="CACHE_MAX_ENTRIES")  # in-process LRU size
+    cache_immutable_expiration: int = Field(default=2592000, alias="CACHE_IMMUTABLE_EXPIRATION")  # seconds (30 days, past dates)
+
+    # Background report jobs
+    report_job_workers: int = Field(default=2, alias="REPORT_JOB_WORKERS")  # concurrent computations (DB connections)
+    report_job_max_queued: int = Field(default=100, alias="REPORT_JOB_MAX_QUEUED")
+    report_job_result_ttl: int = Field(default=3600, alias="REPORT_JOB_RESULT_TTL")  # seconds
+
+    # Automatic absence sweeper
+    absence_sweeper_enabled: bool = Field(default=True, alias="ABSENCE_SWEEPER_ENABLED")
+    absence_sweep_interval: int = Field(default=60, alias="ABSENCE_SWEEP_INTERVAL")  # seconds between passes
+    absence_sweep_grace_minutes: int = Field(default=20, alias="ABSENCE_SWEEP_GRACE_MINUTES")  # after end_time (check-ins accepted until end + 15 min)
+    absence_sweep_lookback_hours: int = Field(default=6, alias="ABSENCE_SWEEP_LOOKBACK_HOURS")  # catch-up window after restarts
+    absence_sweep_lease_seconds: int = Field(default=300, alias="ABSENCE_SWEEP_LEASE_SECONDS")
+    absence_sweep_concurrency: int = Field(default=4, alias="ABSENCE_SWEEP_CONCURRENCY")
+    absence_sweep_max_attempts: int = Field(default=5, alias="ABSENCE_SWEEP_MAX_ATTEMPTS")  # then the session is marked failed
+
+    # Live attendance sessions
+    session_lifecycle_enabled: bool = Field(default=True, alias="SESSION_LIFECYCLE_ENABLED")
+    session_lifecycle_interval: int = Field(default=30, alias="SESSION_LIFECYCLE_INTERVAL")  # seconds between passes
+    session_open_lead_minutes: int = Field(default=15, alias="SESSION_OPEN_LEAD_MINUTES")  # open before start_time, matches check-in tolerance
+
+    # Live event streams
+    event_bus_backend: str = Field(default="memory", alias="EVENT_BUS_BACKEND")  # memory, redis (multi-replica)
+    sse_heartbeat_seconds: int = Field(default=15, alias="SSE_HEARTBEAT_SECONDS")
+    sse_queue_size: int = Field(default=100, alias="SSE_QUEUE_SIZE")  # per connection, oldest dropped when full
+    gps_tail_buffer_size: int = Field(default=1000, alias="GPS_TAIL_BUFFER_SIZE")  # recent GPS events kept in memory
+
+    # Occupancy heatmap tiles
+    occupancy_aggregator_enabled: bool = Field(default=True, alias="OCCUPANCY_AGGREGATOR_ENABLED")
+    occupancy_interval: int = Field(default=60, alias="OCCUPANCY_INTERVAL")  # seconds between passes
+    occupancy_cell_meters: float = Field(default=5.0, alias="OCCUPANCY_CELL_METERS")  # grid cell edge
+    occupancy_window: str = Field(default="hour", alias="OCCUPANCY_WINDOW")  # hour, day
+    occupancy_max_distance_meters: float = Field(default=150.0, alias="OCCUPANCY_MAX_DISTANCE_METERS")  # farther fixes are not binned
+    occupancy_settle_seconds: int = Field(default=60, alias="OCCUPANCY_SETTLE_SECONDS")  # let in-flight events commit first
+    occupancy_batch_size: int = Field(default=50000, alias="OCCUPANCY_BATCH_SIZE")  # events per pass
 
     # Inter-service Communication
     user_service_url: str = Field(default="http://localhost:8001", alias="USER_SERVICE_URL")
@@ -2,7 +2,10 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy import text
 from typing import AsyncGenerator
+from loguru import logger
+import time
 from .config import get_settings
 
 settings = get_settings()
@@ -27,6 +30,82 @@ AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
 )
 
+# Optional read-only engine for reports, with its own pool budget so report
+# runs cannot exhaust the connections used by GPS ingestion
+read_engine = create_async_engine(
+    settings.database_read_url,
+    echo=settings.debug,
+    future=True,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    pool_size=settings.read_pool_size,
+    max_overflow=settings.read_max_overflow,
+) if settings.database_read_url else None
+
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+    autocommit=False,
+) if read_engine else None
+
+# Zero on a primary or a caught-up standby, otherwise seconds since the last replayed transaction
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+class ReplicaLagGuard:
+    """Decides whether the read engine is fit to serve, re-checking at most every interval."""
+
+    def __init__(self, max_lag: float, check_interval: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._healthy = False
+        self._checked_at = 0.0
+
+    async def is_healthy(self) -> bool:
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self._healthy
+
+        self._checked_at = time.monotonic()
+        try:
+            async with read_engine.connect() as conn:
+                lag = float((await conn.execute(REPLICA_LAG_QUERY)).scalar() or 0)
+        except Exception as e:
+            if self._healthy:
+                logger.warning(f"⚠️ Read replica unavailable, using primary: {e}")
+            self._healthy = False
+            return False
+
+        healthy = lag <= self.max_lag
+        if healthy != self._healthy:
+            if healthy:
+                logger.info(f"✅ Read replica in use (lag {lag:.1f}s)")
+            else:
+                logger.warning(f"⚠️ Read replica lag {lag:.1f}s > {self.max_lag}s, using primary")
+        self._healthy = healthy
+        return healthy
+
+replica_guard = ReplicaLagGuard(
+    max_lag=settings.read_max_replica_lag,
+    check_interval=settings.read_lag_check_interval,
+)
+
+async def read_sessionmaker() -> async_sessionmaker:
+    """Session factory for read-only queries: the replica when configured and fresh, else the primary."""
+    if ReadSessionLocal is not None and await replica_guard.is_healthy():
+        return ReadSessionLocal
+    return AsyncSessionLocal
+
+def is_replica_session(session: AsyncSession) -> bool:
+    """Whether a session reads from the (possibly lagging) replica rather than the primary."""
+    return read_engine is not None and session.bind is read_engine
+
 class Base(DeclarativeBase):
     """Base class for all database models."""
     pass
@@ -42,7 +121,30 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Get a database session for reports and statistics."""
+    session_factory = await read_sessionmaker()
+    async with session_factory() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+# Idempotent upgrades for databases created by earlier versions
+# (create_all only creates missing tables, it never alters existing ones)
+SCHEMA_UPGRADES = [
+    "ALTER TYPE attendancesource ADD VALUE IF NOT EXISTS 'SYSTEM_AUTO'",
+    "ALTER TABLE attendance_sessions ADD COLUMN IF NOT EXISTS schedule_id INTEGER",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_sessions_schedule_date "
+    "ON attendance_sessions (schedule_id, session_date)",
+]
+
 async def create_tables():
     """Create database tables."""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+        for statement in SCHEMA_UPGRADES:
+            await conn.execute(text(statement))
\ No newline at end of file
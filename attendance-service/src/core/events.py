@@ -0,0 +1,116 @@
+"""Attendance Service Event Bus.
+
+Live attendance events are fanned out to in-process subscribers (SSE streams).
+With the Redis backend, publishes go through a Redis pub/sub channel so that
+subscribers on every replica receive events ingested by any replica.
+"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+from loguru import logger
+
+from .config import get_settings
+
+settings = get_settings()
+
+class EventBus:
+    """In-process publish/subscribe with bounded per-subscriber queues."""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, event: dict) -> None:
+        self._deliver(channel, event)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[asyncio.Queue]:
+        """Register a queue that receives every event published on `channel`."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        return len(self._subscribers.get(channel, ()))
+
+    def _deliver(self, channel: str, event: dict) -> None:
+        for queue in self._subscribers.get(channel, ()):
+            if queue.full():
+                # Slow consumer: drop its oldest event rather than block the publisher
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+class RedisEventBus(EventBus):
+    """Event bus relayed through Redis pub/sub for multi-replica deployments."""
+
+    def __init__(self, redis_url: str, queue_size: int = 100, prefix: str = "attendance:events"):
+        super().__init__(queue_size)
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(redis_url, decode_responses=True)
+        self.prefix = prefix
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def publish(self, channel: str, event: dict) -> None:
+        await self.client.publish(f"{self.prefix}:{channel}", json.dumps(event, default=str))
+
+    async def _listen(self):
+        pattern = f"{self.prefix}:*"
+        while True:
+            try:
+                pubsub = self.client.pubsub()
+                await pubsub.psubscribe(pattern)
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"][len(self.prefix) + 1:]
+                    self._deliver(channel, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Event bus listener lost Redis connection, retrying: {e}")
+                await asyncio.sleep(1)
+
+def course_channel(course_id: int) -> str:
+    return f"course:{course_id}"
+
+async def publish_event(channel: str, event: dict) -> None:
+    """Publish without letting a bus failure break the write path."""
+    try:
+        await event_bus.publish(channel, event)
+    except Exception as e:
+        logger.warning(f"Event publish failed on {channel}: {e}")
+
+def _create_event_bus() -> EventBus:
+    """Create the event bus selected in settings."""
+    if settings.event_bus_backend == "redis":
+        logger.info(f"Event bus backend: redis ({settings.redis_url})")
+        return RedisEventBus(settings.redis_url, queue_size=settings.sse_queue_size)
+
+    return EventBus(queue_size=settings.sse_queue_size)
+
+event_bus = _create_event_bus()
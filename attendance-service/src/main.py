@@ -9,7 +9,13 @@ import sys
 
 from .core.config import get_settings
 from .core.database import create_tables
-from .routers import gps_router, attendance_router, reports_router
+from .core.events import event_bus
+from .routers import gps_router, attendance_router, reports_router, report_jobs_router
+from .services.report_jobs import report_job_manager
+from .services.absence_sweeper import absence_sweeper
+from .services.session_service import session_lifecycle
+from .services.gps_tail import gps_event_tail
+from .services.occupancy import occupancy_aggregator
 
 settings = get_settings()
 
@@ -34,9 +40,22 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Failed to create database tables: {e}")
         raise
 
+    await event_bus.start()
+    await gps_event_tail.start()
+    await report_job_manager.start()
+    await absence_sweeper.start()
+    await session_lifecycle.start()
+    await occupancy_aggregator.start()
+
     yield
 
     logger.info("🛑 Shutting down Attendance Service...")
+    await occupancy_aggregator.stop()
+    await session_lifecycle.stop()
+    await absence_sweeper.stop()
+    await report_job_manager.stop()
+    await gps_event_tail.stop()
+    await event_bus.stop()
 
 # Create FastAPI application
 app = FastAPI(
@@ -61,6 +80,7 @@ app.add_middleware(
 app.include_router(gps_router, prefix="/api/v1")
 app.include_router(attendance_router, prefix="/api/v1")
 app.include_router(reports_router, prefix="/api/v1")
+app.include_router(report_jobs_router, prefix="/api/v1")
 
 # Health check endpoint
 @app.get("/health")
@@ -90,7 +110,8 @@ async def root():
         "core_endpoints": [
             "POST /api/v1/gps/event - Process GPS event (MAIN ENDPOINT)",
             "GET /api/v1/attendance/records - Get attendance records",
-            "GET /api/v1/reports/attendance-summary - Generate reports"
+            "GET /api/v1/reports/attendance-summary - Generate reports",
+            "POST /api/v1/reports/jobs - Queue background report jobs"
         ],
         "docs": "/docs" if settings.debug else "Documentation disabled in production"
     }
@@ -4,6 +4,9 @@ from .attendance import (
     GPSEvent,
     AttendanceRecord,
     AttendanceSession,
+    AbsenceSweepRun,
+    OccupancyTile,
+    AggregationWatermark,
     EventStatus,
     AttendanceStatus,
     AttendanceSource,
@@ -13,6 +16,9 @@ __all__ = [
     "GPSEvent",
     "AttendanceRecord",
     "AttendanceSession",
+    "AbsenceSweepRun",
+    "OccupancyTile",
+    "AggregationWatermark",
     "EventStatus",
     "AttendanceStatus",
     "AttendanceSource",
@@ -1,9 +1,9 @@
 """Attendance Service Database Models."""
 
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
-from sqlalchemy import String, Boolean, DateTime, func, Text, Integer, Numeric, Enum as SQLEnum
+from sqlalchemy import String, Boolean, Date, DateTime, func, Text, Integer, Numeric, UniqueConstraint, Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column
 from ..core.database import Base
 
@@ -27,6 +27,7 @@ class AttendanceSource(str, Enum):
     MANUAL = "manual"
     IMPORTED = "imported"
     CORRECTED = "corrected"
+    SYSTEM_AUTO = "system_auto"  # Automatic absence marking after class
 
 class GPSEvent(Base):
     """GPS event received from mobile applications."""
@@ -124,11 +125,15 @@ class AttendanceSession(Base):
     """Class session tracking for attendance."""
 
     __tablename__ = "attendance_sessions"
+    __table_args__ = (
+        UniqueConstraint("schedule_id", "session_date", name="uq_attendance_sessions_schedule_date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
 
     # Course info
     course_id: Mapped[int] = mapped_column(Integer, index=True)
+    schedule_id: Mapped[int] = mapped_column(Integer, nullable=True)
     course_code: Mapped[str] = mapped_column(String(20))
     teacher_id: Mapped[int] = mapped_column(Integer)
 
@@ -144,7 +149,7 @@ class AttendanceSession(Base):
     is_completed: Mapped[bool] = mapped_column(Boolean, default=False)
     attendance_enabled: Mapped[bool] = mapped_column(Boolean, default=True)
 
-    # Statistics (calculated)
+    # Statistics (updated with each attendance write, reconciled on open/close)
     total_enrolled: Mapped[int] = mapped_column(Integer, default=0)
     total_present: Mapped[int] = mapped_column(Integer, default=0)
     total_late: Mapped[int] = mapped_column(Integer, default=0)
@@ -162,4 +167,71 @@ class AttendanceSession(Base):
     )
 
     def __repr__(self) -> str:
-        return f"<AttendanceSession(id={self.id}, course_code={self.course_code}, date={self.session_date})>"
\ No newline at end of file
+        return f"<AttendanceSession(id={self.id}, course_code={self.course_code}, date={self.session_date})>"
+
+class AbsenceSweepRun(Base):
+    """Lease/completion marker for the automatic absence pass of one session."""
+
+    __tablename__ = "absence_sweep_runs"
+    __table_args__ = (
+        UniqueConstraint("schedule_id", "class_date", name="uq_absence_sweep_runs_session"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+
+    # Session identity
+    schedule_id: Mapped[int] = mapped_column(Integer)
+    course_id: Mapped[int] = mapped_column(Integer, index=True)
+    class_date: Mapped[date] = mapped_column(Date)
+
+    # Lease info
+    status: Mapped[str] = mapped_column(String(20), default="leased")  # leased, retry, completed, failed (out of attempts)
+    leased_by: Mapped[str] = mapped_column(String(100), nullable=True)
+    lease_expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+
+    # Result
+    marked_absent: Mapped[int] = mapped_column(Integer, nullable=True)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    completed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self) -> str:
+        return f"<AbsenceSweepRun(schedule_id={self.schedule_id}, class_date={self.class_date}, status={self.status})>"
+
+class OccupancyTile(Base):
+    """Event count of one grid cell around a classroom in one time window."""
+
+    __tablename__ = "occupancy_tiles"
+    __table_args__ = (
+        UniqueConstraint("classroom_id", "window_start", "cell_x", "cell_y", name="uq_occupancy_tiles_cell"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    # Tile identity: cell offsets in grid units east (x) and north (y) of the classroom
+    classroom_id: Mapped[int] = mapped_column(Integer)
+    window_start: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    cell_x: Mapped[int] = mapped_column(Integer)
+    cell_y: Mapped[int] = mapped_column(Integer)
+
+    # Counts
+    event_count: Mapped[int] = mapped_column(Integer, default=0)
+    within_count: Mapped[int] = mapped_column(Integer, default=0)
+
+    def __repr__(self) -> str:
+        return f"<OccupancyTile(classroom_id={self.classroom_id}, window={self.window_start}, cell=({self.cell_x}, {self.cell_y}))>"
+
+class AggregationWatermark(Base):
+    """Last GPS event folded into an incremental aggregate."""
+
+    __tablename__ = "aggregation_watermarks"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    last_event_id: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self) -> str:
+        return f"<AggregationWatermark(name={self.name}, last_event_id={self.last_event_id})>"
\ No newline at end of file
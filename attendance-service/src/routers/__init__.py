@@ -3,5 +3,6 @@
 from .gps import router as gps_router
 from .attendance import router as attendance_router
 from .reports import router as reports_router
+from .report_jobs import router as report_jobs_router
 
-__all__ = ["gps_router", "attendance_router", "reports_router"]
\ No newline at end of file
+__all__ = ["gps_router", "attendance_router", "reports_router", "report_jobs_router"]
\ No newline at end of file
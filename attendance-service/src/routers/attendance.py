@@ -2,17 +2,24 @@
 
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
-from ..core.database import get_session
+from ..core.database import get_session, get_read_session, AsyncSessionLocal
+from ..core.events import course_channel
 from ..schemas.attendance import (
     AttendanceRecordResponse, AttendanceListResponse,
-    AttendanceStats, ErrorResponse
+    AttendanceStats, BatchUserStatsRequest, ErrorResponse,
+    AttendanceSessionResponse, AttendanceSessionDetailResponse
 )
 from ..models.attendance import AttendanceStatus, AttendanceSource
 from ..services.attendance_service import AttendanceService
+from ..services.http_client import ServiceUnavailableError
+from ..services.report_service import ReportService
+from ..services.session_service import SessionService
+from ..utils.sse import sse_response, stream_channel
 
 router = APIRouter(prefix="/attendance", tags=["Attendance Records"])
 
@@ -30,7 +37,7 @@ async def get_attendance_records(
     status_filter: Optional[AttendanceStatus] = Query(None, description="Filter by attendance status"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
-    db: AsyncSession = Depends(get_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Get attendance records with optional filters."""
 
@@ -76,7 +83,7 @@ async def get_user_attendance_stats(
     course_id: Optional[int] = Query(None, description="Filter by specific course"),
     start_date: Optional[datetime] = Query(None, description="Start date for stats"),
     end_date: Optional[datetime] = Query(None, description="End date for stats"),
-    db: AsyncSession = Depends(get_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Get attendance statistics for a user."""
 
@@ -117,6 +124,79 @@ async def get_user_attendance_stats(
             detail="Internal server error"
         )
 
+@router.post(
+    "/users/stats/batch",
+    response_model=dict,
+    summary="Get Batch User Attendance Statistics",
+    description="Get attendance statistics for many users (or a course roster) in one request"
+)
+async def get_batch_user_attendance_stats(
+    request: BatchUserStatsRequest,
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Get attendance statistics for a list of users or for every student of a course.
+    All statistics come from one grouped query; user codes are taken from the records,
+    so there are no per-user calls to User Service.
+    """
+
+    logger.info(
+        f"📊 BATCH USER STATS: users={len(request.user_ids) if request.user_ids else 0}, "
+        f"course={request.course_id}"
+    )
+
+    try:
+        attendance_service = AttendanceService()
+
+        user_ids = request.user_ids
+        roster_codes = {}
+
+        # Course roster: one enrollments call, so students without records are included
+        if not user_ids and request.course_id:
+            enrollments = await attendance_service.service_client.get_course_enrollments(request.course_id)
+            if enrollments:
+                active = [e for e in enrollments if e.get("status", "active") == "active"]
+                user_ids = [e["student_id"] for e in active]
+                roster_codes = {e["student_id"]: e.get("student_code") for e in active}
+
+        users = await attendance_service.get_batch_user_attendance_stats(
+            db,
+            user_ids=user_ids,
+            course_id=request.course_id,
+            start_date=request.start_date,
+            end_date=request.end_date
+        )
+
+        for user in users:
+            if user["user_code"] is None:
+                user["user_code"] = roster_codes.get(user["user_id"])
+
+        return {
+            "success": True,
+            "message": f"Statistics for {len(users)} user(s)",
+            "course_id": request.course_id,
+            "period": {
+                "start_date": request.start_date.isoformat() if request.start_date else None,
+                "end_date": request.end_date.isoformat() if request.end_date else None
+            },
+            "total_users": len(users),
+            "users": users
+        }
+
+    except HTTPException:
+        raise
+    except ServiceUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"❌ Error getting batch user stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
 @router.get(
     "/course/{course_id}/records",
     response_model=AttendanceListResponse,
@@ -130,7 +210,7 @@ async def get_course_attendance_records(
     status_filter: Optional[AttendanceStatus] = Query(None, description="Filter by status"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Get attendance records for a specific course."""
 
@@ -184,80 +264,28 @@ async def get_course_attendance_stats(
     course_id: int,
     start_date: Optional[datetime] = Query(None, description="Start date for stats"),
     end_date: Optional[datetime] = Query(None, description="End date for stats"),
-    db: AsyncSession = Depends(get_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Get attendance statistics for a course."""
 
     logger.info(f"📊 COURSE STATS: course={course_id}")
 
     try:
-        attendance_service = AttendanceService()
-
-        # Validate course exists
-        course_data = await attendance_service.service_client.get_course(course_id)
-        if not course_data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Course not found"
-            )
-
-        # Get enrollments
-        enrollments = await attendance_service.service_client.get_course_enrollments(course_id)
-        total_students = len(enrollments) if enrollments else 0
-
-        # Get attendance records
-        records, total_records = await attendance_service.get_attendance_records(
+        report_service = ReportService()
+        return await report_service.get_course_stats(
             db,
             course_id=course_id,
             start_date=start_date,
             end_date=end_date
         )
 
-        # Calculate stats
-        if total_records == 0:
-            return {
-                "course_id": course_id,
-                "course_code": course_data.get("code"),
-                "course_name": course_data.get("name"),
-                "total_students": total_students,
-                "total_records": 0,
-                "statistics": {
-                    "attendance_rate": 0.0,
-                    "punctuality_rate": 0.0,
-                    "present_count": 0,
-                    "late_count": 0,
-                    "absent_count": 0
-                }
-            }
-
-        present_count = len([r for r in records if r.status == AttendanceStatus.PRESENT])
-        late_count = len([r for r in records if r.status == AttendanceStatus.LATE])
-        absent_count = len([r for r in records if r.status == AttendanceStatus.ABSENT])
-
-        attendance_rate = (present_count + late_count) / total_records * 100 if total_records > 0 else 0
-        punctuality_rate = present_count / total_records * 100 if total_records > 0 else 0
-
-        return {
-            "course_id": course_id,
-            "course_code": course_data.get("code"),
-            "course_name": course_data.get("name"),
-            "total_students": total_students,
-            "total_records": total_records,
-            "period": {
-                "start_date": start_date.isoformat() if start_date else None,
-                "end_date": end_date.isoformat() if end_date else None
-            },
-            "statistics": {
-                "attendance_rate": round(attendance_rate, 2),
-                "punctuality_rate": round(punctuality_rate, 2),
-                "present_count": present_count,
-                "late_count": late_count,
-                "absent_count": absent_count
-            }
-        }
-
     except HTTPException:
         raise
+    except ServiceUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"❌ Error getting course stats: {e}")
         raise HTTPException(
@@ -265,6 +293,123 @@ async def get_course_attendance_stats(
             detail="Internal server error"
         )
 
+@router.get(
+    "/course/{course_id}/matrix",
+    response_model=dict,
+    summary="Get Course Attendance Matrix",
+    description="Students x sessions attendance grid with one status code per cell"
+)
+async def get_course_attendance_matrix(
+    course_id: int,
+    start_date: Optional[datetime] = Query(None, description="First session date"),
+    end_date: Optional[datetime] = Query(None, description="Last session date"),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Get the attendance grid for a course.
+    `cells[i][j]` is the status code of student `user_ids[i]` in session `sessions[j]`;
+    codes are described in `legend`.
+    """
+
+    logger.info(f"🗓️ ATTENDANCE MATRIX: course={course_id}, period={start_date} to {end_date}")
+
+    try:
+        attendance_service = AttendanceService()
+        matrix = await attendance_service.get_attendance_matrix(
+            db, course_id, start_date, end_date
+        )
+
+        matrix["period"] = {
+            "start_date": start_date.date().isoformat() if start_date else None,
+            "end_date": end_date.date().isoformat() if end_date else None
+        }
+        return matrix
+
+    except Exception as e:
+        logger.error(f"❌ Error building attendance matrix: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get(
+    "/course/{course_id}/session/live",
+    response_model=AttendanceSessionDetailResponse,
+    summary="Get Live Course Session",
+    description="Currently open session of a course with its live counters"
+)
+async def get_live_course_session(
+    course_id: int,
+    db: AsyncSession = Depends(get_session)
+):
+    """Get the open session of a course, or `data: null` if no class is in progress."""
+
+    session_service = SessionService()
+    session = await session_service.get_live_session(db, course_id)
+
+    return AttendanceSessionDetailResponse(
+        message="Live session" if session else "No session in progress",
+        data=AttendanceSessionResponse.model_validate(session) if session else None
+    )
+
+@router.get(
+    "/course/{course_id}/session/live/stream",
+    response_class=StreamingResponse,
+    summary="Stream Live Course Session",
+    description="Server-Sent Events feed of check-ins and session counters for a course"
+)
+async def stream_live_course_session(course_id: int, request: Request):
+    """
+    Live roster feed for teachers.
+    Starts with a `snapshot` event (open session and students checked in so far), then
+    pushes `check_in`, `session_opened`, `session_closed` and `absences_marked` events.
+    """
+
+    logger.info(f"📡 LIVE SESSION STREAM: course={course_id}")
+
+    async def snapshot():
+        # Own DB session: the stream outlives the request's dependencies
+        async with AsyncSessionLocal() as db:
+            session = await SessionService().get_live_session(db, course_id)
+            class_date = session.session_date.astimezone().date() if session else datetime.utcnow().date()
+            roster = await AttendanceService().get_live_roster(db, course_id, class_date)
+
+        return [{
+            "type": "snapshot",
+            "course_id": course_id,
+            "session": SessionService.counters(session) if session else None,
+            "roster": roster,
+            "timestamp": datetime.utcnow().isoformat()
+        }]
+
+    return sse_response(stream_channel(request, course_channel(course_id), initial=snapshot))
+
+@router.get(
+    "/sessions/{session_id}",
+    response_model=AttendanceSessionDetailResponse,
+    responses={404: {"model": ErrorResponse}},
+    summary="Get Attendance Session",
+    description="Get an attendance session and its counters"
+)
+async def get_attendance_session(
+    session_id: int,
+    db: AsyncSession = Depends(get_session)
+):
+    """Get attendance session by ID."""
+
+    session_service = SessionService()
+    session = await session_service.get_session(db, session_id)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attendance session not found"
+        )
+
+    return AttendanceSessionDetailResponse(
+        message="Attendance session",
+        data=AttendanceSessionResponse.model_validate(session)
+    )
+
 @router.post(
     "/mark-absences",
     response_model=dict,
@@ -301,6 +446,11 @@ async def mark_absent_students(
 
     except HTTPException:
         raise
+    except ServiceUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"❌ Error marking absences: {e}")
         raise HTTPException(
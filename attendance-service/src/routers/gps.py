@@ -17,7 +17,7 @@ router = APIRouter(prefix="/gps", tags=["GPS Processing"])
     "/event",
     response_model=GPSEventCreateResponse,
     status_code=status.HTTP_201_CREATED,
-    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
+    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
     summary="Process GPS Event",
     description="**MAIN ENDPOINT**: Process GPS event from mobile app and determine attendance"
 )
@@ -0,0 +1,89 @@
+"""Attendance Service Background Report Job Routes."""
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import JSONResponse
+from loguru import logger
+
+from ..schemas.attendance import (
+    ReportJobCreate, ReportJobResponse, ReportJobSubmitResponse,
+    ReportJobStatus, ErrorResponse
+)
+from ..services.report_jobs import report_job_manager, ReportQueueFullError
+
+router = APIRouter(prefix="/reports/jobs", tags=["Report Jobs"])
+
+@router.post(
+    "",
+    response_model=ReportJobSubmitResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={503: {"model": ErrorResponse}},
+    summary="Submit Report Job",
+    description="Queue a report for background computation. Identical specs share one job while it is queued or running."
+)
+async def submit_report_job(spec: ReportJobCreate):
+    """Submit a report spec and return its job ID."""
+
+    logger.info(f"📥 REPORT JOB: type={spec.report_type.value}, course={spec.course_id}")
+
+    try:
+        job = await report_job_manager.submit(spec)
+    except ReportQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+    return ReportJobSubmitResponse(
+        message="Report job accepted",
+        data=ReportJobResponse(**job.to_dict())
+    )
+
+@router.get(
+    "/{job_id}",
+    response_model=ReportJobSubmitResponse,
+    responses={404: {"model": ErrorResponse}},
+    summary="Get Report Job Status",
+    description="Poll the status of a background report job"
+)
+async def get_report_job(job_id: str):
+    """Get report job status."""
+
+    job = await report_job_manager.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report job not found"
+        )
+
+    return ReportJobSubmitResponse(
+        message=f"Report job {job.status.value}",
+        data=ReportJobResponse(**job.to_dict())
+    )
+
+@router.get(
+    "/{job_id}/download",
+    responses={404: {"model": ErrorResponse}, 409: {"model": ErrorResponse}},
+    summary="Download Report Job Result",
+    description="Download the result of a completed report job"
+)
+async def download_report_job(job_id: str):
+    """Download a completed report."""
+
+    job = await report_job_manager.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report job not found"
+        )
+
+    if job.status != ReportJobStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Report job is {job.status.value}" + (f": {job.error}" if job.error else "")
+        )
+
+    filename = f"{job.spec.report_type.value}_{job.id}.json"
+    return JSONResponse(
+        content=job.result,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -11,8 +11,15 @@ from .attendance import (
     AttendanceSessionResponse,
     AttendanceReportRequest,
     AttendanceStats,
+    BatchUserStatsRequest,
     UserAttendanceReport,
     CourseAttendanceReport,
+    ReportType,
+    ReportJobStatus,
+    ReportJobCreate,
+    ReportJobResponse,
+    ReportJobSubmitResponse,
+    AttendanceSessionDetailResponse,
     AttendanceNotification,
     BaseResponse,
     GPSEventCreateResponse,
@@ -33,8 +40,15 @@ __all__ = [
     "AttendanceSessionResponse",
     "AttendanceReportRequest",
     "AttendanceStats",
+    "BatchUserStatsRequest",
     "UserAttendanceReport",
     "CourseAttendanceReport",
+    "ReportType",
+    "ReportJobStatus",
+    "ReportJobCreate",
+    "ReportJobResponse",
+    "ReportJobSubmitResponse",
+    "AttendanceSessionDetailResponse",
     "AttendanceNotification",
     "BaseResponse",
     "GPSEventCreateResponse",
@@ -1,7 +1,8 @@
 """Attendance Service Pydantic Schemas."""
 
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
+from enum import Enum
 from typing import Optional, List
 from pydantic import BaseModel, Field, ConfigDict, validator
 
@@ -115,9 +116,12 @@ class AttendanceSessionResponse(BaseModel):
     course_id: int
     course_code: str
     teacher_id: int
+    schedule_id: Optional[int] = None
     session_date: datetime
     scheduled_start: datetime
     scheduled_end: datetime
+    actual_start: Optional[datetime] = None
+    actual_end: Optional[datetime] = None
     is_active: bool
     is_completed: bool
     total_enrolled: int
@@ -145,6 +149,19 @@ class AttendanceStats(BaseModel):
     attendance_rate: float
     punctuality_rate: float
 
+class BatchUserStatsRequest(BaseModel):
+    """Request statistics for a list of users or for a whole course roster."""
+    user_ids: Optional[List[int]] = Field(None, min_length=1, max_length=1000)
+    course_id: Optional[int] = Field(None, gt=0)
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+    @validator('course_id', always=True)
+    def users_or_course_required(cls, v, values):
+        if v is None and not values.get('user_ids'):
+            raise ValueError('Either user_ids or course_id is required')
+        return v
+
 class UserAttendanceReport(BaseModel):
     """User attendance report."""
     user_id: int
@@ -163,6 +180,56 @@ class CourseAttendanceReport(BaseModel):
     session_stats: AttendanceStats
     student_reports: List[UserAttendanceReport]
 
+# Report job schemas
+class ReportType(str, Enum):
+    """Reports that can be computed as background jobs."""
+    ATTENDANCE_SUMMARY = "attendance_summary"
+    DAILY_ATTENDANCE = "daily_attendance"
+    COURSE_STATS = "course_stats"
+
+class ReportJobStatus(str, Enum):
+    """Background report job status."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class ReportJobCreate(BaseModel):
+    """Report specification submitted as a background job."""
+    report_type: ReportType
+    course_id: Optional[int] = Field(None, gt=0)
+    start_date: Optional[date] = Field(None, description="Range start (report day for daily_attendance)")
+    end_date: Optional[date] = None
+
+    @validator('course_id', always=True)
+    def course_required_for_course_stats(cls, v, values):
+        if values.get('report_type') == ReportType.COURSE_STATS and v is None:
+            raise ValueError('course_id is required for course_stats reports')
+        return v
+
+    @validator('start_date', always=True)
+    def day_required_for_daily_attendance(cls, v, values):
+        if values.get('report_type') == ReportType.DAILY_ATTENDANCE and v is None:
+            raise ValueError('start_date is required for daily_attendance reports')
+        return v
+
+    @validator('end_date')
+    def end_date_after_start_date(cls, v, values):
+        if v and values.get('start_date') and v < values['start_date']:
+            raise ValueError('end_date must be on or after start_date')
+        return v
+
+class ReportJobResponse(BaseModel):
+    """Background report job status."""
+    job_id: str
+    status: ReportJobStatus
+    spec: ReportJobCreate
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    download_url: Optional[str] = None
+
 # Notification schemas
 class AttendanceNotification(BaseModel):
     """Schema for attendance notifications."""
@@ -182,6 +249,14 @@ class GPSEventCreateResponse(BaseResponse):
     """GPS event creation response."""
     data: GPSProcessingResult
 
+class ReportJobSubmitResponse(BaseResponse):
+    """Report job submission/status response."""
+    data: ReportJobResponse
+
+class AttendanceSessionDetailResponse(BaseResponse):
+    """Attendance session response."""
+    data: Optional[AttendanceSessionResponse] = None
+
 class AttendanceListResponse(BaseResponse):
     """Attendance list response."""
     data: List[AttendanceRecordResponse]
@@ -2,5 +2,15 @@
 
 from .attendance_service import AttendanceService
 from .http_client import ServiceClient
+from .report_service import ReportService
+from .session_service import SessionService, SessionLifecycle, session_lifecycle
+from .report_jobs import ReportJobManager, report_job_manager
+from .absence_sweeper import AbsenceSweeper, absence_sweeper
+from .gps_tail import GPSEventTail, gps_event_tail
+from .occupancy import OccupancyAggregator, occupancy_aggregator
 
-__all__ = ["AttendanceService", "ServiceClient"]
\ No newline at end of file
+__all__ = ["AttendanceService", "ServiceClient", "ReportService", "ReportJobManager", "report_job_manager",
+           "AbsenceSweeper", "absence_sweeper",
+           "SessionService", "SessionLifecycle", "session_lifecycle",
+           "GPSEventTail", "gps_event_tail",
+           "OccupancyAggregator", "occupancy_aggregator"]
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""Automatic end-of-class absence sweeper."""
+
+import asyncio
+import os
+import socket
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from loguru import logger
+
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal
+from ..models.attendance import AbsenceSweepRun
+from .attendance_service import AttendanceService
+
+settings = get_settings()
+
+# (schedule_id, course_id, class_date)
+SessionKey = Tuple[int, int, date]
+
+class AbsenceSweeper:
+    """Runs the absence pass for every session shortly after it ends.
+
+    Each tick collects sessions whose `end_time + grace` fell inside the lookback
+    window, groups them by end minute and claims them through a lease row in
+    `absence_sweep_runs`. Completed rows are never claimed again, so restarts
+    and multiple replicas run each session's pass once. A session whose pass
+    keeps failing is given up (`failed`) after ABSENCE_SWEEP_MAX_ATTEMPTS.
+    """
+
+    def __init__(self):
+        self.attendance_service = AttendanceService()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.grace = timedelta(minutes=settings.absence_sweep_grace_minutes)
+        self.lookback = timedelta(hours=settings.absence_sweep_lookback_hours)
+        self._task: Optional[asyncio.Task] = None
+        self._semaphore = asyncio.Semaphore(settings.absence_sweep_concurrency)
+
+    async def start(self):
+        if not settings.absence_sweeper_enabled:
+            logger.info("⏸️ Absence sweeper disabled")
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"🧹 Absence sweeper started ({self.worker_id})")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Absence sweep failed: {e}")
+            await asyncio.sleep(settings.absence_sweep_interval)
+
+    async def sweep(self, now: Optional[datetime] = None) -> int:
+        """Run the absence pass for every due, unclaimed session. Returns sessions swept."""
+        now = now or datetime.now()
+        due = await self._due_sessions(now)
+        if not due:
+            return 0
+
+        # Sessions ending at the same minute are claimed and swept as one batch
+        batches: Dict[datetime, List[SessionKey]] = defaultdict(list)
+        for ends_at, session in due:
+            batches[ends_at.replace(second=0, microsecond=0)].append(session)
+
+        swept = 0
+        for ends_at in sorted(batches):
+            claimed = await self._claim(batches[ends_at])
+            if not claimed:
+                continue
+
+            logger.info(f"🧹 Sweeping {len(claimed)} session(s) that ended at {ends_at:%Y-%m-%d %H:%M}")
+            results = await asyncio.gather(*(
+                self._sweep_session(session, attempts) for session, attempts in claimed.items()
+            ))
+            swept += sum(results)
+
+        return swept
+
+    async def _due_sessions(self, now: datetime) -> List[Tuple[datetime, SessionKey]]:
+        """Sessions whose end + grace is in (now - lookback, now]."""
+        window_start = now - self.lookback
+        due = []
+
+        day = (window_start - self.grace).date()
+        while day <= now.date():
+            schedules = await self.attendance_service.service_client.get_active_schedules(day.weekday())
+            if schedules is None:
+                raise RuntimeError("Course Service unavailable while listing schedules")
+
+            for schedule in schedules:
+                ends_at = datetime.combine(day, time.fromisoformat(schedule["end_time"]))
+                if window_start < ends_at + self.grace <= now:
+                    due.append((ends_at, (schedule["id"], schedule["course_id"], day)))
+
+            day += timedelta(days=1)
+
+        return due
+
+    async def _claim(self, sessions: List[SessionKey]) -> Dict[SessionKey, int]:
+        """Lease sessions that are not finished, not out of attempts and not leased by a live worker.
+
+        Returns the claimed sessions with their attempt number.
+        """
+        lease_until = datetime.now(timezone.utc) + timedelta(seconds=settings.absence_sweep_lease_seconds)
+
+        stmt = pg_insert(AbsenceSweepRun).values([
+            {
+                "schedule_id": schedule_id,
+                "course_id": course_id,
+                "class_date": class_date,
+                "status": "leased",
+                "leased_by": self.worker_id,
+                "lease_expires_at": lease_until,
+                "attempts": 1,
+            }
+            for schedule_id, course_id, class_date in sessions
+        ])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_absence_sweep_runs_session",
+            set_={
+                "status": "leased",
+                "leased_by": stmt.excluded.leased_by,
+                "lease_expires_at": stmt.excluded.lease_expires_at,
+                "attempts": AbsenceSweepRun.attempts + 1,
+            },
+            where=and_(
+                AbsenceSweepRun.status.notin_(["completed", "failed"]),
+                AbsenceSweepRun.attempts < settings.absence_sweep_max_attempts,
+                AbsenceSweepRun.lease_expires_at < func.now()
+            )
+        ).returning(
+            AbsenceSweepRun.schedule_id,
+            AbsenceSweepRun.course_id,
+            AbsenceSweepRun.class_date,
+            AbsenceSweepRun.attempts
+        )
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(stmt)
+            claimed = {(row.schedule_id, row.course_id, row.class_date): row.attempts for row in result}
+            await db.commit()
+
+        return claimed
+
+    async def _sweep_session(self, session: SessionKey, attempts: int) -> int:
+        schedule_id, course_id, class_date = session
+
+        async with self._semaphore:
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await self.attendance_service.mark_absences_for_session(
+                        db, course_id, schedule_id, class_date
+                    )
+                await self._finish(session, status="completed", marked_absent=result["marked_absent"])
+                return 1
+
+            except Exception as e:
+                if attempts >= settings.absence_sweep_max_attempts:
+                    logger.error(
+                        f"❌ Absence pass for schedule {schedule_id} on {class_date} failed "
+                        f"{attempts} times, giving up: {e}"
+                    )
+                    await self._finish(session, status="failed", error=str(e))
+                else:
+                    logger.error(f"❌ Absence pass failed for schedule {schedule_id} on {class_date}: {e}")
+                    # Release the lease so the next tick retries
+                    await self._finish(session, status="retry", error=str(e))
+                return 0
+
+    async def _finish(
+        self,
+        session: SessionKey,
+        status: str,
+        marked_absent: Optional[int] = None,
+        error: Optional[str] = None
+    ):
+        schedule_id, _, class_date = session
+        values = {"status": status, "last_error": error}
+
+        if status == "completed":
+            values.update(marked_absent=marked_absent, completed_at=func.now())
+        else:
+            values.update(lease_expires_at=func.now())
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(AbsenceSweepRun)
+                .where(
+                    AbsenceSweepRun.schedule_id == schedule_id,
+                    AbsenceSweepRun.class_date == class_date,
+                    AbsenceSweepRun.leased_by == self.worker_id
+                )
+                .values(**values)
+            )
+            await db.commit()
+
+absence_sweeper = AbsenceSweeper()
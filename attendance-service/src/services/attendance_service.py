@@ -1,9 +1,11 @@
 """Attendance Service Business Logic."""
 
-from datetime import datetime, timedelta
-from typing import Optional, List, Tuple
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, insert, exists, literal, func, and_, or_, Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from loguru import logger
@@ -19,16 +21,41 @@ from ..schemas.attendance import (
 )
 from ..utils.gps_calculator import GPSCalculator
 from ..core.config import get_settings
-from .http_client import ServiceClient
+from ..core.cache import report_cache
+from ..core.events import publish_event
+from .http_client import ServiceClient, ServiceUnavailableError
+from .gps_prefilter import (
+    campus_geofence, rejection_cache, NEGATIVE_TTLS, NOT_ENROLLED, NO_SCHEDULE
+)
+from .session_service import SessionService, session_bounds, in_session, publish_session_event
+from .gps_tail import GPS_EVENTS_CHANNEL, gps_event_payload
 
 settings = get_settings()
 
+# One character per cell in the attendance matrix
+MATRIX_STATUS_CODES = {
+    AttendanceStatus.PRESENT: "P",
+    AttendanceStatus.LATE: "L",
+    AttendanceStatus.ABSENT: "A",
+    AttendanceStatus.EXCUSED: "E",
+}
+MATRIX_NO_RECORD = "-"
+
+# Fast ingest statements: compiled once by SQLAlchemy, prepared once per connection by asyncpg
+GPS_EVENT_INSERT = insert(GPSEvent.__table__).returning(GPSEvent.__table__.c.id)
+ATTENDANCE_RECORD_INSERT = insert(AttendanceRecord.__table__).returning(AttendanceRecord.__table__.c.id)
+
+def _as_date(value: Union[date, datetime]) -> date:
+    """Normalize a date/datetime filter to a calendar date."""
+    return value.date() if isinstance(value, datetime) else value
+
 class AttendanceService:
     """Attendance business logic service."""
 
     def __init__(self):
         self.service_client = ServiceClient()
         self.gps_calculator = GPSCalculator()
+        self.session_service = SessionService()
 
     async def process_gps_event(self, db: AsyncSession, gps_data: GPSEventCreate) -> GPSProcessingResult:
         """
@@ -55,30 +82,37 @@ class AttendanceService:
                 detail=f"GPS accuracy too low: {gps_data.accuracy}m (threshold: {settings.gps_accuracy_threshold}m)"
             )
 
-        # Step 3: Get user information
-        user_data = await self.service_client.get_user(gps_data.user_id)
-        if not user_data:
+        # Step 2.5: Reject fixes outside every classroom geofence (local, no network)
+        if settings.campus_prefilter_enabled and not await campus_geofence.contains(
+            float(gps_data.latitude), float(gps_data.longitude)
+        ):
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Location is outside campus"
             )
 
-        # Step 4: Validate user enrollment in course
-        is_enrolled = await self.service_client.validate_user_enrollment(
-            gps_data.user_id, gps_data.course_id
-        )
-        if not is_enrolled:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="User not enrolled in this course"
-            )
+        # Step 2.6: Repeat a recent upstream rejection without asking again
+        cached_rejection = rejection_cache.get(gps_data.user_id, gps_data.course_id)
+        if cached_rejection:
+            self._raise_rejection(cached_rejection)
 
-        # Step 4.5: Validate class schedule (NEW - Schedule validation)
-        current_schedule = await self.service_client.get_current_schedule(gps_data.course_id)
-        if not current_schedule:
+        # Upstream checks run from most to least likely to reject
+        try:
+            # Step 3: Validate user enrollment in course
+            is_enrolled = await self.service_client.validate_user_enrollment(
+                gps_data.user_id, gps_data.course_id
+            )
+            if not is_enrolled:
+                self._reject(gps_data, NOT_ENROLLED)
+
+            # Step 4: Validate class schedule
+            current_schedule = await self.service_client.get_current_schedule(gps_data.course_id)
+            if not current_schedule:
+                self._reject(gps_data, NO_SCHEDULE)
+        except ServiceUnavailableError as e:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No active class schedule at this time. Please check the class schedule and try again during class hours."
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e)
             )
 
         logger.info(
@@ -87,35 +121,37 @@ class AttendanceService:
             f"time {current_schedule.get('start_time')}-{current_schedule.get('end_time')}"
         )
 
-        # Step 5: Get course coordinates
-        course_coordinates = await self.service_client.get_course_coordinates(gps_data.course_id)
+        # Step 5: Get user information and course coordinates
+        user_data, course_coordinates = await asyncio.gather(
+            self.service_client.get_user(gps_data.user_id),
+            self.service_client.get_course_coordinates(gps_data.course_id)
+        )
+        if not user_data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
         if not course_coordinates:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Course coordinates not found"
             )
 
-        # Step 6: Create GPS event record
-        gps_event = await self._create_gps_event(db, gps_data, user_data)
-
-        # Step 7: Calculate distances to all classrooms
+        # Step 6: Calculate distances to all classrooms
         distance_result = await self._calculate_distances(
-            gps_event, course_coordinates
+            float(gps_data.latitude), float(gps_data.longitude), course_coordinates
         )
 
-        # Step 8: Update GPS event with calculation results
-        gps_event.calculated_distance = Decimal(str(distance_result["min_distance"]))
-        gps_event.nearest_classroom_id = distance_result["nearest_classroom"]["id"]
-        gps_event.within_range = distance_result["within_range"]
-        gps_event.status = EventStatus.PROCESSED
-        gps_event.processed_at = datetime.utcnow()
+        # Steps 7-9: Store the GPS event and, if within range, the attendance record
+        if settings.fast_ingest_enabled:
+            gps_event, attendance_record = await self._store_event_core(db, gps_data, user_data, distance_result, current_schedule)
+        else:
+            gps_event, attendance_record = await self._store_event_orm(db, gps_data, user_data, distance_result, current_schedule)
 
-        # Step 9: Create attendance record if within range
-        attendance_record = None
-        if distance_result["within_range"]:
-            attendance_record = await self._create_attendance_record(
-                db, gps_event, distance_result
-            )
+        live_session = None
+        if attendance_record:
+            # Step 9.5: Bump the live session counters in the same transaction
+            live_session = await self.session_service.record_attendance(db, current_schedule, attendance_record)
 
             # Step 10: Send notification (async)
             await self._send_attendance_notification(
@@ -124,7 +160,22 @@ class AttendanceService:
 
         await db.commit()
 
-        # Step 11: Return processing result
+        # Step 11: Drop cached reports that cover the new record
+        if attendance_record:
+            await report_cache.invalidate(attendance_record.course_id, attendance_record.class_date)
+
+            # Push the check-in to teachers watching the live roster
+            if live_session:
+                await publish_session_event(
+                    "check_in",
+                    live_session,
+                    record=self._roster_entry(attendance_record)
+                )
+
+        # Step 11.5: Feed the GPS event tail used by operations monitoring
+        await publish_event(GPS_EVENTS_CHANNEL, {"type": "gps_event", **gps_event_payload(gps_event)})
+
+        # Step 12: Return processing result
         return GPSProcessingResult(
             success=True,
             message="GPS event processed successfully",
@@ -136,26 +187,112 @@ class AttendanceService:
             nearest_classroom=distance_result["nearest_classroom"]
         )
 
+    @staticmethod
+    def _raise_rejection(reason: str):
+        if reason == NOT_ENROLLED:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="User not enrolled in this course"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No active class schedule at this time. Please check the class schedule and try again during class hours."
+        )
+
+    def _reject(self, gps_data: GPSEventCreate, reason: str):
+        """Remember an upstream rejection for this user and course, then raise it."""
+        rejection_cache.put(gps_data.user_id, gps_data.course_id, reason, NEGATIVE_TTLS[reason])
+        self._raise_rejection(reason)
+
+    async def _store_event_orm(
+        self, db: AsyncSession, gps_data: GPSEventCreate, user_data: dict, distance_result: dict, schedule: dict
+    ) -> Tuple[GPSEvent, Optional[AttendanceRecord]]:
+        """Store the event and attendance record through the ORM unit of work."""
+
+        # Step 7: Create GPS event record
+        gps_event = await self._create_gps_event(db, gps_data, user_data)
+
+        # Step 8: Update GPS event with calculation results
+        gps_event.calculated_distance = Decimal(str(distance_result["min_distance"]))
+        gps_event.nearest_classroom_id = distance_result["nearest_classroom"]["id"]
+        gps_event.within_range = distance_result["within_range"]
+        gps_event.status = EventStatus.PROCESSED
+        gps_event.processed_at = datetime.utcnow()
+
+        # Step 9: Create attendance record if within range
+        attendance_record = None
+        if distance_result["within_range"]:
+            attendance_record = await self._create_attendance_record(
+                db, gps_event, distance_result, schedule
+            )
+
+        return gps_event, attendance_record
+
+    async def _store_event_core(
+        self, db: AsyncSession, gps_data: GPSEventCreate, user_data: dict, distance_result: dict, schedule: dict
+    ) -> Tuple[GPSEvent, Optional[AttendanceRecord]]:
+        """
+        Store the event and attendance record with prepared Core inserts (FAST_INGEST_ENABLED).
+
+        The event is written once, already processed, instead of insert + update,
+        and nothing but the new ids is read back. The returned model instances are
+        transient: they carry the written values for notifications and live feeds
+        but are not attached to the session.
+        """
+        event_values = self._gps_event_values(gps_data, user_data)
+        event_values.update(
+            status=EventStatus.PROCESSED,
+            processed_at=datetime.utcnow(),
+            received_at=datetime.now().astimezone(),
+            calculated_distance=Decimal(str(distance_result["min_distance"])),
+            nearest_classroom_id=distance_result["nearest_classroom"]["id"],
+            within_range=distance_result["within_range"]
+        )
+
+        try:
+            result = await db.execute(GPS_EVENT_INSERT, event_values)
+            gps_event = GPSEvent(id=result.scalar_one(), **event_values)
+
+            attendance_record = None
+            if distance_result["within_range"]:
+                await self._check_recent_attendance(db, gps_event.user_id, gps_event.course_id)
+                record_values = self._attendance_record_values(gps_event, distance_result, schedule)
+                result = await db.execute(ATTENDANCE_RECORD_INSERT, record_values)
+                attendance_record = AttendanceRecord(id=result.scalar_one(), **record_values)
+        except IntegrityError as e:
+            await db.rollback()
+            logger.error(f"Database error storing GPS event: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Error creating GPS event"
+            )
+
+        return gps_event, attendance_record
+
+    @staticmethod
+    def _gps_event_values(gps_data: GPSEventCreate, user_data: dict) -> dict:
+        return {
+            "user_id": gps_data.user_id,
+            "user_code": user_data["code"],
+            "course_id": gps_data.course_id,
+            "course_code": "",  # Will be filled when we get course data
+            "latitude": gps_data.latitude,
+            "longitude": gps_data.longitude,
+            "accuracy": gps_data.accuracy,
+            "altitude": gps_data.altitude,
+            "event_timestamp": gps_data.event_timestamp,
+            "device_id": gps_data.device_id,
+            "device_type": gps_data.device_type,
+            "app_version": gps_data.app_version,
+            "status": EventStatus.PENDING
+        }
+
     async def _create_gps_event(
         self, db: AsyncSession, gps_data: GPSEventCreate, user_data: dict
     ) -> GPSEvent:
         """Create GPS event record in database."""
 
-        gps_event = GPSEvent(
-            user_id=gps_data.user_id,
-            user_code=user_data["code"],
-            course_id=gps_data.course_id,
-            course_code="",  # Will be filled when we get course data
-            latitude=gps_data.latitude,
-            longitude=gps_data.longitude,
-            accuracy=gps_data.accuracy,
-            altitude=gps_data.altitude,
-            event_timestamp=gps_data.event_timestamp,
-            device_id=gps_data.device_id,
-            device_type=gps_data.device_type,
-            app_version=gps_data.app_version,
-            status=EventStatus.PENDING
-        )
+        gps_event = GPSEvent(**self._gps_event_values(gps_data, user_data))
 
         try:
             db.add(gps_event)
@@ -171,12 +308,10 @@ class AttendanceService:
             )
 
     async def _calculate_distances(
-        self, gps_event: GPSEvent, course_coordinates: dict
+        self, user_lat: float, user_lng: float, course_coordinates: dict
     ) -> dict:
         """Calculate distances to all classrooms and determine if within range."""
 
-        user_lat = float(gps_event.latitude)
-        user_lng = float(gps_event.longitude)
         classrooms = course_coordinates["classrooms"]
         detection_radius = float(course_coordinates["detection_radius"])
 
@@ -186,14 +321,11 @@ class AttendanceService:
                 detail="No classrooms defined for this course"
             )
 
-        # Find nearest classroom
-        nearest_classroom, min_distance = self.gps_calculator.find_nearest_classroom(
-            user_lat, user_lng, classrooms, settings.earth_radius_km
+        # Footprint polygons first, detection radius around the point as fallback
+        nearest_classroom, min_distance, within_range = self.gps_calculator.locate_in_classrooms(
+            user_lat, user_lng, classrooms, detection_radius, settings.earth_radius_km
         )
 
-        # Check if within detection radius
-        within_range = min_distance <= detection_radius
-
         logger.info(f"Distance calculation: {min_distance:.2f}m to {nearest_classroom['room_number']}, within range: {within_range}")
 
         return {
@@ -205,68 +337,107 @@ class AttendanceService:
         }
 
     async def _create_attendance_record(
-        self, db: AsyncSession, gps_event: GPSEvent, distance_result: dict
+        self, db: AsyncSession, gps_event: GPSEvent, distance_result: dict, schedule: dict
     ) -> AttendanceRecord:
         """Create attendance record for successful GPS validation."""
 
-        # Check for duplicate attendance (prevent multiple records in short time)
+        await self._check_recent_attendance(db, gps_event.user_id, gps_event.course_id)
+
+        attendance_record = AttendanceRecord(**self._attendance_record_values(gps_event, distance_result, schedule))
+
+        try:
+            db.add(attendance_record)
+            await db.flush()
+            logger.info(f"Attendance record created: {attendance_record.id}")
+            return attendance_record
+        except IntegrityError as e:
+            await db.rollback()
+            logger.error(f"Database error creating attendance record: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Error creating attendance record"
+            )
+
+    @staticmethod
+    async def _check_recent_attendance(db: AsyncSession, user_id: int, course_id: int):
+        """Check for duplicate attendance (prevent multiple records in short time)."""
         recent_cutoff = datetime.utcnow() - timedelta(seconds=settings.min_time_between_records)
 
         existing_record = await db.execute(
-            select(AttendanceRecord).where(
+            select(AttendanceRecord.id).where(
                 and_(
-                    AttendanceRecord.user_id == gps_event.user_id,
-                    AttendanceRecord.course_id == gps_event.course_id,
+                    AttendanceRecord.user_id == user_id,
+                    AttendanceRecord.course_id == course_id,
                     AttendanceRecord.created_at > recent_cutoff
                 )
-            )
+            ).limit(1)
         )
 
         if existing_record.scalar_one_or_none():
-            logger.warning(f"Duplicate attendance attempt blocked for user {gps_event.user_id}")
+            logger.warning(f"Duplicate attendance attempt blocked for user {user_id}")
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Attendance already recorded recently"
             )
 
+    @staticmethod
+    def _attendance_record_values(gps_event: GPSEvent, distance_result: dict, schedule: dict) -> dict:
+        # Class days and session windows are in service-local time, like the schedules
+        class_date = datetime.now().date()
+        _, scheduled_start, scheduled_end = session_bounds(schedule, class_date)
+
         # Determine if late
-        now = datetime.utcnow()
         is_late = False
         minutes_late = None
 
         # TODO: Get actual scheduled start time from course schedule
         # For now, assume on time
 
-        attendance_record = AttendanceRecord(
-            gps_event_id=gps_event.id,
-            user_id=gps_event.user_id,
-            user_code=gps_event.user_code,
-            course_id=gps_event.course_id,
-            course_code=gps_event.course_code,
-            status=AttendanceStatus.LATE if is_late else AttendanceStatus.PRESENT,
-            source=AttendanceSource.GPS_AUTO,
-            class_date=now.date(),
-            actual_arrival=gps_event.event_timestamp,
-            classroom_id=distance_result["nearest_classroom"]["id"],
-            classroom_name=f"{distance_result['nearest_classroom']['building']} {distance_result['nearest_classroom']['room_number']}",
-            recorded_distance=Decimal(str(distance_result["min_distance"])),
-            is_late=is_late,
-            minutes_late=minutes_late,
-            created_by="system"
-        )
+        return {
+            "gps_event_id": gps_event.id,
+            "user_id": gps_event.user_id,
+            "user_code": gps_event.user_code,
+            "course_id": gps_event.course_id,
+            "course_code": gps_event.course_code,
+            "status": AttendanceStatus.LATE if is_late else AttendanceStatus.PRESENT,
+            "source": AttendanceSource.GPS_AUTO,
+            "class_date": class_date,
+            "scheduled_start": scheduled_start,
+            "scheduled_end": scheduled_end,
+            "actual_arrival": gps_event.event_timestamp,
+            "classroom_id": distance_result["nearest_classroom"]["id"],
+            "classroom_name": f"{distance_result['nearest_classroom']['building']} {distance_result['nearest_classroom']['room_number']}",
+            "recorded_distance": Decimal(str(distance_result["min_distance"])),
+            "is_late": is_late,
+            "minutes_late": minutes_late,
+            "created_by": "system"
+        }
 
-        try:
-            db.add(attendance_record)
-            await db.flush()
-            logger.info(f"Attendance record created: {attendance_record.id}")
-            return attendance_record
-        except IntegrityError as e:
-            await db.rollback()
-            logger.error(f"Database error creating attendance record: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Error creating attendance record"
+    @staticmethod
+    def _roster_entry(record: AttendanceRecord) -> dict:
+        """Check-in as shown on the live roster."""
+        return {
+            "record_id": record.id,
+            "user_id": record.user_id,
+            "user_code": record.user_code,
+            "status": record.status.value,
+            "arrival_time": record.actual_arrival.isoformat() if record.actual_arrival else None,
+            "classroom": record.classroom_name,
+            "is_late": record.is_late
+        }
+
+    async def get_live_roster(self, db: AsyncSession, course_id: int, class_date: date) -> List[dict]:
+        """Students who have checked in to a course on a date, in arrival order."""
+        result = await db.execute(
+            select(AttendanceRecord)
+            .where(
+                AttendanceRecord.course_id == course_id,
+                AttendanceRecord.class_date == class_date,
+                AttendanceRecord.status.in_([AttendanceStatus.PRESENT, AttendanceStatus.LATE])
             )
+            .order_by(AttendanceRecord.created_at)
+        )
+        return [self._roster_entry(record) for record in result.scalars()]
 
     async def _send_attendance_notification(
         self, gps_event: GPSEvent, attendance_record: AttendanceRecord, distance_result: dict
@@ -296,8 +467,8 @@ class AttendanceService:
         db: AsyncSession,
         user_id: Optional[int] = None,
         course_id: Optional[int] = None,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None,
+        start_date: Optional[Union[date, datetime]] = None,
+        end_date: Optional[Union[date, datetime]] = None,
         status_filter: Optional[AttendanceStatus] = None,
         skip: int = 0,
         limit: int = 100
@@ -317,10 +488,10 @@ class AttendanceService:
             conditions.append(AttendanceRecord.course_id == course_id)
 
         if start_date:
-            conditions.append(AttendanceRecord.class_date >= start_date.date())
+            conditions.append(AttendanceRecord.class_date >= _as_date(start_date))
 
         if end_date:
-            conditions.append(AttendanceRecord.class_date <= end_date.date())
+            conditions.append(AttendanceRecord.class_date <= _as_date(end_date))
 
         if status_filter:
             conditions.append(AttendanceRecord.status == status_filter)
@@ -341,6 +512,60 @@ class AttendanceService:
 
         return records, total
 
+    async def get_course_status_counts(
+        self,
+        db: AsyncSession,
+        course_id: Optional[int] = None,
+        start_date: Optional[Union[date, datetime]] = None,
+        end_date: Optional[Union[date, datetime]] = None
+    ) -> List[dict]:
+        """Record counts per status and distinct students of each course, in one grouped aggregation."""
+
+        query = select(
+            AttendanceRecord.course_id,
+            AttendanceRecord.course_code,
+            func.count(AttendanceRecord.id).label("total"),
+            func.count(AttendanceRecord.id).filter(
+                AttendanceRecord.status == AttendanceStatus.PRESENT
+            ).label("present"),
+            func.count(AttendanceRecord.id).filter(
+                AttendanceRecord.status == AttendanceStatus.LATE
+            ).label("late"),
+            func.count(AttendanceRecord.id).filter(
+                AttendanceRecord.status == AttendanceStatus.ABSENT
+            ).label("absent"),
+            func.count(AttendanceRecord.user_id.distinct()).label("unique_students"),
+        ).group_by(AttendanceRecord.course_id, AttendanceRecord.course_code).order_by(AttendanceRecord.course_id)
+
+        if course_id:
+            query = query.where(AttendanceRecord.course_id == course_id)
+
+        if start_date:
+            query = query.where(AttendanceRecord.class_date >= _as_date(start_date))
+
+        if end_date:
+            query = query.where(AttendanceRecord.class_date <= _as_date(end_date))
+
+        result = await db.execute(query)
+        return [dict(row._mapping) for row in result]
+
+    async def get_day_records(
+        self,
+        db: AsyncSession,
+        day: Union[date, datetime],
+        course_id: Optional[int] = None
+    ) -> List[AttendanceRecord]:
+        """Every attendance record of a class day, unpaginated, in arrival order per course."""
+
+        query = select(AttendanceRecord).where(AttendanceRecord.class_date == _as_date(day))
+        if course_id:
+            query = query.where(AttendanceRecord.course_id == course_id)
+
+        result = await db.execute(
+            query.order_by(AttendanceRecord.course_id, AttendanceRecord.actual_arrival, AttendanceRecord.id)
+        )
+        return result.scalars().all()
+
     async def get_user_attendance_stats(
         self,
         db: AsyncSession,
@@ -351,21 +576,143 @@ class AttendanceService:
     ) -> dict:
         """Get attendance statistics for a user."""
 
-        query = select(AttendanceRecord).where(AttendanceRecord.user_id == user_id)
+        stats = await self.get_batch_user_attendance_stats(
+            db, user_ids=[user_id], course_id=course_id, start_date=start_date, end_date=end_date
+        )
+        return stats[0]["statistics"]
+
+    async def get_batch_user_attendance_stats(
+        self,
+        db: AsyncSession,
+        user_ids: Optional[List[int]] = None,
+        course_id: Optional[int] = None,
+        start_date: Optional[Union[date, datetime]] = None,
+        end_date: Optional[Union[date, datetime]] = None
+    ) -> List[dict]:
+        """
+        Get attendance statistics for many users with one grouped aggregation.
+        Without `user_ids`, every user with records in `course_id` is included.
+        """
+
+        attended_statuses = [AttendanceStatus.PRESENT, AttendanceStatus.LATE]
+        query = select(
+            AttendanceRecord.user_id,
+            func.max(AttendanceRecord.user_code).label("user_code"),
+            func.count(AttendanceRecord.id).label("total_sessions"),
+            func.count(AttendanceRecord.id).filter(
+                AttendanceRecord.status.in_(attended_statuses)
+            ).label("attended_sessions"),
+            func.count(AttendanceRecord.id).filter(
+                AttendanceRecord.status == AttendanceStatus.LATE
+            ).label("late_sessions"),
+            func.count(AttendanceRecord.id).filter(
+                AttendanceRecord.status == AttendanceStatus.ABSENT
+            ).label("absent_sessions"),
+        ).group_by(AttendanceRecord.user_id).order_by(AttendanceRecord.user_id)
+
+        if user_ids:
+            query = query.where(AttendanceRecord.user_id.in_(user_ids))
 
         if course_id:
             query = query.where(AttendanceRecord.course_id == course_id)
 
         if start_date:
-            query = query.where(AttendanceRecord.class_date >= start_date.date())
+            query = query.where(AttendanceRecord.class_date >= _as_date(start_date))
 
         if end_date:
-            query = query.where(AttendanceRecord.class_date <= end_date.date())
+            query = query.where(AttendanceRecord.class_date <= _as_date(end_date))
 
         result = await db.execute(query)
-        records = result.scalars().all()
+        rows = {row.user_id: row for row in result}
+
+        # Requested users without records get zeroed statistics
+        ordered_ids = list(dict.fromkeys(user_ids)) if user_ids else list(rows)
+
+        stats = []
+        for uid in ordered_ids:
+            row = rows.get(uid)
+            stats.append({
+                "user_id": uid,
+                "user_code": row.user_code if row else None,
+                "statistics": self._build_stats(
+                    row.total_sessions if row else 0,
+                    row.attended_sessions if row else 0,
+                    row.late_sessions if row else 0,
+                    row.absent_sessions if row else 0
+                )
+            })
+
+        return stats
+
+    async def get_attendance_matrix(
+        self,
+        db: AsyncSession,
+        course_id: int,
+        start_date: Optional[Union[date, datetime]] = None,
+        end_date: Optional[Union[date, datetime]] = None
+    ) -> dict:
+        """
+        Build the student x session attendance grid for a course.
+        One ordered query is pivoted into parallel arrays: one status-code string per
+        student, one character per session column.
+        """
+
+        query = select(
+            AttendanceRecord.user_id,
+            AttendanceRecord.user_code,
+            AttendanceRecord.class_date,
+            AttendanceRecord.status
+        ).where(
+            AttendanceRecord.course_id == course_id
+        ).order_by(
+            AttendanceRecord.user_id,
+            AttendanceRecord.class_date,
+            AttendanceRecord.created_at
+        )
+
+        if start_date:
+            query = query.where(AttendanceRecord.class_date >= _as_date(start_date))
+
+        if end_date:
+            query = query.where(AttendanceRecord.class_date <= _as_date(end_date))
+
+        result = await db.execute(query)
+        rows = result.all()
+
+        session_dates = sorted({_as_date(row.class_date) for row in rows})
+        column_index = {session_date: i for i, session_date in enumerate(session_dates)}
+
+        user_ids: List[int] = []
+        user_codes: List[str] = []
+        cells: List[str] = []
+        current_row: Optional[bytearray] = None
+
+        # Rows arrive grouped by user; a later record for the same session overrides an earlier one
+        for row in rows:
+            if not user_ids or user_ids[-1] != row.user_id:
+                if current_row is not None:
+                    cells.append(current_row.decode())
+                user_ids.append(row.user_id)
+                user_codes.append(row.user_code)
+                current_row = bytearray(MATRIX_NO_RECORD * len(session_dates), "ascii")
+
+            current_row[column_index[_as_date(row.class_date)]] = ord(MATRIX_STATUS_CODES[row.status])
+
+        if current_row is not None:
+            cells.append(current_row.decode())
 
-        total_sessions = len(records)
+        return {
+            "course_id": course_id,
+            "legend": {code: status.value for status, code in MATRIX_STATUS_CODES.items()} | {MATRIX_NO_RECORD: "no_record"},
+            "sessions": [session_date.isoformat() for session_date in session_dates],
+            "user_ids": user_ids,
+            "user_codes": user_codes,
+            "cells": cells
+        }
+
+    @staticmethod
+    def _build_stats(total_sessions: int, attended_sessions: int, late_sessions: int, absent_sessions: int) -> dict:
+        """Build the attendance statistics payload from aggregated counts."""
         if total_sessions == 0:
             return {
                 "total_sessions": 0,
@@ -376,12 +723,8 @@ class AttendanceService:
                 "punctuality_rate": 0.0
             }
 
-        attended_sessions = len([r for r in records if r.status in [AttendanceStatus.PRESENT, AttendanceStatus.LATE]])
-        late_sessions = len([r for r in records if r.status == AttendanceStatus.LATE])
-        absent_sessions = len([r for r in records if r.status == AttendanceStatus.ABSENT])
-
         attendance_rate = attended_sessions / total_sessions * 100
-        punctuality_rate = (attended_sessions - late_sessions) / total_sessions * 100 if total_sessions > 0 else 0
+        punctuality_rate = (attended_sessions - late_sessions) / total_sessions * 100
 
         return {
             "total_sessions": total_sessions,
@@ -397,98 +740,130 @@ class AttendanceService:
         db: AsyncSession,
         course_id: int,
         schedule_id: int,
-        class_date: datetime
+        class_date: Union[date, datetime]
     ) -> dict:
         """
         Mark students as absent if they didn't register attendance for this session.
         Should be called after class ends.
+
+        The roster is staged with `unnest()` and absences are written with a single
+        anti-join `INSERT ... SELECT`, so re-running the pass for the same session
+        inserts nothing new.
         """
-        from sqlalchemy import select, and_
-        from ..models.attendance import AttendanceRecord
-        from decimal import Decimal
 
-        logger.info(f"📋 Processing absences for course {course_id}, schedule {schedule_id}, date {class_date}")
+        class_date_only = _as_date(class_date)
+        logger.info(f"📋 Processing absences for course {course_id}, schedule {schedule_id}, date {class_date_only}")
 
         # 1. Get enrolled students from course-service
-        try:
-            enrollments_data = await self.http_client.get_course_enrollments(course_id)
-            if not enrollments_data:
-                logger.warning(f"No enrollments found for course {course_id}")
-                return {
-                    "course_id": course_id,
-                    "schedule_id": schedule_id,
-                    "class_date": class_date.isoformat(),
-                    "total_enrolled": 0,
-                    "already_registered": 0,
-                    "marked_absent": 0,
-                    "absent_students": []
-                }
-
-            enrolled_students = enrollments_data.get("enrollments", [])
-            total_enrolled = len(enrolled_students)
-            logger.info(f"📚 Found {total_enrolled} enrolled students")
+        enrollments = await self.service_client.get_course_enrollments(course_id)
+        roster = [
+            (enrollment["student_id"], enrollment.get("student_code", ""))
+            for enrollment in enrollments or []
+            if enrollment.get("status", "active") == "active"
+        ]
+        total_enrolled = len(roster)
+
+        if not roster:
+            logger.warning(f"No enrollments found for course {course_id}")
+            return {
+                "course_id": course_id,
+                "schedule_id": schedule_id,
+                "class_date": class_date_only.isoformat(),
+                "total_enrolled": 0,
+                "already_registered": 0,
+                "marked_absent": 0,
+                "absent_students": []
+            }
 
-        except Exception as e:
-            logger.error(f"Error fetching enrollments: {e}")
-            raise
+        logger.info(f"📚 Found {total_enrolled} enrolled students")
+
+        # 2. Resolve the session window; a course can meet more than once a day
+        scheduled_start, scheduled_end = await self.session_service.session_window(db, schedule_id, class_date_only)
+        if scheduled_start is None:
+            schedule = await self.service_client.get_schedule(schedule_id)
+            if schedule:
+                _, scheduled_start, scheduled_end = session_bounds(schedule, class_date_only)
+
+        if scheduled_start is not None:
+            same_session = in_session(scheduled_start, scheduled_end)
+        else:
+            logger.warning(f"Schedule {schedule_id} not found, checking absences against the whole day")
+            same_session = AttendanceRecord.class_date == class_date_only
+
+        # 3. Serialize concurrent passes for the same session
+        await db.execute(
+            select(func.pg_advisory_xact_lock(
+                func.hashtext(f"absences:{course_id}:{schedule_id}:{class_date_only}")
+            ))
+        )
 
-        # 2. Get students who already have attendance for this date
-        class_date_only = class_date.date()
-        existing_records = await db.execute(
-            select(AttendanceRecord).where(
+        # 4. Insert one absence per roster student without a record for this session,
+        # stamped with the session it is counted in
+        records = AttendanceRecord.__table__
+        user_ids, user_codes = zip(*roster)
+        staged_roster = func.unnest(
+            literal(list(user_ids), ARRAY(Integer)),
+            literal(list(user_codes), ARRAY(String))
+        ).table_valued("user_id", "user_code").render_derived(name="roster")
+
+        absent_rows = select(
+            staged_roster.c.user_id,
+            staged_roster.c.user_code,
+            literal(course_id, Integer),
+            literal("", String),
+            literal(AttendanceStatus.ABSENT, records.c.status.type),
+            literal(AttendanceSource.SYSTEM_AUTO, records.c.source.type),
+            literal(class_date_only, records.c.class_date.type),
+            literal(scheduled_start, records.c.scheduled_start.type),
+            literal(scheduled_end, records.c.scheduled_end.type),
+            literal(False),
+            literal("system_auto", String)
+        ).where(
+            ~exists().where(
                 and_(
                     AttendanceRecord.course_id == course_id,
-                    AttendanceRecord.class_date == class_date_only
+                    AttendanceRecord.class_date == class_date_only,
+                    AttendanceRecord.user_id == staged_roster.c.user_id,
+                    same_session
                 )
             )
         )
-        existing_records_list = existing_records.scalars().all()
-        students_with_attendance = {record.user_id for record in existing_records_list}
-
-        logger.info(f"✅ {len(students_with_attendance)} students already have attendance")
-
-        # 3. Mark absent students who didn't register
-        absent_students = []
-        marked_count = 0
-
-        for enrollment in enrolled_students:
-            user_id = enrollment.get("student_id")
-            user_code = enrollment.get("student_code", "")
-
-            if user_id not in students_with_attendance:
-                # Create absent record
-                absent_record = AttendanceRecord(
-                    user_id=user_id,
-                    user_code=user_code,
-                    course_id=course_id,
-                    course_code="",
-                    status=AttendanceStatus.ABSENT,
-                    source=AttendanceSource.SYSTEM_AUTO,
-                    class_date=class_date_only,
-                    is_late=False,
-                    created_by="system_auto"
-                )
 
-                db.add(absent_record)
-                marked_count += 1
-                absent_students.append({
-                    "user_id": user_id,
-                    "user_code": user_code
-                })
+        result = await db.execute(
+            insert(AttendanceRecord).from_select(
+                [
+                    "user_id", "user_code", "course_id", "course_code", "status",
+                    "source", "class_date", "scheduled_start", "scheduled_end", "is_late", "created_by"
+                ],
+                absent_rows
+            ).returning(AttendanceRecord.user_id, AttendanceRecord.user_code)
+        )
+        absent_students = [
+            {"user_id": row.user_id, "user_code": row.user_code}
+            for row in result
+        ]
+        marked_count = len(absent_students)
+
+        live_session = await self.session_service.record_absences(
+            db, schedule_id, class_date_only, marked_count, total_enrolled
+        )
+
+        await db.commit()
+
+        if live_session:
+            await publish_session_event("absences_marked", live_session, marked_absent=marked_count)
 
-                logger.info(f"❌ Marked absent: user_id={user_id}, user_code={user_code}")
+        logger.info(f"💾 Marked {marked_count} absent, {total_enrolled - marked_count} already registered")
 
-        # Commit all absences
         if marked_count > 0:
-            await db.commit()
-            logger.info(f"💾 Committed {marked_count} absence records")
+            await report_cache.invalidate(course_id, class_date_only)
 
         return {
             "course_id": course_id,
             "schedule_id": schedule_id,
-            "class_date": class_date.isoformat(),
+            "class_date": class_date_only.isoformat(),
             "total_enrolled": total_enrolled,
-            "already_registered": len(students_with_attendance),
+            "already_registered": total_enrolled - marked_count,
             "marked_absent": marked_count,
             "absent_students": absent_students
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,149 @@
+"""Cheap local checks run before any upstream call in GPS processing."""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from ..core.config import get_settings
+from ..utils.gps_calculator import GPSCalculator
+from .http_client import ServiceClient
+
+settings = get_settings()
+
+METERS_PER_DEGREE_LAT = 111_320.0
+
+class CampusGeofence:
+    """Union of all classroom geofences, refreshed from Course Service.
+
+    A fix is rejected only if it lies outside the bounding box of every
+    classroom circle (`gps_radius`, or the farthest footprint vertex, plus a
+    safety margin) or farther than that from every classroom. Course detection radii are much smaller than
+    classroom radii, so nothing that could become a check-in is rejected.
+    While no classroom list is available the filter lets everything through.
+    """
+
+    def __init__(self, service_client: ServiceClient, refresh_seconds: int, margin_meters: float):
+        self.service_client = service_client
+        self.refresh_seconds = refresh_seconds
+        self.margin_meters = margin_meters
+        self._classrooms: List[Tuple[float, float, float]] = []  # (lat, lon, reach in meters)
+        self._bbox: Optional[Tuple[float, float, float, float]] = None  # (min_lat, max_lat, min_lon, max_lon)
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def contains(self, latitude: float, longitude: float) -> bool:
+        await self._refresh_if_stale()
+        if self._bbox is None:
+            return True
+
+        min_lat, max_lat, min_lon, max_lon = self._bbox
+        if not (min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon):
+            return False
+
+        return any(
+            GPSCalculator.haversine_distance(latitude, longitude, lat, lon, settings.earth_radius_km) <= reach
+            for lat, lon, reach in self._classrooms
+        )
+
+    async def _refresh_if_stale(self):
+        if time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+
+        async with self._lock:
+            if time.monotonic() - self._loaded_at < self.refresh_seconds:
+                return
+            # Retry a failed load on the next refresh, not on every event
+            self._loaded_at = time.monotonic()
+
+            classrooms = await self.service_client.get_classrooms()
+            if not classrooms:
+                if self._bbox is None:
+                    logger.warning("⚠️ No classrooms available, campus prefilter disabled")
+                return
+
+            self._load(classrooms)
+
+    def _load(self, classrooms: List[dict]):
+        circles = [
+            (float(c["latitude"]), float(c["longitude"]), self._reach(c) + self.margin_meters)
+            for c in classrooms
+        ]
+
+        min_lat = min_lon = math.inf
+        max_lat = max_lon = -math.inf
+        for lat, lon, reach in circles:
+            dlat = reach / METERS_PER_DEGREE_LAT
+            dlon = reach / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+            min_lat, max_lat = min(min_lat, lat - dlat), max(max_lat, lat + dlat)
+            min_lon, max_lon = min(min_lon, lon - dlon), max(max_lon, lon + dlon)
+
+        self._classrooms = circles
+        self._bbox = (min_lat, max_lat, min_lon, max_lon)
+        logger.info(f"🗺️ Campus geofence loaded: {len(circles)} classroom(s)")
+
+    @staticmethod
+    def _reach(classroom: dict) -> float:
+        """Radius around the classroom point that covers its circle and its footprint."""
+        reach = float(classroom.get("gps_radius") or 0)
+        footprint = GPSCalculator.footprint(classroom.get("footprint"))
+        if footprint is not None:
+            lat, lon = float(classroom["latitude"]), float(classroom["longitude"])
+            reach = max(reach, *(
+                GPSCalculator.haversine_distance(lat, lon, v_lat, v_lon, settings.earth_radius_km)
+                for v_lat, v_lon in zip(footprint.latitudes.tolist(), footprint.longitudes.tolist())
+            ))
+        return reach
+
+class NegativeCache:
+    """Short-lived memory of upstream rejections per (user, course).
+
+    Entries expire after their TTL; opening a session drops those of the
+    course's enrolled students, so a new enrollment does not wait it out.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[str, float]]" = OrderedDict()
+
+    def get(self, user_id: int, course_id: int) -> Optional[str]:
+        key = (user_id, course_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        reason, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return reason
+
+    def put(self, user_id: int, course_id: int, reason: str, ttl: int):
+        if ttl <= 0:
+            return
+        key = (user_id, course_id)
+        self._entries[key] = (reason, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, user_id: int, course_id: int):
+        self._entries.pop((user_id, course_id), None)
+
+# Rejection reasons kept in the negative cache
+NOT_ENROLLED = "not_enrolled"
+NO_SCHEDULE = "no_schedule"
+
+NEGATIVE_TTLS: Dict[str, int] = {
+    NOT_ENROLLED: settings.negative_cache_not_enrolled_ttl,
+    NO_SCHEDULE: settings.negative_cache_no_schedule_ttl,
+}
+
+campus_geofence = CampusGeofence(
+    ServiceClient(),
+    refresh_seconds=settings.campus_geofence_refresh,
+    margin_meters=settings.campus_geofence_margin_meters,
+)
+rejection_cache = NegativeCache(max_entries=settings.negative_cache_max_entries)
@@ -0,0 +1,91 @@
+"""In-memory tail of recently processed GPS events."""
+
+import asyncio
+from collections import deque
+from typing import Deque, List, Optional
+from loguru import logger
+
+from ..core.config import get_settings
+from ..core.events import event_bus
+from ..models.attendance import GPSEvent
+
+settings = get_settings()
+
+GPS_EVENTS_CHANNEL = "gps-events"
+
+def gps_event_payload(event: GPSEvent) -> dict:
+    """Monitoring view of a GPS event."""
+    return {
+        "id": event.id,
+        "user_id": event.user_id,
+        "user_code": event.user_code,
+        "course_id": event.course_id,
+        "course_code": event.course_code,
+        "latitude": float(event.latitude),
+        "longitude": float(event.longitude),
+        "accuracy": float(event.accuracy),
+        "status": event.status.value,
+        "calculated_distance": float(event.calculated_distance) if event.calculated_distance else None,
+        "within_range": event.within_range,
+        "event_timestamp": event.event_timestamp.isoformat(),
+        "received_at": event.received_at.isoformat() if event.received_at else None,
+        "processed_at": event.processed_at.isoformat() if event.processed_at else None,
+        "device_type": event.device_type
+    }
+
+def matches(
+    event: dict,
+    status_filter: Optional[str] = None,
+    course_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> bool:
+    return (
+        (status_filter is None or event.get("status") == status_filter)
+        and (course_id is None or event.get("course_id") == course_id)
+        and (user_id is None or event.get("user_id") == user_id)
+    )
+
+class GPSEventTail:
+    """Ring buffer of the last N GPS events published on the event bus.
+
+    Fed by a single bus subscription, so any number of watchers can read the
+    backlog without touching the database.
+    """
+
+    def __init__(self, size: int):
+        self._buffer: Deque[dict] = deque(maxlen=size)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._consume())
+        logger.info(f"🛰️ GPS event tail started (buffer={self._buffer.maxlen})")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _consume(self):
+        async with event_bus.subscribe(GPS_EVENTS_CHANNEL) as queue:
+            while True:
+                self._buffer.append(await queue.get())
+
+    def recent(
+        self,
+        limit: int,
+        status_filter: Optional[str] = None,
+        course_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> List[dict]:
+        """Up to `limit` matching events, oldest first."""
+        selected = []
+        for event in reversed(self._buffer):
+            if len(selected) >= limit:
+                break
+            if matches(event, status_filter, course_id, user_id):
+                selected.append(event)
+        selected.reverse()
+        return selected
+
+gps_event_tail = GPSEventTail(size=settings.gps_tail_buffer_size)
@@ -7,6 +7,9 @@ from ..core.config import get_settings
 
 settings = get_settings()
 
+class ServiceUnavailableError(Exception):
+    """Raised when an upstream service could not answer, as opposed to answering "no"."""
+
 class ServiceClient:
     """HTTP client for communicating with other microservices."""
 
@@ -90,14 +93,22 @@ class ServiceClient:
             return None
 
     async def get_course_enrollments(self, course_id: int) -> Optional[List[Dict[str, Any]]]:
-        """Get course enrollments from Course Service."""
+        """
+        Get course enrollments from Course Service.
+        Raises ServiceUnavailableError if Course Service could not be reached.
+        """
         url = f"{settings.course_service_url}/api/v1/enrollments/course/{course_id}"
 
         try:
             return await self._make_request("GET", url)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            logger.error(f"Failed to get course enrollments for {course_id}: {e}")
+            raise ServiceUnavailableError("Course Service unavailable") from e
         except Exception as e:
             logger.error(f"Failed to get course enrollments for {course_id}: {e}")
-            return None
+            raise ServiceUnavailableError("Course Service unavailable") from e
 
     async def send_notification(self, notification_data: Dict[str, Any]) -> bool:
         """Send notification via Notification Service."""
@@ -112,40 +123,101 @@ class ServiceClient:
             return False
 
     async def validate_user_enrollment(self, user_id: int, course_id: int) -> bool:
-        """Validate if user is enrolled in course."""
+        """
+        Validate if user is enrolled in course.
+        Raises ServiceUnavailableError if Course Service could not be reached.
+        """
         try:
             # Get user enrollments
             enrollments = await self._make_request(
                 "GET",
                 f"{settings.course_service_url}/api/v1/enrollments/student/{user_id}"
             )
-
-            if not enrollments:
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
                 return False
-
-            # Check if user is enrolled in the specific course
-            for enrollment in enrollments:
-                if enrollment.get("course_id") == course_id and enrollment.get("status") == "active":
-                    return True
-
-            return False
-
+            logger.error(f"Failed to validate user enrollment: {e}")
+            raise ServiceUnavailableError("Course Service unavailable") from e
         except Exception as e:
             logger.error(f"Failed to validate user enrollment: {e}")
+            raise ServiceUnavailableError("Course Service unavailable") from e
+
+        if not enrollments:
             return False
 
+        # Check if user is enrolled in the specific course
+        for enrollment in enrollments:
+            if enrollment.get("course_id") == course_id and enrollment.get("status") == "active":
+                return True
+
+        return False
+
     async def get_current_schedule(self, course_id: int) -> Optional[Dict[str, Any]]:
-        """Get current active schedule for a course from Course Service."""
+        """
+        Get current active schedule for a course from Course Service.
+        Raises ServiceUnavailableError if Course Service could not be reached.
+        """
         url = f"{settings.course_service_url}/api/v1/schedules/course/{course_id}/current"
 
         try:
             result = await self._make_request("GET", url)
-            if result and result.get("success") and result.get("data"):
-                logger.info(f"✅ Active schedule found for course {course_id}")
-                return result.get("data")
-            else:
-                logger.info(f"ℹ️ No active schedule at this time for course {course_id}")
-                return None
         except Exception as e:
             logger.error(f"Failed to get current schedule for course {course_id}: {e}")
+            raise ServiceUnavailableError("Course Service unavailable") from e
+
+        if result and result.get("success") and result.get("data"):
+            logger.info(f"✅ Active schedule found for course {course_id}")
+            return result.get("data")
+
+        logger.info(f"ℹ️ No active schedule at this time for course {course_id}")
+        return None
+
+    async def get_schedule(self, schedule_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get a schedule by ID from Course Service.
+        Raises ServiceUnavailableError if Course Service could not be reached.
+        """
+        url = f"{settings.course_service_url}/api/v1/schedules/{schedule_id}"
+
+        try:
+            result = await self._make_request("GET", url)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            logger.error(f"Failed to get schedule {schedule_id}: {e}")
+            raise ServiceUnavailableError("Course Service unavailable") from e
+        except Exception as e:
+            logger.error(f"Failed to get schedule {schedule_id}: {e}")
+            raise ServiceUnavailableError("Course Service unavailable") from e
+
+        return result.get("data") if result else None
+
+    async def get_classrooms(self) -> Optional[List[Dict[str, Any]]]:
+        """Get every classroom from Course Service."""
+        url = f"{settings.course_service_url}/api/v1/classrooms/"
+        page_size = 500
+        classrooms: List[Dict[str, Any]] = []
+
+        try:
+            while True:
+                page = await self._make_request(
+                    "GET", url, params={"skip": len(classrooms), "limit": page_size}
+                )
+                classrooms.extend(page or [])
+                if not page or len(page) < page_size:
+                    return classrooms
+        except Exception as e:
+            logger.error(f"Failed to get classrooms: {e}")
+            return None
+
+    async def get_active_schedules(self, day_of_week: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Get active schedules across all courses from Course Service."""
+        url = f"{settings.course_service_url}/api/v1/schedules/active"
+        params = {"day_of_week": day_of_week} if day_of_week is not None else None
+
+        try:
+            result = await self._make_request("GET", url, params=params)
+            return result.get("data", []) if result else []
+        except Exception as e:
+            logger.error(f"Failed to get active schedules: {e}")
             return None
\ No newline at end of file
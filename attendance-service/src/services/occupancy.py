@@ -0,0 +1,216 @@
+"""Occupancy heatmap tiles: GPS fixes binned into a meter grid around each classroom."""
+
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import Float, Integer, and_, cast, func, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal
+from ..models.attendance import AggregationWatermark, GPSEvent, OccupancyTile
+from .http_client import ServiceClient
+
+settings = get_settings()
+
+OCCUPANCY_WATERMARK = "occupancy_tiles"
+METERS_PER_DEGREE_LAT = 111_320.0
+WINDOWS = ("hour", "day")
+
+class OccupancyAggregator:
+    """Folds newly received GPS events into `occupancy_tiles`.
+
+    Each pass reads only events above the `aggregation_watermark` row, bins them
+    by nearest classroom, time window and grid cell, adds the counts to existing
+    tiles and advances the watermark in the same transaction. The watermark row
+    is locked for the pass, so replicas never count an event twice. Events
+    younger than the settle delay are left for the next pass, since their
+    transaction may not have committed yet.
+    """
+
+    def __init__(self):
+        self.service_client = ServiceClient()
+        self.cell_meters = settings.occupancy_cell_meters
+        self.window = settings.occupancy_window if settings.occupancy_window in WINDOWS else "hour"
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if not settings.occupancy_aggregator_enabled:
+            logger.info("⏸️ Occupancy aggregator disabled")
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"🗺️ Occupancy aggregator started (cell={self.cell_meters}m, window={self.window})")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # Drain the backlog before waiting for new events
+                while await self.aggregate() >= settings.occupancy_batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Occupancy aggregation failed: {e}")
+            await asyncio.sleep(settings.occupancy_interval)
+
+    async def aggregate(self, now: Optional[datetime] = None) -> int:
+        """Fold the next batch of settled events into tiles. Returns events consumed."""
+        classrooms = await self.service_client.get_classrooms()
+        if not classrooms:
+            logger.warning("⚠️ No classrooms available, occupancy aggregation postponed")
+            return 0
+
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=settings.occupancy_settle_seconds)
+
+        async with AsyncSessionLocal() as db:
+            last_event_id = await self._lock_watermark(db)
+            upper = await self._batch_upper_bound(db, last_event_id, cutoff)
+            if upper is None:
+                await db.commit()
+                return 0
+
+            await db.execute(self._tile_upsert(classrooms, last_event_id, upper))
+            await db.execute(
+                update(AggregationWatermark)
+                .where(AggregationWatermark.name == OCCUPANCY_WATERMARK)
+                .values(last_event_id=upper)
+            )
+            await db.commit()
+
+        logger.info(f"🗺️ Occupancy tiles updated with events {last_event_id + 1}..{upper}")
+        return upper - last_event_id
+
+    @staticmethod
+    async def _lock_watermark(db: AsyncSession) -> int:
+        await db.execute(
+            pg_insert(AggregationWatermark)
+            .values(name=OCCUPANCY_WATERMARK, last_event_id=0)
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        result = await db.execute(
+            select(AggregationWatermark.last_event_id)
+            .where(AggregationWatermark.name == OCCUPANCY_WATERMARK)
+            .with_for_update()
+        )
+        return result.scalar_one()
+
+    @staticmethod
+    async def _batch_upper_bound(db: AsyncSession, last_event_id: int, cutoff: datetime) -> Optional[int]:
+        """Highest event id of the next batch that lies entirely before the settle cutoff."""
+        unsettled = await db.execute(
+            select(func.min(GPSEvent.id)).where(GPSEvent.id > last_event_id, GPSEvent.received_at >= cutoff)
+        )
+        first_unsettled = unsettled.scalar()
+
+        batch = select(GPSEvent.id).where(GPSEvent.id > last_event_id)
+        if first_unsettled is not None:
+            batch = batch.where(GPSEvent.id < first_unsettled)
+        batch = batch.order_by(GPSEvent.id).limit(settings.occupancy_batch_size).subquery()
+
+        result = await db.execute(select(func.max(batch.c.id)))
+        return result.scalar()
+
+    def _tile_upsert(self, classrooms: List[dict], after_id: int, upper: int):
+        rooms = func.unnest(
+            literal([int(c["id"]) for c in classrooms], ARRAY(Integer)),
+            literal([float(c["latitude"]) for c in classrooms], ARRAY(Float)),
+            literal([float(c["longitude"]) for c in classrooms], ARRAY(Float)),
+        ).table_valued("id", "latitude", "longitude").render_derived(name="rooms")
+
+        north = (cast(GPSEvent.latitude, Float) - rooms.c.latitude) * METERS_PER_DEGREE_LAT
+        east = (
+            (cast(GPSEvent.longitude, Float) - rooms.c.longitude)
+            * METERS_PER_DEGREE_LAT * func.cos(func.radians(rooms.c.latitude))
+        )
+        cell_x = cast(func.floor(east / self.cell_meters), Integer).label("cell_x")
+        cell_y = cast(func.floor(north / self.cell_meters), Integer).label("cell_y")
+        window_start = func.date_trunc(self.window, GPSEvent.event_timestamp).label("window_start")
+
+        binned = (
+            select(
+                rooms.c.id,
+                window_start,
+                cell_x,
+                cell_y,
+                func.count(),
+                func.count().filter(GPSEvent.within_range == True),
+            )
+            .select_from(GPSEvent)
+            .join(rooms, rooms.c.id == GPSEvent.nearest_classroom_id)
+            .where(
+                GPSEvent.id > after_id,
+                GPSEvent.id <= upper,
+                GPSEvent.calculated_distance <= settings.occupancy_max_distance_meters
+            )
+            .group_by(rooms.c.id, window_start, cell_x, cell_y)
+        )
+
+        upsert = pg_insert(OccupancyTile).from_select(
+            ["classroom_id", "window_start", "cell_x", "cell_y", "event_count", "within_count"],
+            binned
+        )
+        return upsert.on_conflict_do_update(
+            constraint="uq_occupancy_tiles_cell",
+            set_={
+                "event_count": OccupancyTile.event_count + upsert.excluded.event_count,
+                "within_count": OccupancyTile.within_count + upsert.excluded.within_count,
+            }
+        )
+
+    async def get_heatmap(
+        self,
+        db: AsyncSession,
+        classroom_id: int,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        hour_of_day: Optional[int] = None
+    ) -> dict:
+        """Sum tiles of a classroom over a date range into one grid."""
+        conditions = [OccupancyTile.classroom_id == classroom_id]
+        if start_date:
+            conditions.append(OccupancyTile.window_start >= start_date)
+        if end_date:
+            conditions.append(OccupancyTile.window_start < end_date + timedelta(days=1))
+        if hour_of_day is not None:
+            conditions.append(func.extract("hour", OccupancyTile.window_start) == hour_of_day)
+
+        result = await db.execute(
+            select(
+                OccupancyTile.cell_x,
+                OccupancyTile.cell_y,
+                func.sum(OccupancyTile.event_count),
+                func.sum(OccupancyTile.within_count),
+            )
+            .where(and_(*conditions))
+            .group_by(OccupancyTile.cell_x, OccupancyTile.cell_y)
+            .order_by(OccupancyTile.cell_y, OccupancyTile.cell_x)
+        )
+        cells = [
+            {"x": x, "y": y, "events": int(events), "within_range": int(within)}
+            for x, y, events, within in result
+        ]
+
+        watermark = await db.get(AggregationWatermark, OCCUPANCY_WATERMARK)
+
+        return {
+            "classroom_id": classroom_id,
+            "cell_meters": self.cell_meters,
+            "window": self.window,
+            "start_date": start_date.isoformat() if start_date else None,
+            "end_date": end_date.isoformat() if end_date else None,
+            "hour_of_day": hour_of_day,
+            "total_events": sum(cell["events"] for cell in cells),
+            "cells": cells,
+            "last_event_id": watermark.last_event_id if watermark else 0,
+            "aggregated_at": watermark.updated_at.isoformat() if watermark and watermark.updated_at else None,
+        }
+
+occupancy_aggregator = OccupancyAggregator()
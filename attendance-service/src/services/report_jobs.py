@@ -0,0 +1,214 @@
+"""Background report jobs with a bounded worker pool."""
+
+import asyncio
+import hashlib
+import json
+import uuid
+from datetime import datetime
+from typing import List, Optional
+from loguru import logger
+
+from ..core.cache import CacheBackend, InMemoryLRUBackend, report_cache
+from ..core.config import get_settings
+from ..core.database import read_sessionmaker
+from ..schemas.attendance import ReportJobCreate, ReportJobStatus, ReportType
+from .report_service import ReportService
+
+settings = get_settings()
+
+class ReportQueueFullError(Exception):
+    """Raised when the report job queue has no room for another job."""
+
+class ReportJob:
+    """A submitted report computation and its result."""
+
+    def __init__(self, spec: ReportJobCreate, spec_hash: str):
+        self.id = uuid.uuid4().hex
+        self.spec = spec
+        self.spec_hash = spec_hash
+        self.status = ReportJobStatus.QUEUED
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.result: Optional[dict] = None
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "id": self.id,
+            "spec": self.spec.model_dump(mode="json"),
+            "spec_hash": self.spec_hash,
+            "status": self.status.value,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+            "result": self.result
+        }, default=str)
+
+    @classmethod
+    def from_json(cls, value: str) -> "ReportJob":
+        data = json.loads(value)
+        job = cls(ReportJobCreate(**data["spec"]), data["spec_hash"])
+        job.id = data["id"]
+        job.status = ReportJobStatus(data["status"])
+        job.created_at = datetime.fromisoformat(data["created_at"])
+        job.started_at = datetime.fromisoformat(data["started_at"]) if data["started_at"] else None
+        job.finished_at = datetime.fromisoformat(data["finished_at"]) if data["finished_at"] else None
+        job.error = data["error"]
+        job.result = data["result"]
+        return job
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "spec": self.spec,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "download_url": (
+                f"/api/v1/reports/jobs/{self.id}/download"
+                if self.status == ReportJobStatus.COMPLETED else None
+            )
+        }
+
+class ReportJobManager:
+    """Queues report specs and computes them on a fixed number of workers.
+
+    Job state is kept in `store` for `result_ttl` seconds, so with the Redis
+    backend any replica can answer a poll or download for a job another
+    replica computes. Jobs are deduplicated by spec hash only while queued or
+    running: a finished result is a snapshot that writes may have made stale
+    since, so a new submission computes again (from the report cache if the
+    report is still cached).
+    """
+
+    def __init__(self, workers: int, max_queued: int, result_ttl: int, store: CacheBackend):
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.store = store
+        self._queue: "asyncio.Queue[ReportJob]" = asyncio.Queue(maxsize=max_queued)
+        self._tasks: List[asyncio.Task] = []
+
+    @staticmethod
+    def spec_hash(spec: ReportJobCreate) -> str:
+        payload = json.dumps(spec.model_dump(mode="json"), sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def start(self):
+        """Start the worker pool."""
+        for number in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(number)))
+        logger.info(f"📦 Report job workers started: {self.workers}")
+
+    async def stop(self):
+        """Cancel the worker pool."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"attendance:reports:jobs:{job_id}"
+
+    @staticmethod
+    def _spec_key(spec_hash: str) -> str:
+        return f"attendance:reports:jobs:spec:{spec_hash}"
+
+    async def submit(self, spec: ReportJobCreate) -> ReportJob:
+        """Queue a report job, or return the queued or running job for the same spec."""
+        spec_hash = self.spec_hash(spec)
+
+        existing_id = await self.store.get(self._spec_key(spec_hash))
+        if existing_id:
+            existing = await self.get(existing_id)
+            if existing and existing.status in (ReportJobStatus.QUEUED, ReportJobStatus.RUNNING):
+                logger.info(f"♻️ Report job deduplicated: {existing.id} ({spec.report_type.value})")
+                return existing
+
+        job = ReportJob(spec, spec_hash)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise ReportQueueFullError("Report job queue is full, try again later")
+
+        await self._save(job)
+        await self.store.set(self._spec_key(spec_hash), job.id, self.result_ttl)
+        logger.info(f"📥 Report job queued: {job.id} ({spec.report_type.value})")
+        return job
+
+    async def get(self, job_id: str) -> Optional[ReportJob]:
+        value = await self.store.get(self._job_key(job_id))
+        return ReportJob.from_json(value) if value is not None else None
+
+    async def _save(self, job: ReportJob):
+        await self.store.set(self._job_key(job.id), job.to_json(), self.result_ttl)
+
+    async def _worker(self, number: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ReportJob):
+        job.status = ReportJobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+        await self._save(job)
+        logger.info(f"⚙️ Report job running: {job.id}")
+
+        try:
+            session_factory = await read_sessionmaker()
+            async with session_factory() as db:
+                job.result = await self._compute(db, job.spec)
+            job.status = ReportJobStatus.COMPLETED
+        except asyncio.CancelledError:
+            job.status = ReportJobStatus.FAILED
+            job.error = "Report job cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"❌ Report job {job.id} failed: {e}")
+            job.status = ReportJobStatus.FAILED
+            job.error = getattr(e, "detail", None) or str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+            try:
+                await self._save(job)
+            except Exception as e:
+                logger.error(f"❌ Report job {job.id} state could not be saved: {e}")
+
+        logger.info(f"✅ Report job finished: {job.id} ({job.status.value})")
+
+    @staticmethod
+    async def _compute(db, spec: ReportJobCreate) -> dict:
+        report_service = ReportService()
+
+        if spec.report_type == ReportType.ATTENDANCE_SUMMARY:
+            return await report_service.get_attendance_summary(
+                db, course_id=spec.course_id, start_date=spec.start_date, end_date=spec.end_date
+            )
+
+        if spec.report_type == ReportType.DAILY_ATTENDANCE:
+            return await report_service.get_daily_attendance(db, spec.start_date, spec.course_id)
+
+        return await report_service.get_course_stats(
+            db, course_id=spec.course_id, start_date=spec.start_date, end_date=spec.end_date
+        )
+
+def _create_job_store() -> CacheBackend:
+    """Keep job state next to the report cache: shared in Redis, in-process otherwise."""
+    if settings.cache_backend == "redis":
+        return report_cache.backend
+
+    return InMemoryLRUBackend(max_entries=settings.cache_max_entries)
+
+report_job_manager = ReportJobManager(
+    workers=settings.report_job_workers,
+    max_queued=settings.report_job_max_queued,
+    result_ttl=settings.report_job_result_ttl,
+    store=_create_job_store(),
+)
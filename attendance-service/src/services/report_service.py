@@ -0,0 +1,285 @@
+"""Attendance report builders backed by the report cache."""
+
+from datetime import date, datetime
+from typing import Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+
+from ..core.cache import report_cache
+from ..core.database import is_replica_session
+from ..models.attendance import AttendanceStatus
+from .attendance_service import AttendanceService
+
+def _to_date(value: Optional[Union[date, datetime]]) -> Optional[date]:
+    """Reports filter by calendar day, so datetimes are normalized to dates."""
+    return value.date() if isinstance(value, datetime) else value
+
+def _period(start_date: Optional[date], end_date: Optional[date]) -> dict:
+    return {
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None
+    }
+
+class ReportService:
+    """Builds attendance reports and serves them from the report cache.
+
+    Only reports computed on the primary are stored: a replica can lag behind
+    the write that just invalidated the entry, and a stale closed-range report
+    would then be cached for the long immutable TTL.
+    """
+
+    def __init__(self):
+        self.attendance_service = AttendanceService()
+
+    async def get_attendance_summary(
+        self,
+        db: AsyncSession,
+        course_id: Optional[int] = None,
+        start_date: Optional[Union[date, datetime]] = None,
+        end_date: Optional[Union[date, datetime]] = None
+    ) -> dict:
+        """Attendance summary report, cached per course and period."""
+        start, end = _to_date(start_date), _to_date(end_date)
+
+        return await report_cache.get_or_compute(
+            "attendance-summary",
+            {"course_id": course_id, "start_date": start, "end_date": end},
+            lambda: self.build_attendance_summary(db, course_id, start, end),
+            course_id=course_id,
+            start_date=start,
+            end_date=end,
+            store=not is_replica_session(db)
+        )
+
+    async def get_daily_attendance(
+        self,
+        db: AsyncSession,
+        day: date,
+        course_id: Optional[int] = None
+    ) -> dict:
+        """Daily attendance report, cached per course and day."""
+        return await report_cache.get_or_compute(
+            "daily-attendance",
+            {"course_id": course_id, "date": day},
+            lambda: self.build_daily_attendance(db, day, course_id),
+            course_id=course_id,
+            start_date=day,
+            end_date=day,
+            store=not is_replica_session(db)
+        )
+
+    async def get_course_stats(
+        self,
+        db: AsyncSession,
+        course_id: int,
+        start_date: Optional[Union[date, datetime]] = None,
+        end_date: Optional[Union[date, datetime]] = None
+    ) -> dict:
+        """Course statistics, cached per course and period."""
+        start, end = _to_date(start_date), _to_date(end_date)
+
+        return await report_cache.get_or_compute(
+            "course-stats",
+            {"course_id": course_id, "start_date": start, "end_date": end},
+            lambda: self.build_course_stats(db, course_id, start, end),
+            course_id=course_id,
+            start_date=start,
+            end_date=end,
+            store=not is_replica_session(db)
+        )
+
+    async def build_attendance_summary(
+        self,
+        db: AsyncSession,
+        course_id: Optional[int],
+        start_date: Optional[date],
+        end_date: Optional[date]
+    ) -> dict:
+        """Compute the attendance summary report."""
+
+        courses = await self.attendance_service.get_course_status_counts(
+            db,
+            course_id=course_id,
+            start_date=start_date,
+            end_date=end_date
+        )
+        total_records = sum(course["total"] for course in courses)
+
+        if total_records == 0:
+            return {
+                "summary": "No attendance records found for the specified criteria",
+                "total_records": 0,
+                "period": _period(start_date, end_date),
+                "statistics": {}
+            }
+
+        # Calculate overall statistics
+        present_count = sum(course["present"] for course in courses)
+        late_count = sum(course["late"] for course in courses)
+        absent_count = sum(course["absent"] for course in courses)
+
+        # Convert course stats to list format
+        course_summary = []
+        for stats in courses:
+            total_course_records = stats["total"]
+            attendance_rate = (stats["present"] + stats["late"]) / total_course_records * 100 if total_course_records > 0 else 0
+            punctuality_rate = stats["present"] / total_course_records * 100 if total_course_records > 0 else 0
+
+            course_summary.append({
+                "course_id": stats["course_id"],
+                "course_code": stats["course_code"],
+                "total_records": total_course_records,
+                "unique_students": stats["unique_students"],
+                "present_count": stats["present"],
+                "late_count": stats["late"],
+                "absent_count": stats["absent"],
+                "attendance_rate": round(attendance_rate, 2),
+                "punctuality_rate": round(punctuality_rate, 2)
+            })
+
+        # Overall statistics
+        overall_attendance_rate = (present_count + late_count) / total_records * 100 if total_records > 0 else 0
+        overall_punctuality_rate = present_count / total_records * 100 if total_records > 0 else 0
+
+        return {
+            "summary": f"Attendance report for {len(courses)} course(s)",
+            "total_records": total_records,
+            "period": _period(start_date, end_date),
+            "overall_statistics": {
+                "total_records": total_records,
+                "present_count": present_count,
+                "late_count": late_count,
+                "absent_count": absent_count,
+                "attendance_rate": round(overall_attendance_rate, 2),
+                "punctuality_rate": round(overall_punctuality_rate, 2)
+            },
+            "by_course": course_summary
+        }
+
+    async def build_daily_attendance(
+        self,
+        db: AsyncSession,
+        day: date,
+        course_id: Optional[int]
+    ) -> dict:
+        """Compute the daily attendance report."""
+
+        records = await self.attendance_service.get_day_records(db, day, course_id=course_id)
+        total_records = len(records)
+
+        if total_records == 0:
+            return {
+                "date": day.isoformat(),
+                "message": "No attendance records found for this date",
+                "total_records": 0,
+                "courses": []
+            }
+
+        # Group by course and time
+        course_data = {}
+        for record in records:
+            course_key = record.course_id
+            if course_key not in course_data:
+                course_data[course_key] = {
+                    "course_id": record.course_id,
+                    "course_code": record.course_code,
+                    "records": [],
+                    "stats": {"present": 0, "late": 0, "absent": 0}
+                }
+
+            course_data[course_key]["records"].append({
+                "user_id": record.user_id,
+                "user_code": record.user_code,
+                "status": record.status.value,
+                "arrival_time": record.actual_arrival.isoformat() if record.actual_arrival else None,
+                "classroom": record.classroom_name,
+                "distance": float(record.recorded_distance) if record.recorded_distance else None,
+                "is_late": record.is_late,
+                "minutes_late": record.minutes_late
+            })
+
+            # Update stats
+            if record.status == AttendanceStatus.PRESENT:
+                course_data[course_key]["stats"]["present"] += 1
+            elif record.status == AttendanceStatus.LATE:
+                course_data[course_key]["stats"]["late"] += 1
+            elif record.status == AttendanceStatus.ABSENT:
+                course_data[course_key]["stats"]["absent"] += 1
+
+        return {
+            "date": day.isoformat(),
+            "total_records": total_records,
+            "total_courses": len(course_data),
+            "courses": list(course_data.values())
+        }
+
+    async def build_course_stats(
+        self,
+        db: AsyncSession,
+        course_id: int,
+        start_date: Optional[date],
+        end_date: Optional[date]
+    ) -> dict:
+        """Compute attendance statistics for a course."""
+        service_client = self.attendance_service.service_client
+
+        # Validate course exists
+        course_data = await service_client.get_course(course_id)
+        if not course_data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Course not found"
+            )
+
+        # Get enrollments
+        enrollments = await service_client.get_course_enrollments(course_id)
+        total_students = len(enrollments) if enrollments else 0
+
+        # Count attendance records per status
+        courses = await self.attendance_service.get_course_status_counts(
+            db,
+            course_id=course_id,
+            start_date=start_date,
+            end_date=end_date
+        )
+        total_records = sum(course["total"] for course in courses)
+
+        # Calculate stats
+        if total_records == 0:
+            return {
+                "course_id": course_id,
+                "course_code": course_data.get("code"),
+                "course_name": course_data.get("name"),
+                "total_students": total_students,
+                "total_records": 0,
+                "statistics": {
+                    "attendance_rate": 0.0,
+                    "punctuality_rate": 0.0,
+                    "present_count": 0,
+                    "late_count": 0,
+                    "absent_count": 0
+                }
+            }
+
+        present_count = sum(course["present"] for course in courses)
+        late_count = sum(course["late"] for course in courses)
+        absent_count = sum(course["absent"] for course in courses)
+
+        attendance_rate = (present_count + late_count) / total_records * 100 if total_records > 0 else 0
+        punctuality_rate = present_count / total_records * 100 if total_records > 0 else 0
+
+        return {
+            "course_id": course_id,
+            "course_code": course_data.get("code"),
+            "course_name": course_data.get("name"),
+            "total_students": total_students,
+            "total_records": total_records,
+            "period": _period(start_date, end_date),
+            "statistics": {
+                "attendance_rate": round(attendance_rate, 2),
+                "punctuality_rate": round(punctuality_rate, 2),
+                "present_count": present_count,
+                "late_count": late_count,
+                "absent_count": absent_count
+            }
+        }
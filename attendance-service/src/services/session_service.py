@@ -0,0 +1,359 @@
+"""Live attendance session lifecycle and counters."""
+
+import asyncio
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, or_, select, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal
+from ..core.events import course_channel, publish_event
+from ..models.attendance import AttendanceRecord, AttendanceSession, AttendanceStatus
+from .gps_prefilter import rejection_cache
+from .http_client import ServiceClient, ServiceUnavailableError
+
+settings = get_settings()
+
+# Check-ins open this long before a class starts
+CHECK_IN_LEAD = timedelta(minutes=settings.session_open_lead_minutes)
+
+def session_bounds(schedule: dict, class_date: date) -> Tuple[datetime, datetime, datetime]:
+    """Session date, scheduled start and scheduled end as local aware datetimes."""
+    session_date = datetime.combine(class_date, time.min).astimezone()
+    scheduled_start = datetime.combine(class_date, time.fromisoformat(schedule["start_time"])).astimezone()
+    scheduled_end = datetime.combine(class_date, time.fromisoformat(schedule["end_time"])).astimezone()
+    return session_date, scheduled_start, scheduled_end
+
+def in_session(scheduled_start: datetime, scheduled_end: datetime):
+    """Records belonging to the session with this window.
+
+    Records stamped with another session's window belong to that session.
+    Unstamped ones (older rows, reprocess corrections) count here when they
+    arrived between the check-in opening and the scheduled end.
+    """
+    return or_(
+        AttendanceRecord.scheduled_start == scheduled_start,
+        and_(
+            AttendanceRecord.scheduled_start.is_(None),
+            AttendanceRecord.actual_arrival >= scheduled_start - CHECK_IN_LEAD,
+            AttendanceRecord.actual_arrival < scheduled_end
+        )
+    )
+
+async def publish_session_event(event_type: str, session: AttendanceSession, **payload) -> None:
+    """Push a session event with its current counters to the course's live feed."""
+    await publish_event(course_channel(session.course_id), {
+        "type": event_type,
+        "course_id": session.course_id,
+        "session": SessionService.counters(session),
+        "timestamp": datetime.utcnow().isoformat(),
+        **payload
+    })
+
+class SessionService:
+    """Opens, closes and counts attendance sessions.
+
+    A session is keyed by `(schedule_id, session_date)`. Counters are bumped in the
+    same transaction as the attendance write, so reading a session row gives the
+    live totals; opening and closing reconcile them against the records.
+
+    A course can have several sessions on one day, so records counted in a session
+    are stamped with its scheduled start and end; reconciling counts those only.
+    """
+
+    def __init__(self):
+        self.service_client = ServiceClient()
+
+    @staticmethod
+    def counters(session: AttendanceSession) -> dict:
+        """Live counters of a session, as pushed to SSE subscribers."""
+        return {
+            "session_id": session.id,
+            "schedule_id": session.schedule_id,
+            "is_active": session.is_active,
+            "is_completed": session.is_completed,
+            "total_enrolled": session.total_enrolled,
+            "total_present": session.total_present,
+            "total_late": session.total_late,
+            "total_absent": session.total_absent,
+        }
+
+    async def get_session(self, db: AsyncSession, session_id: int) -> Optional[AttendanceSession]:
+        result = await db.execute(
+            select(AttendanceSession)
+            .where(AttendanceSession.id == session_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_live_session(self, db: AsyncSession, course_id: int) -> Optional[AttendanceSession]:
+        """The course's currently open session, if any."""
+        result = await db.execute(
+            select(AttendanceSession)
+            .where(AttendanceSession.course_id == course_id, AttendanceSession.is_active == True)
+            .order_by(AttendanceSession.scheduled_start.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def open_session(
+        self,
+        db: AsyncSession,
+        schedule: dict,
+        class_date: date
+    ) -> Optional[AttendanceSession]:
+        """
+        Open (or reopen) the session for a schedule on a date.
+        Does not commit; returns None if the session was already completed.
+        """
+        course_id = schedule["course_id"]
+        session_date, scheduled_start, scheduled_end = session_bounds(schedule, class_date)
+
+        course = await self.service_client.get_course(course_id) or {}
+        try:
+            enrollments = await self.service_client.get_course_enrollments(course_id) or []
+        except ServiceUnavailableError:
+            # Check-ins must not fail on it; the roster size is fixed by the absence pass
+            logger.warning(f"⚠️ Enrollments of course {course_id} unavailable, opening session without roster")
+            enrollments = []
+        enrolled = [e for e in enrollments if e.get("status", "active") == "active"]
+        total_enrolled = len(enrolled)
+
+        # Students enrolled (or scheduled) since their last rejection can check in right away
+        for enrollment in enrolled:
+            rejection_cache.discard(enrollment["student_id"], course_id)
+
+        stmt = pg_insert(AttendanceSession).values(
+            schedule_id=schedule["id"],
+            course_id=course_id,
+            course_code=course.get("code", ""),
+            teacher_id=course.get("teacher_id", 0),
+            session_date=session_date,
+            scheduled_start=scheduled_start,
+            scheduled_end=scheduled_end,
+            actual_start=func.now(),
+            is_active=True,
+            is_completed=False,
+            attendance_enabled=True,
+            total_enrolled=total_enrolled,
+            total_present=0,
+            total_late=0,
+            total_absent=0,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["schedule_id", "session_date"],
+            set_={
+                "is_active": True,
+                "total_enrolled": stmt.excluded.total_enrolled,
+                "actual_start": func.coalesce(AttendanceSession.actual_start, func.now()),
+            },
+            where=AttendanceSession.is_completed == False
+        ).returning(AttendanceSession.id)
+
+        session_id = (await db.execute(stmt)).scalar_one_or_none()
+        if session_id is None:
+            return None
+
+        # Pick up records written before the session row existed
+        await self._reconcile(db, session_id, course_id, class_date)
+        logger.info(f"🟢 Session {session_id} open: course {course_id}, schedule {schedule['id']}, {class_date}")
+        return await self.get_session(db, session_id)
+
+    async def close_due_sessions(self, db: AsyncSession) -> List[AttendanceSession]:
+        """Close every active session whose scheduled end has passed. Does not commit."""
+        result = await db.execute(
+            update(AttendanceSession)
+            .where(AttendanceSession.is_active == True, AttendanceSession.scheduled_end <= func.now())
+            .values(is_active=False, is_completed=True, actual_end=func.now())
+            .returning(AttendanceSession.id, AttendanceSession.course_id, AttendanceSession.session_date)
+        )
+
+        closed = []
+        for session_id, course_id, session_date in result.all():
+            await self._reconcile(db, session_id, course_id, session_date.astimezone().date())
+            closed.append(await self.get_session(db, session_id))
+            logger.info(f"🔴 Session {session_id} closed: course {course_id}")
+
+        return closed
+
+    async def record_attendance(
+        self,
+        db: AsyncSession,
+        schedule: dict,
+        record: AttendanceRecord
+    ) -> Optional[AttendanceSession]:
+        """Count a new present/late record in the session, in the caller's transaction."""
+        column = (
+            AttendanceSession.total_late
+            if record.status == AttendanceStatus.LATE
+            else AttendanceSession.total_present
+        )
+        session_date, _, _ = session_bounds(schedule, record.class_date)
+
+        result = await db.execute(
+            update(AttendanceSession)
+            .where(AttendanceSession.schedule_id == schedule["id"], AttendanceSession.session_date == session_date)
+            .values({column: column + 1})
+            .returning(AttendanceSession.id)
+        )
+        session_id = result.scalar_one_or_none()
+
+        if session_id is None:
+            # First check-in beat the lifecycle loop; opening reconciles the flushed record
+            return await self.open_session(db, schedule, record.class_date)
+
+        return await self.get_session(db, session_id)
+
+    async def session_window(
+        self,
+        db: AsyncSession,
+        schedule_id: int,
+        class_date: date
+    ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Scheduled start and end of a schedule's session on a date, `(None, None)` without a session."""
+        session_date = datetime.combine(class_date, time.min).astimezone()
+        result = await db.execute(
+            select(AttendanceSession.scheduled_start, AttendanceSession.scheduled_end)
+            .where(AttendanceSession.schedule_id == schedule_id, AttendanceSession.session_date == session_date)
+        )
+        return result.one_or_none() or (None, None)
+
+    async def record_absences(
+        self,
+        db: AsyncSession,
+        schedule_id: int,
+        class_date: date,
+        marked_absent: int,
+        total_enrolled: int
+    ) -> Optional[AttendanceSession]:
+        """Count an absence pass in the session, in the caller's transaction."""
+        session_date = datetime.combine(class_date, time.min).astimezone()
+
+        result = await db.execute(
+            update(AttendanceSession)
+            .where(AttendanceSession.schedule_id == schedule_id, AttendanceSession.session_date == session_date)
+            .values(
+                total_absent=AttendanceSession.total_absent + marked_absent,
+                total_enrolled=total_enrolled
+            )
+            .returning(AttendanceSession.id)
+        )
+        session_id = result.scalar_one_or_none()
+        return await self.get_session(db, session_id) if session_id else None
+
+    async def reconcile_day(self, db: AsyncSession, course_id: int, class_date: date) -> int:
+        """Recompute counters of every session of a course on a date, after bulk corrections."""
+        session_date = datetime.combine(class_date, time.min).astimezone()
+        result = await db.execute(
+            select(AttendanceSession.id).where(
+                AttendanceSession.course_id == course_id,
+                AttendanceSession.session_date == session_date
+            )
+        )
+        session_ids = result.scalars().all()
+        for session_id in session_ids:
+            await self._reconcile(db, session_id, course_id, class_date)
+        return len(session_ids)
+
+    @staticmethod
+    async def _reconcile(db: AsyncSession, session_id: int, course_id: int, class_date: date):
+        """Recompute a session's counters from its attendance records."""
+        scheduled_start, scheduled_end = (await db.execute(
+            select(AttendanceSession.scheduled_start, AttendanceSession.scheduled_end)
+            .where(AttendanceSession.id == session_id)
+        )).one()
+
+        def count(status: AttendanceStatus):
+            return select(func.count()).where(
+                AttendanceRecord.course_id == course_id,
+                AttendanceRecord.class_date == class_date,
+                AttendanceRecord.status == status,
+                in_session(scheduled_start, scheduled_end)
+            ).scalar_subquery()
+
+        await db.execute(
+            update(AttendanceSession)
+            .where(AttendanceSession.id == session_id)
+            .values(
+                total_present=count(AttendanceStatus.PRESENT),
+                total_late=count(AttendanceStatus.LATE),
+                total_absent=count(AttendanceStatus.ABSENT)
+            )
+        )
+
+class SessionLifecycle:
+    """Background loop that opens sessions as schedules begin and closes them as they end."""
+
+    def __init__(self):
+        self.session_service = SessionService()
+        self.lead = timedelta(minutes=settings.session_open_lead_minutes)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if not settings.session_lifecycle_enabled:
+            logger.info("⏸️ Session lifecycle disabled")
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("🗓️ Session lifecycle started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Session lifecycle pass failed: {e}")
+            await asyncio.sleep(settings.session_lifecycle_interval)
+
+    async def tick(self, now: Optional[datetime] = None):
+        """Open sessions whose window has started and close the ones that ended."""
+        now = now or datetime.now()
+        today = now.date()
+
+        schedules = await self.session_service.service_client.get_active_schedules(today.weekday())
+        if schedules is None:
+            raise RuntimeError("Course Service unavailable while listing schedules")
+
+        starting = []
+        for schedule in schedules:
+            start = datetime.combine(today, time.fromisoformat(schedule["start_time"]))
+            end = datetime.combine(today, time.fromisoformat(schedule["end_time"]))
+            if start - self.lead <= now < end:
+                starting.append(schedule)
+
+        opened = []
+        async with AsyncSessionLocal() as db:
+            if starting:
+                session_date = datetime.combine(today, time.min).astimezone()
+                existing = set((await db.execute(
+                    select(AttendanceSession.schedule_id).where(
+                        AttendanceSession.session_date == session_date,
+                        AttendanceSession.schedule_id.in_([s["id"] for s in starting])
+                    )
+                )).scalars())
+
+                for schedule in starting:
+                    if schedule["id"] not in existing:
+                        session = await self.session_service.open_session(db, schedule, today)
+                        if session:
+                            opened.append(session)
+
+            closed = await self.session_service.close_due_sessions(db)
+            await db.commit()
+
+        for session in opened:
+            await publish_session_event("session_opened", session)
+        for session in closed:
+            await publish_session_event("session_closed", session)
+
+session_lifecycle = SessionLifecycle()
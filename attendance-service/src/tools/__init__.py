@@ -0,0 +1 @@
+"""Attendance Service maintenance tools."""
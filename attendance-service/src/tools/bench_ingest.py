@@ -0,0 +1,120 @@
+"""Compare per-event cost of the ORM and Core (FAST_INGEST_ENABLED) GPS write paths.
+
+Usage (from the attendance-service directory, against a disposable database):
+
+    python -m src.tools.bench_ingest --events 2000
+
+Each event is stored in its own session and transaction, as in a request.
+Half of the events are within range and also write an attendance record.
+Rows are written under a dedicated course id and deleted afterwards.
+SQL echo is switched off for the run, whatever DEBUG is set to.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List, Optional
+
+from loguru import logger
+from sqlalchemy import delete
+
+from ..core.database import AsyncSessionLocal, create_tables, engine
+from ..models.attendance import AttendanceRecord, GPSEvent
+from ..schemas.attendance import GPSEventCreate
+from ..services.attendance_service import AttendanceService
+
+def _sample(course_id: int, user_id: int) -> GPSEventCreate:
+    return GPSEventCreate(
+        user_id=user_id,
+        course_id=course_id,
+        latitude=Decimal("-12.0564000"),
+        longitude=Decimal("-77.0844000"),
+        accuracy=Decimal("5.0"),
+        event_timestamp=datetime.now(timezone.utc),
+        device_id="benchmark"
+    )
+
+def _distance_result(within_range: bool) -> dict:
+    return {
+        "nearest_classroom": {"id": 1, "building": "A", "room_number": "101"},
+        "min_distance": 1.5 if within_range else 35.0,
+        "within_range": within_range,
+    }
+
+async def _run_path(service: AttendanceService, path: str, course_id: int, events: int, first_user: int) -> dict:
+    store = service._store_event_core if path == "core" else service._store_event_orm
+    user_data = {"code": "BENCH"}
+    schedule = {"id": 0, "start_time": "00:00:00", "end_time": "23:59:59"}
+
+    cpu = wall = 0.0
+    for i in range(events):
+        gps_data = _sample(course_id, first_user + i)
+        distance_result = _distance_result(within_range=i % 2 == 0)
+
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            await store(db, gps_data, user_data, distance_result, schedule)
+            await db.commit()
+        cpu += time.process_time() - cpu_start
+        wall += time.perf_counter() - wall_start
+
+    return {
+        "path": path,
+        "events": events,
+        "cpu_us_per_event": round(cpu / events * 1e6, 1),
+        "wall_us_per_event": round(wall / events * 1e6, 1),
+    }
+
+async def _cleanup(course_id: int):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(AttendanceRecord).where(AttendanceRecord.course_id == course_id))
+        await db.execute(delete(GPSEvent).where(GPSEvent.course_id == course_id))
+        await db.commit()
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.tools.bench_ingest",
+        description="Benchmark the ORM and Core GPS event write paths"
+    )
+    parser.add_argument("--events", type=int, default=1000, help="Events per path and round (default: 1000)")
+    parser.add_argument("--rounds", type=int, default=3, help="Alternating rounds per path (default: 3)")
+    parser.add_argument("--course-id", type=int, default=999_999, help="Course id used for benchmark rows")
+    return parser.parse_args(argv)
+
+async def main(argv: Optional[List[str]] = None) -> List[dict]:
+    args = parse_args(argv)
+    # DEBUG turns on SQL echo; logging every statement would swamp both paths' timings
+    engine.echo = False
+    await create_tables()
+    await _cleanup(args.course_id)
+
+    service = AttendanceService()
+    results = []
+    try:
+        # Warm up compiled-statement and prepared-statement caches for both paths
+        for first_user, path in ((1, "orm"), (101, "core")):
+            await _run_path(service, path, args.course_id, 20, first_user)
+
+        first_user = 1_000
+        for _ in range(args.rounds):
+            for path in ("orm", "core"):
+                results.append(await _run_path(service, path, args.course_id, args.events, first_user))
+                first_user += args.events
+    finally:
+        await _cleanup(args.course_id)
+
+    for path in ("orm", "core"):
+        runs = [r for r in results if r["path"] == path]
+        best = min(runs, key=lambda r: r["cpu_us_per_event"])
+        logger.info(f"⏱️ {path}: {json.dumps(best)}")
+
+    return results
+
+if __name__ == "__main__":
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", filter=lambda record: record["name"] == __name__)
+    asyncio.run(main())
@@ -0,0 +1,539 @@
+"""Re-evaluate historical GPS events against current course geometry.
+
+Usage (from the attendance-service directory):
+
+    python -m src.tools.reprocess --course-id 5 --since 2025-03-01
+    python -m src.tools.reprocess --course-id 5 --detection-radius 8 --report radius8.jsonl
+    python -m src.tools.reprocess --course-id 5 --apply
+
+Events are streamed from the database in chunks, distances are recomputed with
+vectorized Haversine in a process pool, and every event whose in-range verdict
+changes is written to a JSONL diff report. The default is a dry run; `--apply`
+stores the new distances on the events and corrects attendance with
+`AttendanceSource.CORRECTED` records.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import (
+    Boolean, Date, DateTime, Float, Integer, String, and_, cast, exists, func, insert, literal, select, update
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from ..core.cache import report_cache
+from ..core.config import get_settings
+from ..core.database import AsyncSessionLocal, engine, read_engine
+from ..models.attendance import AttendanceRecord, AttendanceSource, AttendanceStatus, EventStatus, GPSEvent
+from ..services.http_client import ServiceClient
+from ..services.session_service import SessionService
+from ..utils.gps_calculator import GPSCalculator, PolygonFootprint
+
+settings = get_settings()
+
+# Numeric(8, 2) upper bound for stored distances
+MAX_STORED_DISTANCE = 999999.99
+
+GAINED = "gained"      # was out of range, now within: attendance is added
+LOST = "lost"          # was within range, now out: attendance is withdrawn
+DISTANCE = "distance"  # verdict unchanged, distance or nearest classroom moved
+
+class CourseGeometry(NamedTuple):
+    """Classroom positions, footprints and detection radius of one course."""
+    classroom_ids: np.ndarray
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    footprints: Tuple[Optional[PolygonFootprint], ...]
+    detection_radius: float
+
+def _day_start(day: date) -> datetime:
+    """Local midnight of a day; class days are service-local, like schedules and sessions."""
+    return datetime.combine(day, datetime.min.time()).astimezone()
+
+# Set once per worker process by the pool initializer
+_GEOMETRY: Dict[int, CourseGeometry] = {}
+
+def _init_worker(geometry: Dict[int, CourseGeometry]):
+    global _GEOMETRY
+    _GEOMETRY = geometry
+
+def evaluate_chunk(
+    course_ids: np.ndarray,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    old_distance: np.ndarray,
+    old_within: np.ndarray,
+    old_nearest: np.ndarray,
+    earth_radius_km: float
+) -> dict:
+    """
+    Recompute nearest classroom, distance and verdict for a chunk of events.
+    Runs in a worker process; returns only the positions that changed.
+    """
+    n = len(course_ids)
+    new_distance = np.full(n, np.nan)
+    new_nearest = np.full(n, -1, dtype=np.int64)
+    new_within = np.zeros(n, dtype=bool)
+    known = np.zeros(n, dtype=bool)
+
+    # Group positions by course without one full-array mask per course
+    courses, inverse = np.unique(course_ids, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    groups = np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+
+    for course_id, idx in zip(courses, groups):
+        geometry = _GEOMETRY.get(int(course_id))
+        if geometry is None:
+            continue
+
+        distances = GPSCalculator.haversine_matrix(
+            latitudes[idx], longitudes[idx], geometry.latitudes, geometry.longitudes, earth_radius_km
+        )
+        rows = np.arange(len(idx))
+        nearest = distances.argmin(axis=1)
+        within = np.zeros(len(idx), dtype=bool)
+
+        # Same rules as GPSCalculator.locate_in_classrooms: footprints first, then the radius
+        has_circle = np.array([footprint is None for footprint in geometry.footprints])
+        if has_circle.any():
+            circle_distances = np.where(has_circle, distances, np.inf)
+            nearest_circle = circle_distances.argmin(axis=1)
+            in_circle = circle_distances[rows, nearest_circle] <= geometry.detection_radius
+            if not has_circle.all():
+                nearest = np.where(in_circle, nearest_circle, nearest)
+            within |= in_circle
+
+        if not has_circle.all():
+            inside = np.column_stack([
+                footprint.contains_many(latitudes[idx], longitudes[idx]) if footprint is not None
+                else np.zeros(len(idx), dtype=bool)
+                for footprint in geometry.footprints
+            ])
+            in_footprint = inside.any(axis=1)
+            nearest = np.where(in_footprint, inside.argmax(axis=1), nearest)
+            within |= in_footprint
+
+        new_distance[idx] = distances[rows, nearest]
+        new_nearest[idx] = geometry.classroom_ids[nearest]
+        new_within[idx] = within
+        known[idx] = True
+
+    was_within = old_within == 1
+    verdict_changed = known & (new_within != was_within)
+    moved = known & ~verdict_changed & (
+        np.isnan(old_distance)
+        | (np.abs(np.round(new_distance, 2) - old_distance) >= 0.01)
+        | (new_nearest != old_nearest)
+    )
+    changed = np.flatnonzero(verdict_changed | moved)
+
+    return {
+        "skipped": int(n - known.sum()),
+        "positions": changed,
+        "verdict_changed": verdict_changed[changed],
+        "distance": new_distance[changed],
+        "nearest": new_nearest[changed],
+        "within": new_within[changed],
+    }
+
+@dataclass
+class ReprocessStats:
+    scanned: int = 0
+    skipped: int = 0
+    gained: int = 0
+    lost: int = 0
+    distance_only: int = 0
+    events_updated: int = 0
+    records_inserted: int = 0
+    records_upgraded: int = 0
+    records_withdrawn: int = 0
+    touched_days: Set[Tuple[int, date]] = field(default_factory=set)
+
+    def summary(self, elapsed: float) -> dict:
+        return {
+            "scanned": self.scanned,
+            "skipped_no_geometry": self.skipped,
+            "gained": self.gained,
+            "lost": self.lost,
+            "distance_only": self.distance_only,
+            "events_updated": self.events_updated,
+            "records_inserted": self.records_inserted,
+            "records_upgraded": self.records_upgraded,
+            "records_withdrawn": self.records_withdrawn,
+            "elapsed_seconds": round(elapsed, 2),
+            "events_per_second": round(self.scanned / elapsed) if elapsed else None,
+        }
+
+class Reprocessor:
+    """Streams GPS events, evaluates them in a process pool and reports or applies the diff."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.stats = ReprocessStats()
+        self.service_client = ServiceClient()
+        self.note = f"Reprocessed {datetime.utcnow().isoformat(timespec='seconds')}"
+
+    def _filters(self) -> list:
+        conditions = [GPSEvent.status == EventStatus.PROCESSED]
+        if self.args.course_id:
+            conditions.append(GPSEvent.course_id.in_(self.args.course_id))
+        if self.args.since:
+            conditions.append(GPSEvent.event_timestamp >= _day_start(self.args.since))
+        if self.args.until:
+            conditions.append(GPSEvent.event_timestamp < _day_start(self.args.until + timedelta(days=1)))
+        return conditions
+
+    async def load_geometry(self) -> Dict[int, CourseGeometry]:
+        course_ids = self.args.course_id
+        if not course_ids:
+            async with engine.connect() as conn:
+                result = await conn.execute(select(GPSEvent.course_id).where(*self._filters()).distinct())
+                course_ids = [row[0] for row in result]
+
+        geometry = {}
+        for course_id in course_ids:
+            coordinates = await self.service_client.get_course_coordinates(course_id)
+            classrooms = (coordinates or {}).get("classrooms") or []
+            if not classrooms:
+                logger.warning(f"⚠️ Course {course_id}: no classroom coordinates, its events are skipped")
+                continue
+
+            radius = self.args.detection_radius or float(coordinates["detection_radius"])
+            geometry[course_id] = CourseGeometry(
+                classroom_ids=np.array([c["id"] for c in classrooms], dtype=np.int64),
+                latitudes=np.array([float(c["latitude"]) for c in classrooms]),
+                longitudes=np.array([float(c["longitude"]) for c in classrooms]),
+                footprints=tuple(GPSCalculator.footprint(c.get("footprint")) for c in classrooms),
+                detection_radius=radius,
+            )
+            logger.info(f"📐 Course {course_id}: {len(classrooms)} classroom(s), detection radius {radius}m")
+
+        return geometry
+
+    async def run(self) -> dict:
+        started = time.perf_counter()
+        geometry = await self.load_geometry()
+        if not geometry:
+            logger.error("❌ No course geometry available, nothing to reprocess")
+            return self.stats.summary(time.perf_counter() - started)
+
+        query = select(
+            GPSEvent.id,
+            GPSEvent.user_id,
+            GPSEvent.user_code,
+            GPSEvent.course_id,
+            GPSEvent.course_code,
+            cast(GPSEvent.latitude, Float),
+            cast(GPSEvent.longitude, Float),
+            cast(GPSEvent.calculated_distance, Float),
+            GPSEvent.within_range,
+            GPSEvent.nearest_classroom_id,
+            GPSEvent.event_timestamp,
+        ).where(
+            *self._filters(),
+            GPSEvent.course_id.in_(list(geometry))
+        ).order_by(GPSEvent.id).execution_options(yield_per=self.args.chunk_size)
+
+        loop = asyncio.get_running_loop()
+        in_flight = deque()
+
+        with open(self.args.report, "w") as report, ProcessPoolExecutor(
+            max_workers=self.args.workers, initializer=_init_worker, initargs=(geometry,)
+        ) as pool:
+            async with (read_engine or engine).connect() as conn:
+                result = await conn.stream(query)
+                async for rows in result.partitions():
+                    in_flight.append((rows, loop.run_in_executor(pool, evaluate_chunk, *self._arrays(rows))))
+
+                    # Keep every worker busy without buffering the whole table
+                    if len(in_flight) >= self.args.workers * 2:
+                        rows, future = in_flight.popleft()
+                        await self._handle(rows, await future, report)
+
+            while in_flight:
+                rows, future = in_flight.popleft()
+                await self._handle(rows, await future, report)
+
+            summary = self.stats.summary(time.perf_counter() - started)
+            report.write(json.dumps({"summary": summary, "applied": self.args.apply}) + "\n")
+
+        if self.args.apply:
+            await self._refresh_derived()
+
+        return summary
+
+    @staticmethod
+    def _arrays(rows: list) -> tuple:
+        columns = list(zip(*rows))
+        return (
+            np.array(columns[3], dtype=np.int64),
+            np.array(columns[5], dtype=np.float64),
+            np.array(columns[6], dtype=np.float64),
+            np.array(columns[7], dtype=np.float64),  # None -> nan
+            np.array([-1 if w is None else int(w) for w in columns[8]], dtype=np.int8),
+            np.array([-1 if c is None else c for c in columns[9]], dtype=np.int64),
+            settings.earth_radius_km,
+        )
+
+    async def _handle(self, rows: list, result: dict, report):
+        self.stats.scanned += len(rows)
+        self.stats.skipped += result["skipped"]
+
+        changes = []
+        for position, verdict_changed, distance, nearest, within in zip(
+            result["positions"], result["verdict_changed"], result["distance"], result["nearest"], result["within"]
+        ):
+            row = rows[position]
+            kind = (GAINED if within else LOST) if verdict_changed else DISTANCE
+            changes.append({
+                "event_id": row[0],
+                "user_id": row[1],
+                "user_code": row[2],
+                "course_id": row[3],
+                "course_code": row[4],
+                "class_date": row[10].astimezone().date(),
+                "event_timestamp": row[10],
+                "change": kind,
+                "old_distance": row[7],
+                "new_distance": round(min(float(distance), MAX_STORED_DISTANCE), 2),
+                "old_within": row[8],
+                "new_within": bool(within),
+                "old_nearest_classroom_id": row[9],
+                "new_nearest_classroom_id": int(nearest),
+            })
+
+        for change in changes:
+            if change["change"] == GAINED:
+                self.stats.gained += 1
+            elif change["change"] == LOST:
+                self.stats.lost += 1
+            else:
+                self.stats.distance_only += 1
+
+            if change["change"] != DISTANCE or self.args.report_distance_changes:
+                report.write(json.dumps(change, default=str) + "\n")
+
+        if self.args.apply and changes:
+            await self._apply(changes)
+
+        if self.stats.scanned % (self.args.chunk_size * 20) < len(rows):
+            logger.info(f"⏩ {self.stats.scanned} events scanned, {self.stats.gained} gained, {self.stats.lost} lost")
+
+    async def _apply(self, changes: List[dict]):
+        """Store new distances and correct attendance for one chunk, in one transaction."""
+        async with AsyncSessionLocal() as db:
+            # 1. New distance and verdict on the events themselves
+            values = func.unnest(
+                literal([c["event_id"] for c in changes], ARRAY(Integer)),
+                literal([c["new_distance"] for c in changes], ARRAY(Float)),
+                literal([c["new_nearest_classroom_id"] for c in changes], ARRAY(Integer)),
+                literal([c["new_within"] for c in changes], ARRAY(Boolean)),
+            ).table_valued("event_id", "distance", "nearest", "within").render_derived(name="v")
+
+            result = await db.execute(
+                update(GPSEvent)
+                .where(GPSEvent.id == values.c.event_id)
+                .values(
+                    calculated_distance=values.c.distance,
+                    nearest_classroom_id=values.c.nearest,
+                    within_range=values.c.within,
+                    processing_notes=func.concat_ws("; ", GPSEvent.processing_notes, self.note)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            self.stats.events_updated += result.rowcount
+
+            # 2. Attendance for (user, course, day) that gained an in-range event
+            gained: Dict[tuple, dict] = {}
+            for change in changes:
+                if change["change"] == GAINED:
+                    gained.setdefault((change["user_id"], change["course_id"], change["class_date"]), change)
+            if gained:
+                await self._add_attendance(db, list(gained.values()))
+
+            # 3. Attendance for days that lost their only in-range event
+            lost = {
+                (c["user_id"], c["course_id"], c["class_date"])
+                for c in changes if c["change"] == LOST
+            }
+            if lost:
+                await self._withdraw_attendance(db, sorted(lost))
+
+            await db.commit()
+
+        for change in changes:
+            if change["change"] != DISTANCE:
+                self.stats.touched_days.add((change["course_id"], change["class_date"]))
+
+    async def _add_attendance(self, db, gained: List[dict]):
+        records = AttendanceRecord.__table__
+        staged = func.unnest(
+            literal([c["user_id"] for c in gained], ARRAY(Integer)),
+            literal([c["user_code"] for c in gained], ARRAY(String)),
+            literal([c["course_id"] for c in gained], ARRAY(Integer)),
+            literal([c["course_code"] for c in gained], ARRAY(String)),
+            literal([c["class_date"] for c in gained], ARRAY(Date)),
+            literal([c["event_id"] for c in gained], ARRAY(Integer)),
+            literal([c["event_timestamp"] for c in gained], ARRAY(records.c.actual_arrival.type)),
+            literal([c["new_distance"] for c in gained], ARRAY(Float)),
+            literal([c["new_nearest_classroom_id"] for c in gained], ARRAY(Integer)),
+        ).table_valued(
+            "user_id", "user_code", "course_id", "course_code", "class_date",
+            "event_id", "arrival", "distance", "classroom_id"
+        ).render_derived(name="gained")
+
+        same_day = and_(
+            AttendanceRecord.user_id == staged.c.user_id,
+            AttendanceRecord.course_id == staged.c.course_id,
+            AttendanceRecord.class_date == staged.c.class_date
+        )
+
+        # Absences for that day become corrected presences
+        result = await db.execute(
+            update(AttendanceRecord)
+            .where(same_day, AttendanceRecord.status == AttendanceStatus.ABSENT)
+            .values(
+                status=AttendanceStatus.PRESENT,
+                source=AttendanceSource.CORRECTED,
+                gps_event_id=staged.c.event_id,
+                actual_arrival=staged.c.arrival,
+                recorded_distance=staged.c.distance,
+                classroom_id=staged.c.classroom_id,
+                modified_by="reprocess",
+                modification_reason=self.note
+            )
+            .execution_options(synchronize_session=False)
+        )
+        self.stats.records_upgraded += result.rowcount
+
+        # Days without any record get a corrected presence
+        rows = select(
+            staged.c.event_id,
+            staged.c.user_id,
+            staged.c.user_code,
+            staged.c.course_id,
+            staged.c.course_code,
+            literal(AttendanceStatus.PRESENT, records.c.status.type),
+            literal(AttendanceSource.CORRECTED, records.c.source.type),
+            staged.c.class_date,
+            staged.c.arrival,
+            staged.c.classroom_id,
+            staged.c.distance,
+            literal(False),
+            literal("reprocess", String),
+            literal(self.note, String),
+        ).where(~exists().where(same_day))
+
+        result = await db.execute(
+            insert(AttendanceRecord).from_select(
+                [
+                    "gps_event_id", "user_id", "user_code", "course_id", "course_code",
+                    "status", "source", "class_date", "actual_arrival", "classroom_id",
+                    "recorded_distance", "is_late", "created_by", "modification_reason"
+                ],
+                rows
+            )
+        )
+        self.stats.records_inserted += result.rowcount
+
+    async def _withdraw_attendance(self, db, lost: List[Tuple[int, int, date]]):
+        user_ids, course_ids, class_dates = zip(*lost)
+        staged = func.unnest(
+            literal(list(user_ids), ARRAY(Integer)),
+            literal(list(course_ids), ARRAY(Integer)),
+            literal(list(class_dates), ARRAY(Date)),
+            literal([_day_start(d) for d in class_dates], ARRAY(DateTime(timezone=True))),
+            literal([_day_start(d + timedelta(days=1)) for d in class_dates], ARRAY(DateTime(timezone=True))),
+        ).table_valued("user_id", "course_id", "class_date", "day_start", "day_end").render_derived(name="lost")
+
+        # Events already updated in this transaction (and earlier chunks) carry the new verdict
+        still_in_range = exists().where(
+            GPSEvent.user_id == staged.c.user_id,
+            GPSEvent.course_id == staged.c.course_id,
+            GPSEvent.event_timestamp >= staged.c.day_start,
+            GPSEvent.event_timestamp < staged.c.day_end,
+            GPSEvent.status == EventStatus.PROCESSED,
+            GPSEvent.within_range == True
+        )
+
+        # Only GPS-derived presences are withdrawn; manual records are left alone
+        result = await db.execute(
+            update(AttendanceRecord)
+            .where(
+                AttendanceRecord.user_id == staged.c.user_id,
+                AttendanceRecord.course_id == staged.c.course_id,
+                AttendanceRecord.class_date == staged.c.class_date,
+                AttendanceRecord.status.in_([AttendanceStatus.PRESENT, AttendanceStatus.LATE]),
+                AttendanceRecord.source.in_([AttendanceSource.GPS_AUTO, AttendanceSource.CORRECTED]),
+                ~still_in_range
+            )
+            .values(
+                status=AttendanceStatus.ABSENT,
+                source=AttendanceSource.CORRECTED,
+                is_late=False,
+                minutes_late=None,
+                modified_by="reprocess",
+                modification_reason=self.note
+            )
+            .execution_options(synchronize_session=False)
+        )
+        self.stats.records_withdrawn += result.rowcount
+
+    async def _refresh_derived(self):
+        """Bring session counters and cached reports in line with the corrected records."""
+        session_service = SessionService()
+        async with AsyncSessionLocal() as db:
+            for course_id, class_date in sorted(self.stats.touched_days):
+                await session_service.reconcile_day(db, course_id, class_date)
+            await db.commit()
+
+        for course_id, class_date in sorted(self.stats.touched_days):
+            await report_cache.invalidate(course_id, class_date)
+
+def _parse_date(value: str) -> date:
+    return date.fromisoformat(value)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.tools.reprocess",
+        description="Re-evaluate historical GPS events against current course geometry"
+    )
+    parser.add_argument("--course-id", type=int, action="append", help="Course to reprocess (repeatable, default: all)")
+    parser.add_argument("--since", type=_parse_date, help="First event date (YYYY-MM-DD, local time)")
+    parser.add_argument("--until", type=_parse_date, help="Last event date (YYYY-MM-DD, local time)")
+    parser.add_argument("--detection-radius", type=float, help="Override every course's detection radius (what-if runs)")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="Events per chunk (default: 50000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker processes (default: CPU count)")
+    parser.add_argument("--report", default=f"reprocess_{datetime.utcnow():%Y%m%d_%H%M%S}.jsonl", help="Diff report path (JSONL)")
+    parser.add_argument("--report-distance-changes", action="store_true", help="Also report events whose verdict did not change")
+    parser.add_argument("--apply", action="store_true", help="Write corrections (default: dry run)")
+
+    args = parser.parse_args(argv)
+    if args.apply and args.detection_radius:
+        parser.error("--detection-radius is for what-if runs; change the course and rerun to apply")
+    return args
+
+async def main(argv: Optional[List[str]] = None) -> dict:
+    args = parse_args(argv)
+    logger.info(f"🔁 Reprocessing GPS events ({'apply' if args.apply else 'dry run'}), report: {args.report}")
+
+    summary = await Reprocessor(args).run()
+
+    logger.info(f"✅ Reprocessing finished: {json.dumps(summary)}")
+    return summary
+
+if __name__ == "__main__":
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    asyncio.run(main())
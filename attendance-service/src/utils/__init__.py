@@ -1,5 +1,6 @@
 """Attendance Service Utils package."""
 
-from .gps_calculator import GPSCalculator
+from .gps_calculator import GPSCalculator, PolygonFootprint
+from .sse import format_sse, stream_channel, sse_response
 
-__all__ = ["GPSCalculator"]
\ No newline at end of file
+__all__ = ["GPSCalculator", "PolygonFootprint", "format_sse", "stream_channel", "sse_response"]
\ No newline at end of file
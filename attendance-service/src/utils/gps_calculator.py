@@ -1,9 +1,76 @@
 """GPS distance calculation utilities."""
 
 import math
-from typing import Tuple
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
 from loguru import logger
 
+class PolygonFootprint:
+    """Classroom outline as (lat, lon) vertices with its bounding box precomputed.
+
+    Containment is a ray-casting test in the local lat/lon plane, which is
+    exact enough at building scale. The bounding box is checked first, so
+    points away from the building cost four comparisons.
+    """
+
+    __slots__ = ("latitudes", "longitudes", "bbox", "_edges")
+
+    def __init__(self, vertices: Sequence[Sequence[float]]):
+        points = np.asarray(vertices, dtype=np.float64)
+        self.latitudes = points[:, 0]
+        self.longitudes = points[:, 1]
+        self.bbox = (
+            float(self.latitudes.min()), float(self.latitudes.max()),
+            float(self.longitudes.min()), float(self.longitudes.max())
+        )
+        # (lat_i, lon_i, lat_j, lon_j) with j the previous vertex, closing the ring
+        self._edges = list(zip(
+            self.latitudes.tolist(), self.longitudes.tolist(),
+            np.roll(self.latitudes, 1).tolist(), np.roll(self.longitudes, 1).tolist()
+        ))
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        min_lat, max_lat, min_lon, max_lon = self.bbox
+        if not (min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon):
+            return False
+
+        inside = False
+        for lat_i, lon_i, lat_j, lon_j in self._edges:
+            if (lat_i > latitude) != (lat_j > latitude):
+                crossing = lon_i + (latitude - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+                if longitude < crossing:
+                    inside = not inside
+        return inside
+
+    def contains_many(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """Vectorized `contains` for arrays of shape (N,). Returns a boolean array."""
+        min_lat, max_lat, min_lon, max_lon = self.bbox
+        candidates = np.flatnonzero(
+            (latitudes >= min_lat) & (latitudes <= max_lat) & (longitudes >= min_lon) & (longitudes <= max_lon)
+        )
+        inside = np.zeros(len(latitudes), dtype=bool)
+        if not len(candidates):
+            return inside
+
+        lats = latitudes[candidates]
+        lons = longitudes[candidates]
+        hits = np.zeros(len(candidates), dtype=bool)
+        for lat_i, lon_i, lat_j, lon_j in self._edges:
+            straddles = (lat_i > lats) != (lat_j > lats)
+            if not straddles.any():
+                continue
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing = lon_i + (lats - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+            hits ^= straddles & (lons < crossing)
+
+        inside[candidates] = hits
+        return inside
+
+@lru_cache(maxsize=1024)
+def _cached_footprint(vertices: Tuple[Tuple[float, float], ...]) -> PolygonFootprint:
+    return PolygonFootprint(vertices)
+
 class GPSCalculator:
     """GPS distance and validation utilities."""
 
@@ -45,6 +112,76 @@ class GPSCalculator:
 
         return distance_meters
 
+    @staticmethod
+    def haversine_matrix(
+        lats: np.ndarray,
+        lons: np.ndarray,
+        target_lats: np.ndarray,
+        target_lons: np.ndarray,
+        earth_radius_km: float = 6371.0
+    ) -> np.ndarray:
+        """
+        Vectorized Haversine distance from N points to K targets.
+
+        Args:
+            lats, lons: Arrays of shape (N,) in decimal degrees
+            target_lats, target_lons: Arrays of shape (K,) in decimal degrees
+            earth_radius_km: Earth radius in kilometers
+
+        Returns:
+            Array of shape (N, K) with distances in meters
+        """
+        lat1 = np.radians(lats)[:, None]
+        lon1 = np.radians(lons)[:, None]
+        lat2 = np.radians(target_lats)[None, :]
+        lon2 = np.radians(target_lons)[None, :]
+
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * earth_radius_km * 1000 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    @staticmethod
+    def footprint(vertices: Optional[List[List[float]]]) -> Optional[PolygonFootprint]:
+        """Precomputed footprint for a classroom outline, shared across calls. None if absent or invalid."""
+        if not vertices or len(vertices) < 3:
+            return None
+        try:
+            return _cached_footprint(tuple((float(lat), float(lon)) for lat, lon in vertices))
+        except (TypeError, ValueError):
+            logger.warning("Ignoring malformed classroom footprint")
+            return None
+
+    @staticmethod
+    def point_in_polygon(latitude: float, longitude: float, vertices: List[List[float]]) -> bool:
+        """
+        Check if a point lies inside a polygon.
+
+        Args:
+            latitude, longitude: Point coordinates in decimal degrees
+            vertices: Polygon outline as [[lat, lon], ...]
+
+        Returns:
+            True if the point is inside the polygon
+        """
+        footprint = GPSCalculator.footprint(vertices)
+        return footprint is not None and footprint.contains(latitude, longitude)
+
+    @staticmethod
+    def points_in_polygon(latitudes: np.ndarray, longitudes: np.ndarray, vertices: List[List[float]]) -> np.ndarray:
+        """
+        Vectorized point-in-polygon test for batches of points.
+
+        Args:
+            latitudes, longitudes: Arrays of shape (N,) in decimal degrees
+            vertices: Polygon outline as [[lat, lon], ...]
+
+        Returns:
+            Boolean array of shape (N,)
+        """
+        footprint = GPSCalculator.footprint(vertices)
+        if footprint is None:
+            return np.zeros(len(latitudes), dtype=bool)
+        return footprint.contains_many(np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64))
+
     @staticmethod
     def is_within_range(
         user_lat: float,
@@ -154,4 +291,56 @@ class GPSCalculator:
 
         logger.info(f"Nearest classroom: {nearest_classroom.get('room_number', 'Unknown')} at {min_distance:.2f}m")
 
-        return nearest_classroom, min_distance
\ No newline at end of file
+        return nearest_classroom, min_distance
+
+    @staticmethod
+    def locate_in_classrooms(
+        user_lat: float,
+        user_lon: float,
+        classrooms: list,
+        detection_radius: float,
+        earth_radius_km: float = 6371.0
+    ) -> Tuple[dict, float, bool]:
+        """
+        Decide which classroom a user is in.
+
+        Classrooms with a `footprint` match only when the point is inside the
+        outline; the others fall back to the detection radius around their point.
+
+        Args:
+            user_lat, user_lon: User's GPS coordinates
+            classrooms: List of classroom dicts with 'latitude', 'longitude' and optional 'footprint'
+            detection_radius: Radius in meters for classrooms without a footprint
+            earth_radius_km: Earth radius in kilometers
+
+        Returns:
+            Tuple of (classroom: dict, distance: float, within_range: bool)
+        """
+        for classroom in classrooms:
+            footprint = GPSCalculator.footprint(classroom.get('footprint'))
+            if footprint is not None and footprint.contains(user_lat, user_lon):
+                distance = GPSCalculator.haversine_distance(
+                    user_lat, user_lon,
+                    float(classroom['latitude']), float(classroom['longitude']),
+                    earth_radius_km
+                )
+                logger.info(f"Inside footprint of {classroom.get('room_number', 'Unknown')} ({distance:.2f}m from its point)")
+                return classroom, distance, True
+
+        nearest_classroom, min_distance = GPSCalculator.find_nearest_classroom(
+            user_lat, user_lon, classrooms, earth_radius_km
+        )
+
+        # Circle fallback, only for classrooms that have no outline
+        circle_rooms = [c for c in classrooms if GPSCalculator.footprint(c.get('footprint')) is None]
+        if not circle_rooms:
+            return nearest_classroom, min_distance, False
+        if len(circle_rooms) < len(classrooms):
+            nearest_circle, circle_distance = GPSCalculator.find_nearest_classroom(
+                user_lat, user_lon, circle_rooms, earth_radius_km
+            )
+            if circle_distance <= detection_radius:
+                return nearest_circle, circle_distance, True
+            return nearest_classroom, min_distance, False
+
+        return nearest_classroom, min_distance, min_distance <= detection_radius
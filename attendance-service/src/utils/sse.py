@@ -0,0 +1,55 @@
+"""Server-Sent Events helpers for live feeds."""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from ..core.config import get_settings
+from ..core.events import event_bus
+
+settings = get_settings()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # disable proxy buffering (nginx)
+}
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one SSE message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def stream_channel(
+    request: Request,
+    channel: str,
+    initial: Optional[Callable[[], Awaitable[Iterable[dict]]]] = None,
+    event_filter: Optional[Callable[[dict], bool]] = None
+) -> AsyncIterator[str]:
+    """
+    Yield events published on `channel` until the client disconnects.
+
+    The subscription is registered before `initial` runs, so no event published
+    while the initial messages are built is lost. Each message's `type` is used
+    as the SSE event name; a comment line is sent as heartbeat when idle.
+    """
+    async with event_bus.subscribe(channel) as queue:
+        if initial:
+            for event in await initial():
+                yield format_sse(event["type"], event)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.sse_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": heartbeat\n\n"
+                continue
+
+            if event_filter is None or event_filter(event):
+                yield format_sse(event.get("type", "message"), event)
+
+def sse_response(stream: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(stream, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,5 +1,6 @@
 """Course Service Database Configuration."""
 
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from typing import AsyncGenerator
@@ -40,7 +41,15 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+# Idempotent upgrades for databases created by earlier versions
+# (create_all only creates missing tables, it never alters existing ones)
+SCHEMA_UPGRADES = [
+    "ALTER TABLE classrooms ADD COLUMN IF NOT EXISTS footprint JSON",
+]
+
 async def create_tables():
     """Create database tables."""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+        for statement in SCHEMA_UPGRADES:
+            await conn.execute(text(statement))
\ No newline at end of file
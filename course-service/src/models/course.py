@@ -2,7 +2,7 @@
 
 from datetime import datetime, time
 from decimal import Decimal
-from sqlalchemy import String, Boolean, DateTime, func, Text, Integer, Numeric, Time
+from sqlalchemy import String, Boolean, DateTime, func, Text, Integer, Numeric, Time, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import ForeignKey
 from ..core.database import Base
@@ -68,6 +68,7 @@ class Classroom(Base):
     longitude: Mapped[Decimal] = mapped_column(Numeric(10, 7))
     altitude: Mapped[Decimal] = mapped_column(Numeric(8, 2), nullable=True)
     gps_radius: Mapped[Decimal] = mapped_column(Numeric(5, 2), default=Decimal('50.0'))  # Detection radius in meters
+    footprint: Mapped[list] = mapped_column(JSON, nullable=True)  # Optional outline: [[lat, lon], ...], replaces the radius
 
     # Additional info
     capacity: Mapped[int] = mapped_column(Integer, default=30)
@@ -96,6 +96,39 @@ async def get_course_schedules(
         )
 
 
+@router.get(
+    "/active",
+    response_model=ScheduleListResponse,
+    summary="Get Active Schedules",
+    description="Get active schedules across all active courses (used by Attendance Service background jobs)"
+)
+async def get_active_schedules(
+    day_of_week: Optional[int] = Query(None, ge=0, le=6, description="0=Monday, 6=Sunday"),
+    db: AsyncSession = Depends(get_session)
+):
+    """Get all active schedules, optionally filtered by weekday."""
+
+    logger.info(f"📅 GET ACTIVE SCHEDULES: day_of_week={day_of_week}")
+
+    try:
+        schedule_service = ScheduleService()
+
+        schedules = await schedule_service.get_active_schedules(db, day_of_week)
+
+        return ScheduleListResponse(
+            success=True,
+            message=f"{len(schedules)} active schedule(s)",
+            data=[ScheduleResponse.model_validate(s) for s in schedules]
+        )
+
+    except Exception as e:
+        logger.error(f"❌ Error getting active schedules: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+
 @router.get(
     "/{schedule_id}",
     response_model=ScheduleCreateResponse,
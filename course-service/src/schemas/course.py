@@ -5,6 +5,22 @@ from decimal import Decimal
 from typing import Optional, List
 from pydantic import BaseModel, Field, ConfigDict, validator
 
+def _validate_footprint(v: Optional[List[List[float]]]) -> Optional[List[List[float]]]:
+    """A footprint is a closed outline of at least 3 distinct [lat, lon] vertices."""
+    if v is None:
+        return v
+    vertices = [[float(point[0]), float(point[1])] for point in v if len(point) == 2]
+    if len(vertices) != len(v):
+        raise ValueError('Footprint vertices must be [latitude, longitude] pairs')
+    if len(vertices) > 1 and vertices[0] == vertices[-1]:
+        vertices = vertices[:-1]  # closing vertex is implicit
+    if len({tuple(point) for point in vertices}) < 3:
+        raise ValueError('Footprint needs at least 3 distinct vertices')
+    for lat, lon in vertices:
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError('Footprint vertex out of range')
+    return vertices
+
 # Base schemas
 class CourseBase(BaseModel):
     """Base course schema with common fields."""
@@ -28,9 +44,12 @@ class ClassroomBase(BaseModel):
     longitude: Decimal = Field(..., ge=Decimal('-180'), le=Decimal('180'))
     altitude: Optional[Decimal] = None
     gps_radius: Decimal = Field(default=Decimal('50.0'), ge=Decimal('10.0'), le=Decimal('200.0'))
+    footprint: Optional[List[List[float]]] = Field(None, max_length=200)  # [[lat, lon], ...]
     capacity: int = Field(default=30, ge=1, le=500)
     equipment: Optional[str] = None
 
+    _footprint = validator('footprint', allow_reuse=True)(_validate_footprint)
+
 class ScheduleBase(BaseModel):
     """Base schedule schema."""
     day_of_week: int = Field(..., ge=0, le=6)  # 0=Monday, 6=Sunday
@@ -78,10 +97,13 @@ class ClassroomUpdate(BaseModel):
     longitude: Optional[Decimal] = Field(None, ge=Decimal('-180'), le=Decimal('180'))
     altitude: Optional[Decimal] = None
     gps_radius: Optional[Decimal] = Field(None, ge=Decimal('10.0'), le=Decimal('200.0'))
+    footprint: Optional[List[List[float]]] = Field(None, max_length=200)
     capacity: Optional[int] = Field(None, ge=1, le=500)
     equipment: Optional[str] = None
     is_active: Optional[bool] = None
 
+    _footprint = validator('footprint', allow_reuse=True)(_validate_footprint)
+
 class CourseClassroomBase(BaseModel):
     """Base schema for course-classroom assignment."""
     classroom_id: int = Field(..., gt=0)
@@ -194,7 +216,7 @@ class CourseCoordinates(BaseModel):
     course_id: int
     course_code: str
     detection_radius: Decimal
-    classrooms: List[dict] = []  # [{id, latitude, longitude, building, room_number}]
+    classrooms: List[dict] = []  # [{id, latitude, longitude, building, room_number, gps_radius, footprint}]
 
 # API Response schemas
 class BaseResponse(BaseModel):
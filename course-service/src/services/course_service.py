@@ -245,7 +245,8 @@ class CourseService:
                             "building": classroom.building,
                             "room_number": classroom.room_number,
                             "name": classroom.name,
-                            "gps_radius": float(classroom.gps_radius)
+                            "gps_radius": float(classroom.gps_radius),
+                            "footprint": classroom.footprint
                         })
 
         # Also check course_classroom assignments (for backward compatibility)
@@ -260,7 +261,8 @@ class CourseService:
                         "building": assignment.classroom.building,
                         "room_number": assignment.classroom.room_number,
                         "name": assignment.classroom.name,
-                        "gps_radius": float(assignment.classroom.gps_radius)
+                        "gps_radius": float(assignment.classroom.gps_radius),
+                        "footprint": assignment.classroom.footprint
                     })
 
         if not classrooms_data:
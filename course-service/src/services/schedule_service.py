@@ -90,6 +90,26 @@ class ScheduleService:
         result = await db.execute(query)
         return list(result.scalars().all())
 
+    async def get_active_schedules(
+        self,
+        db: AsyncSession,
+        day_of_week: Optional[int] = None
+    ) -> List[Schedule]:
+        """Get active schedules of active courses, optionally for one weekday."""
+
+        query = select(Schedule).join(Course, Course.id == Schedule.course_id).where(
+            Schedule.is_active == True,
+            Course.is_active == True
+        )
+
+        if day_of_week is not None:
+            query = query.where(Schedule.day_of_week == day_of_week)
+
+        query = query.order_by(Schedule.day_of_week, Schedule.end_time, Schedule.course_id)
+
+        result = await db.execute(query)
+        return list(result.scalars().all())
+
     async def get_schedule_by_id(
         self,
         db: AsyncSession,